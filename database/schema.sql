@@ -39,6 +39,8 @@ CREATE TABLE IF NOT EXISTS tracked_links (
     affiliate_link TEXT UNIQUE,  
     metadata TEXT,
     processed_at TIMESTAMP,
+    product_key TEXT,
+    text_simhash INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
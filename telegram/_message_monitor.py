@@ -7,6 +7,12 @@ import logging
 from urllib.parse import urlparse, urlunparse
 from datetime import datetime
 
+from telethon.errors import FloodWaitError, TakeoutInitDelayError
+
+from product_key import extract_product_key, RecentKeys
+from simhash import SimHashIndex, simhash, to_signed, from_signed
+from shard_ring import ShardRouter
+from ingest_pipeline import IngestPipeline
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,6 +22,48 @@ logger = logging.getLogger(__name__)
 
 URL_REGEX = re.compile(r"(https?://[^\s]+|www\.[^\s]+)", re.IGNORECASE)
 
+# Caracteres invisíveis, removidos numa única passada de str.translate
+INVISIBLE_CHARS = ("\u200b", "\u200c", "\u200d", "\u2060", "\ufeff")
+INVISIBLE_TABLE = dict.fromkeys(map(ord, INVISIBLE_CHARS))
+
+# Indícios baratos de link (substring é bem mais rápido que regex IGNORECASE)
+LINK_HINTS = ("http", "www.", "HTTP", "WWW.", "Http", "Www.")
+
+# UTF-8 lido como latin-1: byte inicial (0xC2-0xF4) seguido de continuação (0x80-0xBF)
+MOJIBAKE_REGEX = re.compile("[\u00c2-\u00f4][\u0080-\u00bf]")
+
+
+def has_link_hint(text: str) -> bool:
+    for hint in LINK_HINTS:
+        if hint in text:
+            return True
+    return False
+
+
+def has_invisible(text: str) -> bool:
+    for ch in INVISIBLE_CHARS:
+        if ch in text:
+            return True
+    return False
+
+
+def normalize_text(text: str) -> str:
+    """
+    Repara mojibake só quando detectado e remove caracteres invisíveis só
+    quando presentes. Texto ASCII puro sai intacto sem nenhuma cópia.
+    """
+    if not text.isascii() and MOJIBAKE_REGEX.search(text):
+        try:
+            text = text.encode('latin1').decode('utf-8')
+        except UnicodeError:
+            pass
+
+    # translate com tabela é caro por caractere; só roda se houver o que remover
+    if has_invisible(text):
+        text = text.translate(INVISIBLE_TABLE)
+    return text
+
+
 class MessageMonitor:
     """
     Versão comportamentalmente idêntica ao código original:
@@ -26,20 +74,117 @@ class MessageMonitor:
 
     Pipeline corrigida:
     - deduplicação via original_url UNIQUE
+    - deduplicação por produto (product_key) com LRU em memória
+    - quase-duplicatas de texto via SimHash (near_duplicate_mode: skip/flag)
+    - leitura distribuída entre as contas de TelegramManager.user_clients
     - filtro por affiliate_domains
     - ordem determinística
     """
 
-    def __init__(self, db_path, bot):
+    # Colunas adicionadas em tracked_links por este módulo
+    TRACKED_LINKS_COLUMNS = {
+        'product_key': 'TEXT',
+        'text_simhash': 'INTEGER',
+    }
+
+    def __init__(self, db_path, bot, recent_keys_size=10000,
+                 near_duplicate_mode='skip'):
         self.db_path = db_path
         self.bot = bot
+        self.recent_keys = RecentKeys(recent_keys_size)
+        self.near_duplicates = SimHashIndex()
+        self.near_duplicate_mode = near_duplicate_mode
+        self.shards = None
+        self._ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    # ========================================================
+    # SCHEMA
+    # ========================================================
+
+    def _ensure_schema(self):
+        """Garante as colunas de deduplicação (e índice) em tracked_links"""
+        conn = self._connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("PRAGMA table_info(tracked_links)")
+            columns = {row[1] for row in cur.fetchall()}
+            if not columns:
+                return
+
+            for column, column_type in self.TRACKED_LINKS_COLUMNS.items():
+                if column not in columns:
+                    cur.execute(f"ALTER TABLE tracked_links ADD COLUMN {column} {column_type}")
+                    logger.info(f"Coluna {column} adicionada em tracked_links")
+
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tracked_links_product_key "
+                "ON tracked_links(product_key)"
+            )
+            conn.commit()
+
+            # Aquece o LRU com os produtos mais recentes
+            cur.execute(
+                """
+                SELECT product_key FROM tracked_links
+                WHERE product_key IS NOT NULL
+                ORDER BY id DESC LIMIT ?
+                """,
+                (self.recent_keys.capacity,)
+            )
+            for (key,) in reversed(cur.fetchall()):
+                self.recent_keys.add(key)
+
+            # Recarrega os fingerprints persistidos no índice LSH
+            cur.execute(
+                """
+                SELECT text_simhash, product_key FROM tracked_links
+                WHERE text_simhash IS NOT NULL
+                ORDER BY id DESC LIMIT ?
+                """,
+                (self.near_duplicates.capacity,)
+            )
+            for fingerprint, key in reversed(cur.fetchall()):
+                self.near_duplicates.add(from_signed(fingerprint), key)
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao preparar schema de tracked_links: {e}")
+        finally:
+            conn.close()
+
+    # ========================================================
+    # SHARDS (CONTAS DE LEITURA)
+    # ========================================================
+
+    def get_router(self):
+        """Cria o roteador de shards a partir das contas conectadas"""
+        if self.shards is None:
+            telegram = self.bot.telegram
+            clients = getattr(telegram, 'user_clients', None) or {}
+            if not clients and telegram.user_client:
+                clients = {'session': telegram.user_client}
+            if clients:
+                self.shards = ShardRouter(clients)
+        return self.shards
+
+    def cursor_key(self, group_id, shard=None):
+        """
+        Supergrupos e canais (-100...) têm IDs de mensagem globais e dividem
+        o cursor; em grupos comuns a numeração é por conta, então cada shard
+        secundário guarda o seu.
+        """
+        group_id = str(group_id)
+        if group_id.startswith('-100') or not shard or shard == self.shards.primary:
+            return group_id
+        return f"{group_id}@{shard}"
 
     # ========================================================
     # CURSOR POR GRUPO
     # ========================================================
 
     def get_last_message_id(self, group_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cur = conn.cursor()
         cur.execute(
             "SELECT last_message_id FROM channel_cursor WHERE group_id = ?",
@@ -50,7 +195,7 @@ class MessageMonitor:
         return row[0] if row else 0
 
     def save_last_message_id(self, group_id, message_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cur = conn.cursor()
         cur.execute(
             """
@@ -66,20 +211,16 @@ class MessageMonitor:
         conn.close()
 
     # ========================================================
-    # URL EXTRACTION (igual ao original)
+    # URL EXTRACTION
     # ========================================================
 
     def extract_urls_from_text(self, text: str) -> list[str]:
-        try:
-            text = text.encode('latin1').decode('utf-8')
-        except Exception:
-            
-            pass
-
-        for ch in ("\u200b", "\u200c", "\u200d", "\ufeff"):
-            text = text.replace(ch, "")
+        # Caminho rápido: mensagem sem indício de link não é normalizada
+        # (invisíveis podem estar escondendo o "http", então também passam)
+        if not text or not (has_link_hint(text) or has_invisible(text)):
+            return []
 
-        urls = URL_REGEX.findall(text)
+        urls = URL_REGEX.findall(normalize_text(text))
         return list(dict.fromkeys(urls))
 
     def canonicalize_url(self, url: str) -> str:
@@ -94,7 +235,7 @@ class MessageMonitor:
     # ========================================================
 
     async def is_message_processed(self, message_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM processed_messages WHERE message_id = ?", (str(message_id),))
         exists = cur.fetchone() is not None
@@ -102,7 +243,7 @@ class MessageMonitor:
         return exists
 
     async def mark_message_as_processed(self, message_id, group_id):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cur = conn.cursor()
         cur.execute(
             "INSERT OR IGNORE INTO processed_messages (message_id, group_jid) VALUES (?, ?)",
@@ -116,7 +257,7 @@ class MessageMonitor:
     # ========================================================
 
     def is_affiliate_domain(self, domain: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cur = conn.cursor()
         cur.execute(
             "SELECT 1 FROM affiliate_domains WHERE domain = ? AND is_active = 1",
@@ -130,37 +271,46 @@ class MessageMonitor:
     # TRACKED LINKS
     # ========================================================
 
-    async def save_tracked_link(self, url, domain, group_id, text):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-
-        try:
-            cur.execute(
-                """
-                INSERT INTO tracked_links (original_url, domain, group_jid, copy_text)
-                VALUES (?, ?, ?, ?)
-                """,
-                (url, domain, str(group_id), text)
-            )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
+    def get_product_key(self, url: str, canonical: str) -> str:
+        """Chave do produto; sem ID reconhecível, cai na URL canônica"""
+        return extract_product_key(url) or canonical
 
     # ========================================================
     # LEITURA DE GRUPO (IGUAL AO ORIGINAL)
     # ========================================================
 
     async def get_group_messages(self, group_id, limit=30):
+        router = self.get_router()
+        if not router:
+            return []
+
+        # Em FloodWait ou queda, o grupo passa para a próxima conta do anel
+        tried = set()
+        while True:
+            shard, client = router.route(group_id, exclude=tried)
+            if not client:
+                logger.warning(f"Nenhuma conta disponível para ler {group_id}")
+                return []
+            tried.add(shard)
+
+            try:
+                return await self._fetch_group_messages(shard, client, group_id, limit)
+            except FloodWaitError as e:
+                logger.warning(f"[{shard}] FloodWait de {e.seconds}s, redistribuindo {group_id}")
+                router.mark_flood_wait(shard, e.seconds)
+            except ValueError as e:
+                # Esta conta não enxerga o grupo; tenta a próxima sem penalizar
+                logger.warning(f"[{shard}] Sem acesso a {group_id}: {e}")
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"[{shard}] Conexão perdida: {e}")
+                router.mark_error(shard)
+
+    async def _fetch_group_messages(self, shard, client, group_id, limit):
         messages = []
-        client = self.bot.telegram.user_client
-        if not client:
-            return messages
+        cursor_key = self.cursor_key(group_id, shard)
 
-        last_id = self.get_last_message_id(group_id)
-        logger.info(f"Last ID---> {last_id}")
+        last_id = self.get_last_message_id(cursor_key)
+        logger.info(f"[{shard}] Last ID---> {last_id}")
         max_id_seen = last_id
 
         async for msg in client.iter_messages(
@@ -180,14 +330,328 @@ class MessageMonitor:
             })
 
         if max_id_seen > last_id:
-            self.save_last_message_id(group_id, max_id_seen)
+            self.save_last_message_id(cursor_key, max_id_seen)
 
+        self.shards.record_fetch(shard, len(messages))
         return messages
 
     # ========================================================
-    # PROCESSAMENTO POR GRUPO
+    # EXTRAÇÃO / CLASSIFICAÇÃO
     # ========================================================
 
+    def message_text(self, msg) -> str:
+        """Texto da mensagem como string (aceita text em dicionário)"""
+        raw_text = msg.get("text", "")
+
+        # Se for dicionário, converter para string
+        if isinstance(raw_text, dict):
+            msg_text = ""
+            for key, value in raw_text.items():
+                if isinstance(value, str):
+                    msg_text += f"{value}\n"
+                elif isinstance(value, (int, float, bool)):
+                    msg_text += f"{value}\n"
+                elif value is not None:
+                    msg_text += f"{str(value)}\n"
+            return msg_text.strip()
+
+        return str(raw_text) if raw_text is not None else ""
+
+    def extract_candidates(self, msg, group_id, group_name='sem_nome') -> list[dict]:
+        """
+        Normaliza o texto, extrai URLs e aplica os filtros (quase-duplicata,
+        produto recente, domínio de afiliado). Retorna os links a persistir.
+        """
+        try:
+            msg_text = self.message_text(msg)
+        except Exception:
+            msg_text = ""
+
+        logger.info(f"[{group_name}|{group_id}] Processando mensagem --> {msg_text}")
+
+        urls = self.extract_urls_from_text(msg_text)
+
+        fingerprint = simhash(msg_text) if urls else 0
+        duplicate_of = self.near_duplicates.find(fingerprint)
+        if duplicate_of and self.near_duplicate_mode == 'skip':
+            logger.info(f"[{group_name}|{group_id}] Quase-duplicata de {duplicate_of}, ignorada")
+            return []
+
+        candidates = []
+        for url in urls:
+            canonical = self.canonicalize_url(url)
+            product_key = self.get_product_key(url, canonical)
+
+            if product_key in self.recent_keys:
+                continue
+
+            domain = self.get_domain(canonical)
+
+            if not self.is_affiliate_domain(domain):
+                continue
+
+            copy = {
+                "text": msg_text,
+                "matchedText": url
+            }
+            if duplicate_of:
+                copy["nearDuplicateOf"] = duplicate_of
+
+            candidates.append({
+                "url": canonical,
+                "domain": domain,
+                "payload": json.dumps(copy, ensure_ascii=False),
+                "product_key": product_key,
+                "fingerprint": fingerprint,
+            })
+
+            # Registrado já na extração para pegar cópias ainda em trânsito
+            self.near_duplicates.add(fingerprint, product_key)
+
+        return candidates
+
+    # ========================================================
+    # PERSISTÊNCIA
+    # ========================================================
+
+    async def persist_candidates(self, msg, group_id, candidates) -> int:
+        """
+        Grava os links e marca a mensagem numa transação só, fora do event
+        loop: enquanto o SQLite escreve, a fila do persist enche e segura o
+        extract (backpressure) em vez de travar a leitura dos grupos.
+        """
+        return await self._persist_bulk(group_id, [(msg, candidates)])
+
+    async def _persist_bulk(self, group_id, items) -> int:
+        """save_tracked_links_bulk com a transação numa thread"""
+        # recent_keys só é lido e atualizado no loop; a thread só fala com o SQLite
+        link_rows, processed_rows = self._bulk_rows(group_id, items)
+        inserted = await asyncio.to_thread(self._insert_bulk, link_rows, processed_rows)
+        self._remember(link_rows)
+        return inserted
+
+    # ========================================================
+    # CARGA EM LOTE (BACKFILL)
+    # ========================================================
+
+    def save_tracked_links_bulk(self, group_id, items) -> int:
+        """
+        Persiste [(msg, candidates)] de um grupo numa única transação.
+        Retorna quantos links novos foram inseridos.
+        """
+        link_rows, processed_rows = self._bulk_rows(group_id, items)
+        inserted = self._insert_bulk(link_rows, processed_rows)
+        self._remember(link_rows)
+        return inserted
+
+    def _bulk_rows(self, group_id, items):
+        link_rows = []
+        processed_rows = []
+        batch_keys = set()
+        for msg, candidates in items:
+            processed_rows.append((str(msg['message_id']), str(group_id)))
+            for c in candidates:
+                # Duplicatas recentes ou dentro do próprio lote
+                if c["product_key"] in batch_keys or c["product_key"] in self.recent_keys:
+                    continue
+                batch_keys.add(c["product_key"])
+                link_rows.append((
+                    c["url"], c["domain"], str(group_id), c["payload"], c["product_key"],
+                    to_signed(c["fingerprint"]) if c["fingerprint"] else None,
+                    c["product_key"],
+                ))
+        return link_rows, processed_rows
+
+    def _remember(self, link_rows):
+        """Só depois do commit: um lote que falhou não vira duplicata em memória"""
+        for row in link_rows:
+            self.recent_keys.add(row[-1])
+
+    def _insert_bulk(self, link_rows, processed_rows) -> int:
+        conn = self._connect()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO tracked_links
+                    (original_url, domain, group_jid, copy_text, product_key, text_simhash)
+                SELECT ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM tracked_links WHERE product_key = ?)
+                """,
+                link_rows
+            )
+            inserted = conn.total_changes - before
+            conn.executemany(
+                "INSERT OR IGNORE INTO processed_messages (message_id, group_jid) VALUES (?, ?)",
+                processed_rows
+            )
+            conn.commit()
+            return inserted
+        finally:
+            conn.close()
+
+    # ========================================================
+    # BACKFILL VIA TAKEOUT
+    # ========================================================
+
+    def _ensure_backfill_table(self):
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+                group_id TEXT PRIMARY KEY,
+                offset_id INTEGER NOT NULL DEFAULT 0,
+                newest_id INTEGER NOT NULL DEFAULT 0,
+                messages INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.commit()
+        conn.close()
+
+    def reset_backfill_checkpoints(self, group_ids):
+        """Descarta o progresso salvo dos grupos (o próximo backfill recomeça do zero)"""
+        self._ensure_backfill_table()
+        conn = self._connect()
+        conn.executemany(
+            "DELETE FROM backfill_checkpoint WHERE group_id = ?",
+            [(str(g),) for g in group_ids]
+        )
+        conn.commit()
+        conn.close()
+
+    def get_backfill_checkpoint(self, group_id):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT offset_id, newest_id, messages, done FROM backfill_checkpoint WHERE group_id = ?",
+            (str(group_id),)
+        ).fetchone()
+        conn.close()
+        if not row:
+            return {'offset_id': 0, 'newest_id': 0, 'messages': 0, 'done': False}
+        return {'offset_id': row[0], 'newest_id': row[1], 'messages': row[2], 'done': bool(row[3])}
+
+    def save_backfill_checkpoint(self, group_id, offset_id, newest_id, messages, done=False):
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT INTO backfill_checkpoint (group_id, offset_id, newest_id, messages, done)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(group_id)
+            DO UPDATE SET offset_id = excluded.offset_id,
+                          newest_id = excluded.newest_id,
+                          messages = excluded.messages,
+                          done = excluded.done,
+                          updated_at = CURRENT_TIMESTAMP
+            """,
+            (str(group_id), int(offset_id), int(newest_id), int(messages), int(done))
+        )
+        conn.commit()
+        conn.close()
+
+    async def backfill_groups(self, groups, since=None, concurrency=3, batch_size=200):
+        """
+        Lê o histórico dos grupos numa sessão de takeout, em paralelo, do mais
+        novo para o mais antigo até `since` (datetime UTC) ou o início do chat.
+        O progresso fica em backfill_checkpoint: uma execução interrompida
+        continua do último lote gravado.
+        """
+        self._ensure_backfill_table()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        try:
+            async with self.bot.telegram.takeout_session() as takeout:
+
+                async def run_one(group):
+                    async with semaphore:
+                        return await self._backfill_group(takeout, group, since, batch_size)
+
+                results = await asyncio.gather(
+                    *(run_one(g) for g in groups), return_exceptions=True
+                )
+        except TakeoutInitDelayError as e:
+            logger.error(
+                "Takeout precisa ser aprovado no app do Telegram "
+                f"(aba Serviços); tente novamente em {e.seconds}s"
+            )
+            return {}
+
+        summary = {}
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                logger.error(f"[{group.get('name')}|{group['id']}] Backfill falhou: {result}")
+                summary[group['id']] = None
+            else:
+                summary[group['id']] = result
+        return summary
+
+    async def _backfill_group(self, takeout, group, since, batch_size):
+        group_id = group['id']
+        group_name = group.get('name', 'sem_nome')
+
+        checkpoint = self.get_backfill_checkpoint(group_id)
+        if checkpoint['done']:
+            logger.info(f"[{group_name}|{group_id}] Backfill já concluído")
+            return checkpoint['messages']
+
+        offset_id = checkpoint['offset_id']
+        newest_id = checkpoint['newest_id']
+        count = checkpoint['messages']
+        batch = []
+
+        async def flush():
+            # Grupos rodam em paralelo com o monitor ao vivo: a escrita vai para uma thread
+            nonlocal batch
+            if batch:
+                await self._persist_bulk(group_id, batch)
+                batch = []
+            await asyncio.to_thread(self.save_backfill_checkpoint, group_id, offset_id, newest_id, count)
+
+        if offset_id:
+            logger.info(f"[{group_name}|{group_id}] Retomando backfill antes de {offset_id}")
+
+        while True:
+            try:
+                async for msg in takeout.iter_messages(group_id, offset_id=offset_id, wait_time=0):
+                    if since and msg.date and msg.date < since:
+                        break
+
+                    newest_id = max(newest_id, msg.id)
+                    offset_id = msg.id
+                    count += 1
+
+                    if msg.text:
+                        message = {"message_id": msg.id, "text": msg.text}
+                        batch.append((message, self.extract_candidates(message, group_id, group_name)))
+
+                    if len(batch) >= batch_size:
+                        await flush()
+                break
+            except FloodWaitError as e:
+                await flush()
+                logger.warning(f"[{group_name}|{group_id}] FloodWait de {e.seconds}s no takeout")
+                await asyncio.sleep(e.seconds)
+
+        await flush()
+        await asyncio.to_thread(
+            self.save_backfill_checkpoint, group_id, offset_id, newest_id, count, done=True
+        )
+        if newest_id:
+            self.advance_cursor(group_id, newest_id)
+
+        logger.info(f"[{group_name}|{group_id}] Backfill concluído: {count} mensagens")
+        return count
+
+    def advance_cursor(self, group_id, message_id):
+        """Move o cursor do grupo para frente (nunca para trás)"""
+        if int(message_id) > self.get_last_message_id(str(group_id)):
+            self.save_last_message_id(str(group_id), message_id)
+
+    # ========================================================
+    # PROCESSAMENTO POR GRUPO
+    # ========================================================
 
     async def process_group_messages(self, group):
         group_id = group['id']
@@ -197,54 +661,9 @@ class MessageMonitor:
 
         messages = await self.get_group_messages(group_id)
         saved = 0
-        msg_text =""
         for msg in messages:
-            try:
-                # Extrair o texto da mensagem
-                raw_text = msg.get("text", "")
-                
-                # Se for dicionário, converter para string
-                if isinstance(raw_text, dict):
-                    # Extrair conteúdo textual do dicionário
-                    msg_text = ""
-                    for key, value in raw_text.items():
-                        if isinstance(value, str):
-                            msg_text += f"{value}\n"
-                        elif isinstance(value, (int, float, bool)):
-                            msg_text += f"{value}\n"
-                        elif value is not None:
-                            msg_text += f"{str(value)}\n"
-                    msg_text = msg_text.strip()
-                else:
-                    msg_text = str(raw_text) if raw_text is not None else ""
-                
-                logger.info(f"[{group_name}|{group_id}] Processando mensagem --> {msg_text}")
-            except :
-                pass
-                
-
-
-            # if await self.is_message_processed(msg['message_id']):
-            #     continue
-
-            urls = self.extract_urls_from_text(msg_text)
-
-            for url in urls:
-                canonical = self.canonicalize_url(url)
-                domain = self.get_domain(canonical)
-
-                if not self.is_affiliate_domain(domain):
-                    continue
-
-                payload = json.dumps({
-                    "text": msg_text,
-                    "matchedText": url
-                }, ensure_ascii=False)
-
-                if await self.save_tracked_link(canonical, domain, group_id, payload):
-                    saved += 1
-
-            await self.mark_message_as_processed(msg['message_id'], group_id)
+            candidates = self.extract_candidates(msg, group_id, group_name)
+            saved += await self.persist_candidates(msg, group_id, candidates)
 
         if saved:
             logger.info(f"[{group_name}|{group_id}] {saved} link(s) salvo(s)")
@@ -257,18 +676,22 @@ class MessageMonitor:
     # LOOP PRINCIPAL (COMPATÍVEL)
     # ========================================================
 
-    async def run(self, groups, interval=60):
-        while True:
-            total = 0
-            for group in groups:
-                try:
-                    total += await self.process_group_messages(group)
-                except Exception as e:
-                    logger.error(f"Erro no grupo {group}: {e}")
-                await asyncio.sleep(2)
-
-            logger.info(f"TOTAL DO CICLO: {total}")
-            await asyncio.sleep(interval)
+    async def run(self, groups, interval=60, **pipeline_options):
+        pipeline = IngestPipeline(self, **pipeline_options)
+        pipeline.start()
+        try:
+            while True:
+                total = await pipeline.run_cycle(groups)
+
+                logger.info(f"TOTAL DO CICLO: {total}")
+                for stage, stats in pipeline.stats().items():
+                    logger.info(f"[pipeline:{stage}] {stats}")
+                if self.shards:
+                    for shard, metrics in self.shards.metrics.items():
+                        logger.info(f"[{shard}] {metrics}")
+                await asyncio.sleep(interval)
+        finally:
+            await pipeline.stop()
 
     def monitor_groups(self, groups, check_interval=60):
         return self.run(groups, interval=check_interval)
@@ -7,12 +7,23 @@ import re
 import json
 import logging
 import os
-import aiohttp
 from io import BytesIO
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
-import tempfile
+from telethon.errors import FloodWaitError
 from _message_monitor import MessageMonitor
+from config import Config
+from fanout import FanOut, required
+from media_cache import MediaCache, content_hash
+from http_client import HttpClient
+from prefetch import ImagePrefetcher
+from image_prep import ImagePreparer, upload_name
+from retry_scheduler import RetryScheduler
+from destination_registry import DestinationRegistry
+from offer_priority import OfferQueue
+from pacing import TargetPacer
+from delivery_ledger import DeliveryLedger, PENDING, SENT
+from message_templates import FALLBACK, TemplateEngine
 
 # Configuração de logging
 logging.basicConfig(
@@ -26,10 +37,57 @@ class TelegramSender:
         self.db_path = db_path
         self.check_interval = check_interval
         from chat_bot import ChatBot
-        self.bot = ChatBot()
+        # Um único cliente HTTP para todos os downloads (pool, DNS, keep-alive)
+        self.http = HttpClient(
+            limit_per_host=Config.HTTP_LIMIT_PER_HOST,
+            connect_timeout=Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+            total_timeout=Config.HTTP_TIMEOUT_SECONDS,
+            retries=Config.HTTP_RETRIES,
+        )
+        self.bot = ChatBot(http=self.http)
         self.telegram_targets = []  # Onde postar
         self.tracking_sources = []  # Onde rastrear
+        self.fanout = FanOut(
+            self.send_message_with_image,
+            policy=Config.DELIVERY_POLICY,
+            quorum=Config.DELIVERY_QUORUM,
+            concurrency=Config.FANOUT_CONCURRENCY,
+        )
+        # Imagens dos próximos links baixadas enquanto o atual é entregue
+        self.prefetcher = ImagePrefetcher(
+            self.bot.image_cache, self.http, depth=Config.IMAGE_PREFETCH_DEPTH, cdn=self.bot.cdn
+        )
+        # WebP grande -> JPEG no tamanho útil, fora do loop de eventos
+        self.image_preparer = ImagePreparer(
+            workers=Config.IMAGE_PREP_WORKERS,
+            max_side=Config.IMAGE_MAX_SIDE,
+            target_bytes=Config.IMAGE_TARGET_KB * 1024,
+        )
+        # Handles de imagens já enviadas, reaproveitados entre destinos
+        self.media_cache = MediaCache(ttl=Config.MEDIA_CACHE_TTL_SECONDS)
+        # Templates compilados uma vez; texto de cada link fica em cache
+        self.templates = TemplateEngine()
+        self.template_name = Config.TELEGRAM_MESSAGE_TEMPLATE
+        if self.template_name not in self.templates.templates:
+            logger.warning(f"Template '{self.template_name}' desconhecido; usando 'default'")
+            self.template_name = 'default'
         self._init_db()
+        # Cota diária e intervalo mínimo por destino
+        self.pacer = TargetPacer(db_path)
+        # Reenvios de destinos em FloodWait (persistidos entre reinícios), dentro da cota do pacer
+        self.retry_scheduler = RetryScheduler(
+            db_path, self._send_retry, self.bot.rate_limiter, ready_at=self.pacer.ready_at
+        )
+        # Links prontos por nota (desconto, cupom, frescor, grupo de origem)
+        self.offers = OfferQueue(db_path)
+        # Estado de entrega por (link, destino): reenvio só para quem faltou
+        self.ledger = DeliveryLedger(db_path, max_attempts=Config.DELIVERY_MAX_ATTEMPTS)
+        # Destinos em SQLite + memória, atualizados por eventos em vez de varredura
+        self.destinations = DestinationRegistry(
+            db_path, self.bot,
+            ttl=Config.DESTINATION_CACHE_TTL_SECONDS,
+            rescan_interval=Config.DESTINATION_RESCAN_HOURS * 3600,
+        )
 
     def _init_db(self):
         """Cria tabelas de suporte se não existirem"""
@@ -45,12 +103,17 @@ class TelegramSender:
         conn.close()
 
     async def initialize(self):
-        return await self.bot.initialize()
+        if not await self.bot.initialize():
+            return False
+        self.destinations.attach()
+        # Envios interrompidos por uma queda: confere no histórico antes de reenviar
+        await self.ledger.reconcile(self.bot.telegram.user_client, Config.RECONCILE_HISTORY_LIMIT)
+        return True
 
     async def refresh_telegram_targets(self):
         """Lógica CORRIGIDA: considerar canais onde pode postar"""
         try:
-            all_chats = await self.bot.list_groups(include_channels=True, limit=100)
+            all_chats = await self.destinations.groups()
             
             # Consulta preferências manuais
             conn = sqlite3.connect(self.db_path)
@@ -99,26 +162,10 @@ class TelegramSender:
             return [], []
 
     def get_new_sent_links(self):
-        """Busca links prontos para envio"""
+        """Busca links prontos para envio, os de maior prioridade primeiro"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                SELECT tl.id, tl.affiliate_link, tl.metadata, tl.copy_text
-                FROM tracked_links tl
-                WHERE tl.status = 'ready'
-                AND tl.affiliate_link IS NOT NULL
-                AND tl.affiliate_link != ''
-                AND NOT EXISTS (
-                    SELECT 1 FROM telegram_sent ts
-                    WHERE ts.tracked_link_id = tl.id
-                )
-                LIMIT 5
-            """)
-
-            results = cursor.fetchall()
-            conn.close()
+            self.offers.refresh()
+            results = self.offers.take(5)
 
             if results:
                 print(f"🔍 {len(results)} link(s) com status='ready' encontrado(s)")
@@ -132,6 +179,24 @@ class TelegramSender:
             logger.error(f"Erro ao buscar links: {e}")
             return []
 
+    def peek_ready_links(self, limit):
+        """Metadata dos próximos links prontos (mesma fila de get_new_sent_links)"""
+        try:
+            return [row[0] for row in self.offers.take(limit, columns=('metadata',))]
+        except Exception as e:
+            logger.error(f"Erro ao consultar próximos links: {e}")
+            return []
+
+    @staticmethod
+    def image_url_from_metadata(metadata):
+        if not metadata:
+            return None
+        try:
+            meta = json.loads(metadata)
+        except (TypeError, ValueError):
+            return None
+        return meta.get('product_image') or meta.get('image')
+
     def _debug_link_status(self):
         """Debug: mostra status dos links no banco"""
         try:
@@ -202,15 +267,16 @@ class TelegramSender:
             print(f"❌ Erro ao buscar metadata: {e}")
             return None
 
-    def mark_as_sent(self, link_id):
-        """Registra envio no banco"""
+    def mark_as_sent(self, link_id, success=True, error=None):
+        """Registra envio no banco (success=False encerra o link sem entrega)"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
             cursor.execute("""
-                INSERT OR IGNORE INTO telegram_sent (tracked_link_id) VALUES (?)
-            """, (link_id,))
+                INSERT OR IGNORE INTO telegram_sent (tracked_link_id, success, error_message)
+                VALUES (?, ?, ?)
+            """, (link_id, success, error))
 
             conn.commit()
             conn.close()
@@ -220,71 +286,28 @@ class TelegramSender:
             logger.error(f"Erro ao marcar como enviado: {e}")
             return False
 
-    def create_message(self, affiliate_link, metadata, copy_text=None):
-        if not metadata:
-            return f"🛍️ Oferta Especial\n\n🔗 {affiliate_link}"
-
+    def create_message(self, affiliate_link, metadata, copy_text=None, link_id=None):
+        """Texto da oferta no template configurado (em cache por link_id)"""
         try:
-            meta = json.loads(metadata)
-
-            title = meta.get("product_title") or meta.get("title") or "Oferta imperdível"
-            price = meta.get("product_price")
-            coupon = meta.get("cupom")
-            ai_desc = meta.get("ai_description")
-
-            parts = []
-
-            # 📦 Título
-            parts.append(f"📦 {title}")
-            parts.append("")
-
-            # ✨ Descrição boa (ignora description lixo)
-            if ai_desc:
-                parts.append(f"✨ {ai_desc}")
-                parts.append("")
-
-            # 💰 Preço
-            if price:
-                try:
-                    parts.append(f"💰 Preço: R$ {float(price):.2f}")
-                    parts.append("")
-                except:
-                    parts.append(f"💰 Preço: R$ {price}")
-                    parts.append("")
-
-            # 🎟 Cupom
-            if coupon:
-                parts.append(f"🎟 Cupom de desconto: {coupon}")
-                parts.append("")
-
-            # 🛒 CTA
-            parts.append("🛒 Comprar agora:")
-            parts.append(f"👉 {affiliate_link}")
-            parts.append("")
-            parts.append("🛡️ Compra segura")
-
-            return "\n".join(parts)
-
+            return self.templates.render(self.template_name, affiliate_link, metadata, link_id)
         except Exception as e:
             logger.error(f"Erro ao montar mensagem: {e}")
-            return f"🛍️ Oferta Especial\n\n🔗 {affiliate_link}"
-
-
+            return FALLBACK.format(link=affiliate_link)
 
     async def extract_and_download_image(self, image_url):
-        """Baixa imagem de uma URL e retorna os bytes"""
+        """Baixa imagem de uma URL e retorna os bytes já preparados para upload"""
         if not image_url or image_url.startswith('data:image/'):
             return None
             
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url, timeout=10) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        return BytesIO(image_data)
-                    else:
-                        print(f"⚠️  Erro ao baixar imagem: HTTP {response.status}")
-                        return None
+            image_data = await self.prefetcher.get(image_url)
+            if image_data is None:
+                print(f"⚠️  Imagem indisponível (falha no download ou em cache negativo)")
+                return None
+            prepared = await self.image_preparer.prepare(image_data)
+            buffer = BytesIO(prepared)
+            buffer.name = upload_name(prepared)
+            return buffer
         except Exception as e:
             print(f"⚠️  Erro ao baixar imagem: {e}")
             return None
@@ -304,42 +327,73 @@ class TelegramSender:
             if not image_data:
                 return await self.send_to_target(target, message)
 
-            import tempfile
-            import os
+            # getvalue() de um BytesIO intacto não copia os bytes
+            data = image_data.getvalue()
+            name = getattr(image_data, 'name', None) or upload_name(data)
+            key = content_hash(data)
+            self.media_cache.naive_bytes += len(data)
 
-            # Cria arquivo temporário da imagem
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-                image_data.seek(0)
-                tmp.write(image_data.read())
-                tmp_path = tmp.name
+            client = self.bot.telegram.bot_client
+            media, fresh = await self._get_media(client, key, data, name)
 
+            await self.bot.rate_limiter.acquire(chat_id)
             try:
                 # Envio único com a legenda real
-                result = await self.bot.telegram.bot_client.send_file(
+                result = await client.send_file(
                     chat_id,
-                    tmp_path,
+                    media,
                     caption=message #[:1024]  # Telegram costuma aceitar até ~1024 chars em caption
                 )
-                
-                # Log message
-                self.bot._log_message(chat_id, message, as_bot=True, success=result is not None)
-
-                return result is not None
-
-            finally:
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
-
+            except FloodWaitError:
+                raise
+            except Exception as e:
+                if fresh:
+                    raise
+                # Handle do cache pode ter vencido no servidor: sobe de novo uma vez
+                logger.warning(f"Mídia em cache recusada ({e}), refazendo upload")
+                self.media_cache.invalidate(key)
+                media, _ = await self._get_media(client, key, data, name)
+                # O reenvio é outra mensagem para o chat: passa pelo limitador de novo
+                await self.bot.rate_limiter.acquire(chat_id)
+                result = await client.send_file(chat_id, media, caption=message)
+
+            # A foto da mensagem enviada é reutilizável sem novo upload
+            if result is not None and getattr(result, 'photo', None):
+                self.media_cache.put(key, result.photo)
+
+            # Log message
+            self.bot._log_message(chat_id, message, as_bot=True, success=result is not None)
+
+            # A Message enviada (o fan-out guarda o id dela no registro de entrega)
+            return result if result is not None else False
+
+        except FloodWaitError as e:
+            print(f"⏳ FloodWait de {e.seconds}s em {target.get('name')}")
+            self.bot.rate_limiter.penalize(target["id"], e.seconds)
+            return False
         except Exception as e:
             print(f"Erro ao enviar imagem: {e}")
             return False
 
-    
+    async def _get_media(self, client, key, data, name):
+        """Handle da imagem no Telegram: do cache ou de um upload novo"""
+        async with self.media_cache.lock(key):
+            media = self.media_cache.get(key)
+            if media is not None:
+                self.media_cache.hits += 1
+                return media, False
+
+            self.media_cache.misses += 1
+            # Upload direto dos bytes em memória, sem arquivo temporário
+            media = await client.upload_file(data, file_name=name)
+
+            self.media_cache.uploaded_bytes += len(data)
+            self.media_cache.put(key, media)
+            return media, True
+
     async def send_to_target(self, target, message):
         """Envia mensagem para um destino"""
         try:
-            await asyncio.sleep(1)  # Anti-flood básico
-            
             # CONVERTE para inteiro
             chat_id = int(target["id"])
 
@@ -347,12 +401,13 @@ class TelegramSender:
                 chat_id,  # Já é inteiro
                 message,
                 as_bot=True,
-                parse_mode='markdown'
+                parse_mode='markdown',
+                return_message=True
             )
 
-            self.bot._log_message(chat_id, message, as_bot=True, success=success)
+            self.bot._log_message(chat_id, message, as_bot=True, success=bool(success))
 
-            return bool(success)
+            return success or False
 
         except Exception as e:
             logger.error(f"Erro ao enviar para {target['name']}: {e}")
@@ -371,10 +426,42 @@ class TelegramSender:
             return 0
 
         logger.info(f"📤 Preparando envio de {len(new_links)} link(s)")
+        self.pacer.sync_targets(self.telegram_targets)
+
+        # Baixa em paralelo as imagens deste lote e dos próximos links
+        self.prefetcher.schedule([
+            self.image_url_from_metadata(m) for m in self.peek_ready_links(self.prefetcher.depth)
+        ])
 
         sent_count = 0
 
-        for link_id, affiliate_link, metadata, copy_text in new_links:
+        for position, (link_id, affiliate_link, metadata, copy_text) in enumerate(new_links):
+            # Só os destinos que ainda não receberam o link entram no envio
+            deliveries = self.ledger.for_link(link_id)
+            missing = self.ledger.missing(link_id, self.telegram_targets, deliveries)
+            if not missing:
+                if not any(d['state'] == PENDING for d in deliveries.values()):
+                    self._close_link(link_id, deliveries)
+                continue
+
+            # ...e, entre eles, só os com cota e intervalo livres
+            due = set(self.pacer.due())
+            if not due:
+                wait = self.pacer.seconds_until_next()
+                when = f"próximo em {wait:.0f}s" if wait is not None else "nenhum ativo"
+                print(f"⏸️  Nenhum destino liberado (cota/intervalo; {when}); "
+                      f"{len(new_links) - position} link(s) ficam para depois")
+                break
+            targets = [t for t in missing if str(t['id']) in due]
+            for target_id in due - {str(t['id']) for t in targets}:
+                self.pacer.done(target_id, sent=False)  # já recebeu este link
+            self.pacer.defer(len(missing) - len(targets))
+            if not targets:
+                continue
+            if deliveries:
+                print(f"🔁 Link {link_id}: reenvio só para {len(targets)} destino(s) pendente(s) "
+                      f"({self.ledger.summary(link_id, deliveries)})")
+
             # Extrai imagem do metadata se disponível
             image_url = None
             image_data = None
@@ -398,7 +485,7 @@ class TelegramSender:
                     print(f"⚠️  Erro ao extrair imagem: {e}")
             
             # Cria mensagem ENRIQUECIDA
-            message = self.create_message(affiliate_link, metadata, copy_text)
+            message = self.create_message(affiliate_link, metadata, copy_text, link_id)
             
             # DEBUG: Mostra preview da mensagem
             print(f"\n📨 MENSAGEM GERADA (link {link_id}):")
@@ -406,39 +493,132 @@ class TelegramSender:
             print(message[:300] + "..." if len(message) > 300 else message)
             print("-" * 40)
             
-            # Tenta enviar para cada destino
-            target_success = False
-            for target in self.telegram_targets[:3]:  # Limita a 3 destinos por link
-                try:
-                    print(f"  📤 Enviando para: {target.get('name', 'Desconhecido')}")
-                    
-                    # Envia mensagem COM ou SEM imagem - PASSANDO image_url
-                    success = await self.send_message_with_image(target, message, image_data, image_url)
-                    
-                    if success:
-                        target_success = True
-                        print(f"  ✅ Sucesso!")
-                    else:
-                        print(f"  ❌ Falha no envio")
-                    
-                    await asyncio.sleep(20)  # Pausa entre envios
-                    
-                except Exception as e:
-                    logger.error(f"Falha no envio para {target.get('name')}: {e}")
+            # Destinos estacionados por FloodWait vão direto para a fila deles
+            ready = []
+            for target in targets:
+                if self.retry_scheduler.parked_for(target['id']) > 0:
+                    self.retry_scheduler.enqueue(target, link_id, message, image_url)
+                    self.ledger.mark_queued(link_id, target, 'FloodWait')
+                    self.pacer.done(target['id'], sent=False)
+                    print(f"    {target.get('name')}: ⏳ em FloodWait, enfileirado")
+                else:
+                    ready.append(target)
+
+            # Envia para todos os destinos ao mesmo tempo
+            print(f"  📤 Enviando para {len(ready)} destino(s)...")
+            uploaded_before, naive_before = self.media_cache.snapshot()
+            self.ledger.begin(link_id, ready)
+            result = await self.fanout.deliver(ready, message, image_data, image_url)
+
+            if image_data:
+                uploaded, naive = self.media_cache.snapshot()
+                print(f"  📦 Upload da imagem: {(uploaded - uploaded_before) / 1024:.1f} KB "
+                      f"(um upload por destino seria {(naive - naive_before) / 1024:.1f} KB)")
+
+            self.ledger.record(link_id, [
+                (target, r['ok'], r['message_id'], r['error'])
+                for target, r in ((t, result.results[t['id']]) for t in ready)
+            ])
+
+            for target in ready:
+                r = result.results[target['id']]
+                status = "✅ Sucesso!" if r['ok'] else f"❌ Falha no envio{': ' + r['error'] if r['error'] else ''}"
+                print(f"    {r['name']}: {status} ({r['elapsed']}s)")
+                self.pacer.done(target['id'], sent=r['ok'])
+                if r['ok']:
                     continue
-            
-            # Se enviou para pelo menos um destino, marca como enviado
-            if target_success:
+
+                # FloodWait: estaciona só este destino e reenvia depois do prazo
+                flood = self.bot.rate_limiter.blocked_for(target['id'])
+                if flood > 0:
+                    self.retry_scheduler.park(target['id'], flood, target.get('name'))
+                    self.retry_scheduler.enqueue(target, link_id, message, image_url)
+                    self.ledger.mark_queued(link_id, target, 'FloodWait')
+                else:
+                    # Outras falhas: só este destino volta, com backoff
+                    self.retry_scheduler.enqueue(
+                        target, link_id, message, image_url, delay=RetryScheduler.BACKOFF_BASE
+                    )
+                    self.ledger.mark_queued(link_id, target)
+
+            # Marca como enviado quando a política de entrega é atendida entre
+            # todos os destinos, não só os liberados neste ciclo
+            sent, needed = self._delivery_progress(self.ledger.for_link(link_id))
+            if sent and sent >= needed:
                 self.mark_as_sent(link_id)
                 sent_count += 1
-                print(f"✅ Link {link_id} marcado como enviado")
+                print(f"✅ Link {link_id} marcado como enviado ({result.summary()}; "
+                      f"{sent}/{needed} exigidos)")
             else:
-                print(f"❌ Link {link_id} não foi enviado para nenhum destino")
-            
-            # Pausa maior entre links diferentes
-            await asyncio.sleep(5)
-
+                print(f"⏳ Link {link_id} ainda não atingiu a política '{result.policy}' "
+                      f"({result.summary()}; {sent}/{needed} exigidos); segue aberto para "
+                      f"os destinos pendentes e a fila de reenvio")
+
+        self.media_cache.purge()
+        self.pacer.flush()
+        logger.info(f"⏱️ Rate limiter: {self.bot.rate_limiter.stats()}")
+        logger.info(f"📦 Cache de mídia: {self.media_cache.stats()}")
+        logger.info(f"🖼️ Cache de imagens: {self.bot.image_cache.stats()}")
+        logger.info(f"🔮 Pré-busca: {self.prefetcher.stats()}")
+        logger.info(f"✂️ Variantes do CDN: {self.bot.cdn.stats()}")
+        logger.info(f"🧪 Preparação de imagens: {self.image_preparer.stats()}")
+        logger.info(f"🌐 HTTP: {self.http.stats()}")
+        logger.info(f"📇 Registro de destinos: {self.destinations.stats()}")
+        logger.info(f"🏷️ Fila de ofertas: {self.offers.stats()}")
+        logger.info(f"🚦 Cotas por destino: {self.pacer.stats()}")
+        logger.info(f"📝 Templates: {self.templates.stats()}")
         return sent_count
+
+    def _close_link(self, link_id, deliveries):
+        """Nenhum destino pode mais receber o link: encerra com o que foi entregue"""
+        summary = self.ledger.summary(link_id, deliveries)
+        delivered = summary[SENT] > 0
+        self.mark_as_sent(link_id, success=delivered,
+                          error=None if delivered else 'tentativas esgotadas em todos os destinos')
+        print(f"{'✅' if delivered else '❌'} Link {link_id} encerrado ({summary})")
+
+    async def _send_retry(self, job):
+        """Reenvio de um job da fila de FloodWait"""
+        if self.ledger.is_sent(job.link_id, job.target['id']):
+            # Já entregue (confirmado na reconciliação): não repete
+            return True
+
+        image_data = None
+        if job.image_url:
+            image_data = await self.extract_and_download_image(job.image_url)
+
+        self.ledger.begin(job.link_id, [job.target])
+        success = await self.send_message_with_image(job.target, job.message, image_data, job.image_url)
+        self.ledger.record(job.link_id, [(job.target, bool(success), getattr(success, 'id', None), None)])
+        if success:
+            self.pacer.record(job.target['id'])
+        self._settle_link(job.link_id)
+        return success
+
+    def _settle_link(self, link_id):
+        """
+        Depois de um reenvio: encerra o link se a política de entrega foi
+        atendida entre os destinos tentados ou se nenhum ainda pode receber.
+        """
+        deliveries = self.ledger.for_link(link_id)
+        if not deliveries or any(d['state'] == PENDING for d in deliveries.values()):
+            return  # outro envio do link ainda em andamento
+        sent, needed = self._delivery_progress(deliveries)
+        if sent and sent >= needed:
+            self.mark_as_sent(link_id)
+            print(f"✅ Link {link_id} marcado como enviado após reenvio "
+                  f"({sent}/{needed} exigidos)")
+        elif not self.ledger.missing(link_id, self.telegram_targets, deliveries):
+            self._close_link(link_id, deliveries)
+
+    def _delivery_progress(self, deliveries):
+        """
+        (confirmados, exigidos) da política de entrega sobre todos os
+        destinos atuais, inclusive os que o pacer ainda não liberou.
+        """
+        ids = {str(t['id']) for t in self.telegram_targets}
+        sent = sum(1 for tid, d in deliveries.items() if tid in ids and d['state'] == SENT)
+        return sent, required(self.fanout.policy, self.fanout.quorum, len(ids))
         
     async def test_message_generation(self):
         """Testa a geração de mensagens com metadata de exemplo"""
@@ -514,6 +694,9 @@ class TelegramSender:
             )
             print(f"\n📡 Monitoramento iniciado em {len(tracking)} grupos")
 
+        # Fila de reenvio (FloodWait) em segundo plano
+        retry_task = asyncio.create_task(self.retry_scheduler.run())
+
         # 5. Loop de Envio
         print(f"\n🎯 {len(destinations)} destinos configurados para envio")
         print("⏰ Intervalo de verificação: {} segundos".format(self.check_interval))
@@ -525,6 +708,9 @@ class TelegramSender:
                 cycle_count += 1
                 print(f"\n🔄 Ciclo #{cycle_count} - {datetime.now().strftime('%H:%M:%S')}")
                 
+                # Barato: vem do registro em memória, já atualizado pelos eventos
+                destinations, tracking = await self.refresh_telegram_targets()
+                
                 if self.telegram_targets:
                     sent = await self.process_and_send_links()
                     if sent > 0: 
@@ -534,14 +720,25 @@ class TelegramSender:
                 else:
                     print("⚠️  Nenhum destino configurado para envio")
                     print("   Aguardando destinos...")
-                    # Tenta recarregar destinos
-                    destinations, tracking = await self.refresh_telegram_targets()
                 
-                print(f"⏳ Próxima verificação em {self.check_interval} segundos...")
-                await asyncio.sleep(self.check_interval)
+                flood_stats = self.retry_scheduler.stats()
+                if flood_stats:
+                    print(f"🧊 FloodWait por destino: {flood_stats}")
+
+                # Com links na fila, acorda quando o próximo destino liberar
+                delay = self.check_interval
+                next_free = self.pacer.seconds_until_next()
+                if self.offers.stats()['queued'] and next_free is not None:
+                    delay = min(delay, max(1, int(next_free) + 1))
+                print(f"⏳ Próxima verificação em {delay} segundos...")
+                await asyncio.sleep(delay)
                 
         except KeyboardInterrupt:
             print("\n\n🛑 Interrupção solicitada pelo usuário")
+            retry_task.cancel()
+            self.prefetcher.cancel()
+            self.pacer.flush()
+            self.image_preparer.shutdown()
             if monitor_task: 
                 monitor_task.cancel()
                 print("📡 Monitoramento interrompido")
@@ -549,6 +746,10 @@ class TelegramSender:
             print("🤖 Bot desconectado")
         except Exception as e:
             print(f"\n❌ Erro fatal no loop principal: {e}")
+            retry_task.cancel()
+            self.prefetcher.cancel()
+            self.pacer.flush()
+            self.image_preparer.shutdown()
             if monitor_task: 
                 monitor_task.cancel()
             await self.bot.disconnect()
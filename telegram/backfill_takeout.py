@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Backfill de histórico via sessão de takeout do Telegram.
+
+Para grupos que não dá para exportar pelo Telegram Desktop. A sessão de
+takeout tem limites de leitura bem maiores que a API comum; os grupos são
+lidos em paralelo e o progresso de cada um fica salvo, então basta rodar de
+novo para retomar uma execução interrompida.
+
+Execute:
+    python backfill_takeout.py -1001234567890 -1009876543210 --since 2025-06-01
+    python backfill_takeout.py --tracked          # grupos marcados como 'rastreio'
+    python backfill_takeout.py --tracked --reset  # recomeça do zero
+"""
+import argparse
+import asyncio
+import logging
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+from chat_bot import ChatBot
+from _message_monitor import MessageMonitor
+
+
+def tracked_groups(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT chat_id FROM chat_preferences WHERE purpose = 'rastreio'"
+    ).fetchall()
+    conn.close()
+    return [int(row[0]) for row in rows]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Backfill de grupos via takeout')
+    parser.add_argument('groups', nargs='*', type=int, help='IDs dos grupos')
+    parser.add_argument('--tracked', action='store_true', help="Inclui os grupos de 'rastreio'")
+    parser.add_argument('--since', help='Para ao chegar nesta data (AAAA-MM-DD)')
+    parser.add_argument('--concurrency', type=int, default=3, help='Grupos em paralelo')
+    parser.add_argument('--batch-size', type=int, default=200, help='Mensagens por checkpoint')
+    parser.add_argument('--reset', action='store_true', help='Descarta checkpoints anteriores')
+    parser.add_argument('--db', default='../database/affiliate.db', help='Banco SQLite')
+    args = parser.parse_args()
+
+    logging.getLogger('_message_monitor').setLevel(logging.WARNING)
+
+    group_ids = list(args.groups)
+    if args.tracked:
+        group_ids += [g for g in tracked_groups(args.db) if g not in group_ids]
+
+    if not group_ids:
+        print("❌ Nenhum grupo informado")
+        return 1
+
+    since = None
+    if args.since:
+        since = datetime.strptime(args.since, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+    bot = ChatBot()
+    if not await bot.initialize():
+        return 1
+
+    try:
+        monitor = MessageMonitor(args.db, bot)
+        if args.reset:
+            monitor.reset_backfill_checkpoints(group_ids)
+
+        groups = []
+        for gid in group_ids:
+            try:
+                entity = await bot.telegram.user_client.get_entity(gid)
+                groups.append({'id': gid, 'name': getattr(entity, 'title', str(gid))})
+            except Exception as e:
+                print(f"⚠️  Grupo {gid} inacessível: {e}")
+
+        print(f"\n📚 Backfill de {len(groups)} grupo(s) via takeout...")
+        summary = await monitor.backfill_groups(
+            groups, since=since, concurrency=args.concurrency, batch_size=args.batch_size
+        )
+
+        print("\n" + "=" * 50)
+        for group in groups:
+            count = summary.get(group['id'])
+            status = f"{count} mensagens" if count is not None else "❌ falhou"
+            print(f"  {group['name']} [{group['id']}]: {status}")
+        print("=" * 50)
+        return 0
+    finally:
+        await bot.disconnect()
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da normalização/extração de URLs do MessageMonitor.
+
+Compara a versão antiga (latin1->utf-8 em toda mensagem + 4 str.replace)
+com o caminho rápido atual sobre um corpus de mensagens.
+
+Execute:
+    python bench_normalize.py                       # usa message_log.csv
+    python bench_normalize.py --jsonl mensagens.jsonl --repeat 20
+"""
+import argparse
+import csv
+import json
+import time
+
+from _message_monitor import URL_REGEX, has_link_hint, has_invisible, normalize_text
+
+
+def legacy_extract(text):
+    """Implementação anterior de extract_urls_from_text"""
+    try:
+        text = text.encode('latin1').decode('utf-8')
+    except Exception:
+        pass
+
+    for ch in ("\u200b", "\u200c", "\u200d", "\ufeff"):
+        text = text.replace(ch, "")
+
+    return list(dict.fromkeys(URL_REGEX.findall(text)))
+
+
+def fast_extract(text):
+    """Mesmo caminho de MessageMonitor.extract_urls_from_text"""
+    if not text or not (has_link_hint(text) or has_invisible(text)):
+        return []
+    return list(dict.fromkeys(URL_REGEX.findall(normalize_text(text))))
+
+
+def load_corpus(csv_path=None, jsonl_path=None):
+    texts = []
+    if jsonl_path:
+        with open(jsonl_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    texts.append(str(json.loads(line).get('text') or ''))
+    else:
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                texts.append(row.get('message_preview') or '')
+    return texts
+
+
+def bench(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de normalização de mensagens')
+    parser.add_argument('--csv', default='message_log.csv', help='CSV com coluna message_preview')
+    parser.add_argument('--jsonl', help='JSONL com campo "text" por linha')
+    parser.add_argument('--repeat', type=int, default=10, help='Repetições (vale a melhor)')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.csv, args.jsonl)
+    if not texts:
+        print("📭 Corpus vazio")
+        return
+
+    with_links = sum(1 for t in texts if fast_extract(t))
+    mismatches = sum(1 for t in texts if legacy_extract(t) != fast_extract(t))
+
+    legacy = bench(legacy_extract, texts, args.repeat)
+    fast = bench(fast_extract, texts, args.repeat)
+
+    print("=" * 60)
+    print(f"📊 Corpus: {len(texts)} mensagens ({with_links} com links)")
+    print("=" * 60)
+    print(f"  Antigo : {legacy / len(texts) * 1e6:8.2f} µs/msg  ({len(texts) / legacy:,.0f} msg/s)")
+    print(f"  Rápido : {fast / len(texts) * 1e6:8.2f} µs/msg  ({len(texts) / fast:,.0f} msg/s)")
+    print(f"  Ganho  : {legacy / fast:.2f}x")
+    print(f"  Resultados divergentes: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da montagem das mensagens de oferta.
+
+Compara a montagem antiga (create_message feita à mão, metadata lido a
+cada chamada) com o TemplateEngine sem cache (template já compilado) e
+com o cache por link, sobre o metadata dos links do banco. Para 'default'
+e 'legacy' também conta os textos que divergem da montagem antiga.
+
+O banco é aberto só para leitura; sem banco, use --synthetic.
+
+Execute:
+    python bench_templates.py                              # ../database/affiliate.db
+    python bench_templates.py --db outro.db --template rich --repeat 20
+    python bench_templates.py --synthetic                  # links sintéticos, sem banco
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from message_templates import TEMPLATES, TemplateEngine
+
+SAMPLE = {
+    "product_title": "Kit Condor Masculino Speed Dourado - Co2115mwd/k4p Fundo Preto",
+    "product_price": 179.99,
+    "price_original": 339,
+    "cupom": "CONDOR10",
+    "ai_description": "⚡️ Design dourado que chama atenção e fundo preto que combina com tudo.",
+}
+
+
+def legacy_create_message(affiliate_link, metadata):
+    """Implementação anterior de TelegramSender.create_message"""
+    if not metadata:
+        return f"🛍️ Oferta Especial\n\n🔗 {affiliate_link}"
+
+    meta = json.loads(metadata)
+    title = meta.get("product_title") or meta.get("title") or "Oferta imperdível"
+    price = meta.get("product_price")
+    coupon = meta.get("cupom")
+    ai_desc = meta.get("ai_description")
+
+    parts = [f"📦 {title}", ""]
+    if ai_desc:
+        parts += [f"✨ {ai_desc}", ""]
+    if price:
+        try:
+            parts += [f"💰 Preço: R$ {float(price):.2f}", ""]
+        except (TypeError, ValueError):
+            parts += [f"💰 Preço: R$ {price}", ""]
+    if coupon:
+        parts += [f"🎟 Cupom de desconto: {coupon}", ""]
+    parts += ["🛒 Comprar agora:", f"👉 {affiliate_link}", "", "🛡️ Compra segura"]
+    return "\n".join(parts)
+
+
+def legacy_sender_message(affiliate_link, metadata):
+    """Implementação anterior do telegram_sender (eval trocado por json.loads)"""
+    meta = json.loads(metadata) if metadata else {}
+    product_title = meta.get('product_title', 'Oferta Especial')
+
+    return (
+        f"🛍️ **{product_title}**\n\n"
+        f"🔗 {affiliate_link}\n\n"
+        f"⚡ Oferta exclusiva do grupo!\n"
+        f"✅ Compra 100% segura\n"
+        f"🚚 Entrega para todo Brasil\n\n"
+        f"📊 *Recomendação validada pelo sistema*"
+    )
+
+
+# Casos de borda somados aos links na checagem de divergência
+EDGE_METADATA = (
+    None,                                                  # FALLBACK
+    json.dumps({"product_title": "Só coupon", "coupon": "X10"}),  # chave que o antigo não lia
+)
+
+# Montagem antiga de cada template que a substituiu
+REFERENCE = {
+    'default': legacy_create_message,
+    'legacy': legacy_sender_message,
+}
+
+
+def synthetic_links(limit):
+    """Links sintéticos com o mesmo formato de metadata"""
+    return [
+        (i, f"https://mercadolivre.com/sec/{i:07d}", json.dumps({**SAMPLE, "product_price": 100 + i}))
+        for i in range(limit)
+    ]
+
+
+def load_links(db_path, limit):
+    """Links com metadata do banco (somente leitura: nunca cria o arquivo)"""
+    if not os.path.isfile(db_path):
+        sys.exit(f"❌ Banco não encontrado: {db_path} (use --db ou --synthetic)")
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("""
+                SELECT id, affiliate_link, metadata FROM tracked_links
+                WHERE affiliate_link IS NOT NULL AND metadata IS NOT NULL AND metadata != ''
+                LIMIT ?
+            """, (limit,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        sys.exit(f"❌ Erro ao ler {db_path}: {e}")
+    if not rows:
+        sys.exit(f"❌ Nenhum link com metadata em {db_path} (use --synthetic)")
+    return rows
+
+
+def bench(fn, links, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for link_id, affiliate_link, metadata in links:
+            fn(link_id, affiliate_link, metadata)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de renderização de mensagens')
+    parser.add_argument('--db', default='../database/affiliate.db', help='Banco com tracked_links')
+    parser.add_argument('--limit', type=int, default=1000, help='Links lidos do banco')
+    parser.add_argument('--template', default='default', choices=sorted(TEMPLATES))
+    parser.add_argument('--repeat', type=int, default=10, help='Repetições (vale a melhor)')
+    parser.add_argument('--synthetic', action='store_true', help='Links sintéticos em vez do banco')
+    args = parser.parse_args()
+
+    links = synthetic_links(args.limit) if args.synthetic else load_links(args.db, args.limit)
+    engine = TemplateEngine(cache_size=len(links))
+
+    reference = REFERENCE.get(args.template, legacy_create_message)
+    mismatches = 0
+    if args.template in REFERENCE:
+        edge = [(None, links[0][1], meta) for meta in EDGE_METADATA]
+        mismatches = sum(
+            1 for _, link, meta in links + edge
+            if reference(link, meta) != engine.render(args.template, link, meta)
+        )
+
+    legacy = bench(lambda i, link, meta: reference(link, meta), links, args.repeat)
+    compiled = bench(lambda i, link, meta: engine.render(args.template, link, meta), links, args.repeat)
+    cached = bench(lambda i, link, meta: engine.render(args.template, link, meta, i), links, args.repeat)
+
+    n = len(links)
+    print("=" * 60)
+    print(f"📊 {n} link(s), template '{args.template}'")
+    print("=" * 60)
+    print(f"  Antigo    : {legacy / n * 1e6:8.2f} µs/msg  ({n / legacy:,.0f} renders/s)")
+    print(f"  Compilado : {compiled / n * 1e6:8.2f} µs/msg  ({n / compiled:,.0f} renders/s)")
+    print(f"  Em cache  : {cached / n * 1e6:8.2f} µs/msg  ({n / cached:,.0f} renders/s)")
+    print(f"  Ganho (cache vs antigo): {legacy / cached:.2f}x")
+    if args.template in REFERENCE:
+        print(f"  Resultados divergentes: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# cdn_rewrite.py
+"""
+Reescrita de URLs de imagem para variantes menores do CDN.
+
+O mlstatic (Mercado Livre) codifica o tamanho no nome do arquivo:
+D_NQ_NP_2X_<id>-F.webp é a versão retina; D_NQ_NP_<id>-F.webp, a 1x. A
+tabela abaixo lista, por host, as variantes conhecidas em ordem de tamanho
+com o maior lado aproximado de cada uma; a reescrita escolhe a menor que
+ainda atende ao alvo de exibição. A URL original fica sempre como última
+opção, então uma variante inexistente só custa uma requisição.
+
+A economia (HEAD na original) é medida em segundo plano, fora do envio.
+
+Testes da tabela (sem rede): python -m pytest -q test_cdn_rewrite.py
+Para conferir uma URL:
+    python cdn_rewrite.py https://http2.mlstatic.com/D_NQ_NP_2X_715808-MLA97591903165_112025-F.webp
+"""
+import asyncio
+import logging
+import re
+import sys
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RewriteRule:
+    def __init__(self, host_suffix, pattern, variants, extensions=None):
+        """
+        Args:
+            host_suffix: sufixo do host ('mlstatic.com')
+            pattern: regex no caminho com os grupos 'variant' e 'ext'
+            variants: ((token, maior lado aproximado em px), ...) do menor ao maior
+            extensions: troca de extensão preferida ({'.webp': '.jpg'})
+        """
+        self.host_suffix = host_suffix
+        self.pattern = re.compile(pattern)
+        self.variants = variants
+        self.extensions = extensions or {}
+
+    def matches(self, host):
+        return host == self.host_suffix or host.endswith('.' + self.host_suffix)
+
+    def rewrite(self, url, target_px):
+        parsed = urlparse(url)
+        m = self.pattern.search(parsed.path)
+        if not m:
+            return None
+
+        current = m.group('variant')
+        sizes = dict(self.variants)
+        if current not in sizes:
+            return None
+
+        # Menor variante que atende ao alvo, sem passar da atual
+        chosen = current
+        for token, px in self.variants:
+            if px >= target_px:
+                if px < sizes[current]:
+                    chosen = token
+                break
+
+        ext = m.group('ext')
+        new_ext = self.extensions.get(ext, ext)
+        if chosen == current and new_ext == ext:
+            return None
+
+        path = (parsed.path[:m.start('variant')] + chosen +
+                parsed.path[m.end('variant'):m.start('ext')] + new_ext +
+                parsed.path[m.end('ext'):])
+        return parsed._replace(path=path).geturl()
+
+
+# Tamanhos aproximados, medidos em anúncios comuns
+RULES = (
+    RewriteRule(
+        'mlstatic.com',
+        r'/(?P<variant>D_NQ_NP_2X_|D_NQ_NP_)[^/]*?(?P<ext>\.webp|\.jpg|\.jpeg|\.png)$',
+        variants=(('D_NQ_NP_', 500), ('D_NQ_NP_2X_', 1200)),
+        # O mlstatic serve a mesma imagem em JPEG; evita a conversão local do WebP
+        extensions={'.webp': '.jpg'},
+    ),
+)
+
+
+def candidates(url, target_px, rules=RULES):
+    """URLs a tentar, da preferida à original"""
+    host = (urlparse(url).hostname or '').lower()
+    for rule in rules:
+        if rule.matches(host):
+            rewritten = rule.rewrite(url, target_px)
+            if rewritten and rewritten != url:
+                return [rewritten, url]
+            break
+    return [url]
+
+
+class CdnRewriter:
+    """Baixa pela variante menor via ImageCache, com volta à URL original"""
+
+    def __init__(self, target_px=500, rules=RULES, measure_savings=True):
+        self.target_px = target_px
+        self.rules = rules
+        self.measure_savings = measure_savings
+
+        self.requests = 0
+        self.rewritten = 0
+        self.fallbacks = 0
+        self.bytes_saved = 0
+        self._measured = set()
+        self._tasks = set()  # medições em segundo plano (referência até terminar)
+
+    def candidates(self, url):
+        return candidates(url, self.target_px, self.rules)
+
+    def contains(self, image_cache, url):
+        return any(image_cache.contains(u) for u in self.candidates(url))
+
+    async def fetch(self, image_cache, url, http, **kwargs):
+        self.requests += 1
+        options = self.candidates(url)
+        for i, candidate in enumerate(options):
+            data = await image_cache.fetch(candidate, http, **kwargs)
+            if data is None:
+                continue
+            if candidate != url:
+                self.rewritten += 1
+                self._measure_later(url, len(data), http)
+            elif i > 0:
+                self.fallbacks += 1
+                logger.info(f"Variante menor indisponível, usando original: {url[:80]}")
+            return data
+        return None
+
+    def _measure_later(self, original_url, variant_bytes, http):
+        """Agenda a medição sem atrasar quem está esperando a imagem"""
+        if not self.measure_savings or original_url in self._measured:
+            return
+        if len(self._measured) > 10000:
+            self._measured.clear()
+        self._measured.add(original_url)
+        task = asyncio.create_task(self._measure(original_url, variant_bytes, http))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _measure(self, original_url, variant_bytes, http):
+        """Bytes economizados: Content-Length da original (HEAD) menos a variante"""
+        try:
+            async with http.head(original_url) as response:
+                length = int(response.headers.get('Content-Length') or 0)
+            if length > variant_bytes:
+                self.bytes_saved += length - variant_bytes
+        except Exception as e:
+            logger.debug(f"HEAD falhou para {original_url[:80]}: {e}")
+
+    def stats(self):
+        return {
+            'target_px': self.target_px,
+            'requests': self.requests,
+            'rewritten': self.rewritten,
+            'fallbacks': self.fallbacks,
+            'saved_kb': round(self.bytes_saved / 1024, 1),
+        }
+
+
+if __name__ == '__main__':
+    target = 500
+    args = sys.argv[1:]
+    if args[:1] == ['--target'] and len(args) > 1:
+        target, args = int(args[1]), args[2:]
+    for url in args:
+        print(url)
+        for c in candidates(url, target)[:-1]:
+            print(f"  -> {c}")
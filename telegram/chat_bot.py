@@ -10,8 +10,16 @@ import logging
 # Adiciona o diretório atual ao path para importar módulos locais
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from telethon.errors import FloodWaitError
+
 from telegram_manager import TelegramManager
 from config import Config
+from rate_limiter import RateLimiter
+from image_cache import ImageCache
+from http_client import HttpClient
+from cdn_rewrite import CdnRewriter
+from permission_prober import PermissionProber
+from image_prep import upload_name
 
 # Configuração de logging
 logging.basicConfig(
@@ -27,9 +35,34 @@ logger = logging.getLogger(__name__)
 class ChatBot:
     """Classe principal para gerenciar envio de mensagens via Telegram"""
     
-    def __init__(self):
+    def __init__(self, http: Optional[HttpClient] = None):
         self.telegram = TelegramManager()
         self.db_path = Config.DATABASE_PATH
+        # Compartilhado por todos os envios (mensagem, foto, imagem com legenda)
+        self.rate_limiter = RateLimiter()
+        # Permissões do bot por chat, consultadas em paralelo e com cache
+        self.permissions = PermissionProber(
+            self.telegram, self.db_path, self.rate_limiter,
+            ttl=Config.PERMISSION_CACHE_TTL_SECONDS,
+            concurrency=Config.PERMISSION_PROBE_CONCURRENCY,
+        )
+        # Cliente HTTP de longa duração; o TelegramSender passa o dele
+        self.http = http or HttpClient(
+            limit_per_host=Config.HTTP_LIMIT_PER_HOST,
+            connect_timeout=Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+            total_timeout=Config.HTTP_TIMEOUT_SECONDS,
+            retries=Config.HTTP_RETRIES,
+        )
+        # Imagens de produto em disco, compartilhadas com o TelegramSender
+        self.image_cache = ImageCache(
+            Config.IMAGE_CACHE_DIR,
+            max_bytes=Config.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+            fresh_ttl=Config.IMAGE_CACHE_FRESH_SECONDS,
+            negative_ttl=Config.IMAGE_CACHE_NEGATIVE_SECONDS,
+            max_object_bytes=Config.IMAGE_MAX_DOWNLOAD_MB * 1024 * 1024,
+        )
+        # Troca a URL do CDN pela menor variante que atende à exibição
+        self.cdn = CdnRewriter(target_px=Config.IMAGE_DISPLAY_TARGET_PX)
         
     async def initialize(self):
         """Inicializa as conexões com o Telegram"""
@@ -54,10 +87,16 @@ class ChatBot:
         try:
             print(f"\n📋 Listando últimos {limit} chats...")
             chats = []
+            dialogs = [d async for d in self.telegram.user_client.iter_dialogs(limit=limit)]
+            
+            # Permissões de todos os grupos/canais de uma vez (em paralelo, com cache)
+            permissions = await self.permissions.probe_many(
+                d.id for d in dialogs if d.is_group or d.is_channel
+            )
             
-            async for dialog in self.telegram.user_client.iter_dialogs(limit=limit):
+            for dialog in dialogs:
                 try:
-                    chat_info = await self._get_chat_info(dialog)
+                    chat_info = self._get_chat_info(dialog, permissions.get(dialog.id))
                     if chat_info:
                         chats.append(chat_info)
                         
@@ -73,23 +112,29 @@ class ChatBot:
             logger.error(f"Erro ao listar chats: {e}")
             return []
     
-    async def _get_chat_info(self, dialog) -> Dict:
+    @staticmethod
+    def _chat_type(entity, is_group=False):
+        """Tipo e ícone de um chat a partir da entidade"""
+        if hasattr(entity, 'broadcast') and entity.broadcast:
+            return 'channel', '📢'
+        elif hasattr(entity, 'megagroup') and entity.megagroup:
+            return 'supergroup', '👥'
+        elif is_group:
+            return 'group', '👥'
+        else:
+            return 'user', '👤'
+    
+    async def _bot_has_access(self, chat_id) -> bool:
+        """Verifica se o bot tem acesso ao chat (via cache de permissões)"""
+        result = await self.permissions.probe(chat_id)
+        return bool(result and result['has_access'])
+    
+    def _get_chat_info(self, dialog, permissions=None) -> Dict:
         """Obtém informações detalhadas de um chat"""
         entity = dialog.entity
         
         # Identifica tipo
-        if hasattr(entity, 'broadcast') and entity.broadcast:
-            chat_type = 'channel'
-            type_icon = '📢'
-        elif hasattr(entity, 'megagroup') and entity.megagroup:
-            chat_type = 'supergroup'
-            type_icon = '👥'
-        elif dialog.is_group:
-            chat_type = 'group'
-            type_icon = '👥'
-        else:
-            chat_type = 'user'
-            type_icon = '👤'
+        chat_type, type_icon = self._chat_type(entity, dialog.is_group)
         
         # Informações básicas
         info = {
@@ -106,15 +151,12 @@ class ChatBot:
             'participants_count': getattr(entity, 'participants_count', 0) if chat_type != 'user' else 1
         }
         
-        # Verifica se o bot tem acesso
-        if self.telegram.bot_client:
-            try:
-                await self.telegram.bot_client.get_permissions(dialog.id, self.telegram.bot_me.id)
-                info['bot_has_access'] = True
-            except:
-                info['bot_has_access'] = False
-        else:
-            info['bot_has_access'] = False
+        # Acesso do bot, já consultado em lote por list_all_chats
+        permissions = permissions or {}
+        info['bot_has_access'] = bool(permissions.get('has_access'))
+        info['bot_can_send'] = bool(permissions.get('can_send'))
+        info['bot_is_admin'] = bool(permissions.get('is_admin'))
+        info['bot_can_send_media'] = bool(permissions.get('can_send_media'))
         
         return info
     
@@ -168,7 +210,8 @@ class ChatBot:
     async def send_message(self, chat_id: str, message: str, 
                           as_bot: bool = True, 
                           parse_mode: str = 'markdown',
-                          link_preview: bool = True) -> bool:
+                          link_preview: bool = True,
+                          return_message: bool = False):
         """
         Envia mensagem para um chat
         
@@ -178,9 +221,10 @@ class ChatBot:
             as_bot: Se True, envia como bot, se False, envia como usuário
             parse_mode: 'markdown', 'html' ou None
             link_preview: Se True, mostra pré-visualização de links
+            return_message: Se True, retorna a Message enviada em vez de True
             
         Returns:
-            bool: True se enviado com sucesso
+            bool: True se enviado com sucesso (ou a Message, com return_message)
         """
         try:
             try:
@@ -200,6 +244,7 @@ class ChatBot:
                 'link_preview': link_preview
             }
             
+            await self.rate_limiter.acquire(chat_id)
             if as_bot:
                 result = await self.telegram.send_message_as_bot(chat_id, message, **kwargs)
             else:
@@ -210,12 +255,17 @@ class ChatBot:
                 
                 # Registra no log
                 self._log_message(chat_id, message, as_bot, True)
-                return True
+                return result if return_message else True
             else:
                 print(f"❌ Falha ao enviar mensagem")
                 self._log_message(chat_id, message, as_bot, False)
                 return False
                 
+        except FloodWaitError as e:
+            print(f"⏳ FloodWait de {e.seconds}s em {chat_id}")
+            self.rate_limiter.penalize(chat_id, e.seconds)
+            self._log_message(chat_id, message, as_bot, False, f"FloodWait {e.seconds}s")
+            return False
         except Exception as e:
             print(f"❌ Erro ao enviar mensagem: {e}")
             self._log_message(chat_id, message, as_bot, False, str(e))
@@ -248,7 +298,7 @@ class ChatBot:
             logger.error(f"Erro ao registrar log: {e}")
     
     async def send_bulk_messages(self, chat_ids: List[str], message: str, 
-                                as_bot: bool = True, delay: float = 2.0):
+                                as_bot: bool = True, delay: float = 0.0):
         """
         Envia mensagem para múltiplos chats
         
@@ -256,7 +306,8 @@ class ChatBot:
             chat_ids: Lista de IDs ou usernames
             message: Texto da mensagem
             as_bot: Se True, envia como bot
-            delay: Tempo de espera entre envios (segundos)
+            delay: Pausa extra entre envios (segundos); o ritmo normal
+                   já vem do rate_limiter
         """
         print(f"\n📨 Enviando para {len(chat_ids)} chats...")
         
@@ -273,8 +324,8 @@ class ChatBot:
             else:
                 failed_count += 1
             
-            # Aguarda entre envios (exceto no último)
-            if i < len(chat_ids):
+            # Pausa extra opcional entre envios (exceto no último)
+            if delay and i < len(chat_ids):
                 print(f"⏳ Aguardando {delay}s...")
                 await asyncio.sleep(delay)
         
@@ -282,6 +333,7 @@ class ChatBot:
         print(f"\n{'='*50}")
         print(f"✅ Sucesso: {success_count}")
         print(f"❌ Falhas: {failed_count}")
+        print(f"⏱️  Rate limiter: {self.rate_limiter.stats()}")
         print(f"{'='*50}")
     
     async def interactive_mode(self):
@@ -466,9 +518,9 @@ class ChatBot:
         
         # Delay
         try:
-            delay = float(input("\nDelay entre envios (segundos, padrão=2): ").strip() or "2")
+            delay = float(input("\nDelay extra entre envios (segundos, padrão=0): ").strip() or "0")
         except:
-            delay = 2.0
+            delay = 0.0
         
         # Confirma
         print(f"\n⚠️  Confirma envio para {len(chat_ids)} chats com delay de {delay}s?")
@@ -581,6 +633,7 @@ class ChatBot:
     async def disconnect(self):
         """Desconecta todas as conexões"""
         await self.telegram.disconnect()
+        await self.http.close()
         print("\n🔌 Conexões encerradas")
 
 
@@ -617,6 +670,7 @@ class ChatBot:
             
             # Método 1: Tenta URL direto (mais eficiente)
             try:
+                await self.rate_limiter.acquire(chat_id)
                 result = await client.send_file(
                     entity=int(chat_id),
                     file=photo_url,
@@ -627,37 +681,51 @@ class ChatBot:
                 print("✅ Foto enviada via URL")
                 self._log_message(chat_id, caption or 'Photo', as_bot, True)
                 return True
+            except FloodWaitError as e:
+                # Baixar e reenviar agora só levaria outro FloodWait
+                print(f"⏳ FloodWait de {e.seconds}s em {chat_id}")
+                self.rate_limiter.penalize(chat_id, e.seconds)
+                self._log_message(chat_id, caption or 'Photo', as_bot, False, f"FloodWait {e.seconds}s")
+                return False
             except Exception as url_error:
                 print(f"⚠️  URL falhou, baixando...: {url_error}")
             
-            # Método 2: Baixa e envia
-            import aiohttp
+            # Método 2: Baixa (via cache em disco) e envia
             from io import BytesIO
             
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(photo_url) as resp:
-                        if resp.status != 200:
-                            print(f"❌ Falha ao baixar: HTTP {resp.status}")
-                            self._log_message(chat_id, caption or 'Photo', as_bot, False, f'HTTP {resp.status}')
-                            return False
-                        
-                        image_data = await resp.read()
-                        print(f"✅ Baixado {len(image_data)} bytes")
-                        
-                        result = await client.send_file(
-                            entity=int(chat_id),
-                            file=BytesIO(image_data),
-                            caption=caption[:1024] if caption else None,
-                            parse_mode=parse_mode
-                        )
-                        
-                        print(f"📤 Foto enviada: {'✅' if result else '❌'}")
-                        
-                        self._log_message(chat_id, caption or 'Photo', as_bot, result is not None)
-                        
-                        return result is not None
+                image_data = await self.cdn.fetch(self.image_cache, photo_url, self.http)
+                
+                if image_data is None:
+                    print(f"❌ Falha ao baixar a imagem")
+                    self._log_message(chat_id, caption or 'Photo', as_bot, False, 'download falhou')
+                    return False
+                
+                print(f"✅ Imagem obtida: {len(image_data)} bytes")
+                
+                # Direto da memória; o nome diz ao Telethon que é foto
+                photo = BytesIO(image_data)
+                photo.name = upload_name(image_data)
+                
+                await self.rate_limiter.acquire(chat_id)
+                result = await client.send_file(
+                    entity=int(chat_id),
+                    file=photo,
+                    caption=caption[:1024] if caption else None,
+                    parse_mode=parse_mode
+                )
+                
+                print(f"📤 Foto enviada: {'✅' if result else '❌'}")
+                
+                self._log_message(chat_id, caption or 'Photo', as_bot, result is not None)
+                
+                return result is not None
                         
+            except FloodWaitError as e:
+                print(f"⏳ FloodWait de {e.seconds}s em {chat_id}")
+                self.rate_limiter.penalize(chat_id, e.seconds)
+                self._log_message(chat_id, caption or 'Photo', as_bot, False, f"FloodWait {e.seconds}s")
+                return False
             except Exception as download_error:
                 print(f"❌ Erro no download: {download_error}")
                 self._log_message(chat_id, caption or 'Photo', as_bot, False, str(download_error))
@@ -694,7 +762,7 @@ async def main():
             parser.add_argument('--to', required=True, help='ID ou username do chat')
             parser.add_argument('--message', required=True, help='Mensagem a ser enviada')
             parser.add_argument('--as-user', action='store_true', help='Enviar como usuário (padrão: bot)')
-            parser.add_argument('--delay', type=float, default=2.0, help='Delay entre envios')
+            parser.add_argument('--delay', type=float, default=0.0, help='Delay extra entre envios')
             
             args = parser.parse_args()
             
@@ -5,6 +5,9 @@ import sys
 import os
 # from telethon.tl.types import PeerChannel, PeerChat
 from telegram_manager import TelegramManager
+from permission_prober import PermissionProber
+from rate_limiter import RateLimiter
+from config import Config
 
 async def discover_bot_groups():
     """
@@ -22,6 +25,12 @@ async def discover_bot_groups():
         return
     
     print(f"✅ Conexões estabelecidas")
+    # Mesmo cache (e validade) de permissões usado pelo ChatBot
+    prober = PermissionProber(
+        manager, Config.DATABASE_PATH, RateLimiter(),
+        ttl=Config.PERMISSION_CACHE_TTL_SECONDS,
+        concurrency=Config.PERMISSION_PROBE_CONCURRENCY,
+    )
     print(f"🤖 Bot: @{manager.bot_me.username}")
     print(f"👤 Usuário: @{(await manager.user_client.get_me()).username}")
     
@@ -35,7 +44,7 @@ async def discover_bot_groups():
         
         # Método 2: Usar a conta do usuário para encontrar grupos compartilhados
         print("🔍 Buscando grupos compartilhados entre usuário e bot...")
-        shared_groups = await _find_shared_groups(manager)
+        shared_groups = await _find_shared_groups(manager, prober)
         
         # Combina resultados
         all_groups = {}
@@ -62,6 +71,7 @@ async def discover_bot_groups():
         
         # PASSO 2: Verificar permissões
         print(f"\n📋 PASSO 2: Verificando permissões em {len(groups_list)} grupos...")
+        permissions = await prober.probe_many(g['id'] for g in groups_list)
         
         verified_groups = []
         for group in groups_list:
@@ -80,22 +90,19 @@ async def discover_bot_groups():
                 print(f"   ⚠️  Não conseguiu entidade completa: {e}")
                 continue
             
-            # Verifica permissões
-            try:
-                participant = await manager.bot_client.get_permissions(entity, manager.bot_me.id)
-                
-                if hasattr(participant, 'admin_rights') and participant.admin_rights:
-                    group['is_admin'] = True
-                    group['can_send'] = True
+            # Permissões (consultadas em lote acima)
+            perms = permissions.get(group['id'])
+            if perms and perms['has_access']:
+                group['is_admin'] = perms['is_admin']
+                group['can_send'] = perms['can_send']
+                group['can_send_media'] = perms['can_send_media']
+                if perms['is_admin']:
                     print(f"   👑 Bot é ADMIN")
                 else:
-                    group['is_admin'] = False
-                    # Para usuários normais, geralmente podem enviar
-                    group['can_send'] = True
-                    print(f"   👤 Bot é membro")
-                    
-            except Exception as e:
-                print(f"   ⚠️  Não conseguiu verificar permissões: {e}")
+                    print(f"   👤 Bot é membro{'' if perms['can_send'] else ' (sem permissão de envio)'}")
+            else:
+                error = perms['error'] if perms else 'consulta não concluída'
+                print(f"   ⚠️  Não conseguiu verificar permissões: {error}")
                 group['can_send'] = False
             
             verified_groups.append(group)
@@ -154,7 +161,7 @@ async def _get_groups_from_bot_messages(manager):
     
     return groups
 
-async def _find_shared_groups(manager):
+async def _find_shared_groups(manager, prober):
     """Encontra grupos onde ambos (usuário e bot) estão"""
     shared_groups = []
     
@@ -171,15 +178,13 @@ async def _find_shared_groups(manager):
         
         print(f"👤 Usuário está em {len(user_groups)} grupos")
         
-        # Agora verifica em quais o bot também está
+        # Agora verifica em quais o bot também está (em paralelo, com cache)
+        permissions = await prober.probe_many(g['id'] for g in user_groups)
         for i, user_group in enumerate(user_groups):
             print(f"   [{i+1}/{len(user_groups)}] Verificando: {user_group['title']}")
             
-            try:
-                # Tenta acessar o grupo pelo bot
-                await manager.bot_client.get_permissions(user_group['id'], manager.bot_me.id)
-                
-                # Se chegou aqui, o bot tem acesso
+            perms = permissions.get(user_group['id'])
+            if perms and perms['has_access']:
                 shared_groups.append({
                     'id': user_group['id'],
                     'title': user_group['title'],
@@ -189,15 +194,13 @@ async def _find_shared_groups(manager):
                 
                 print(f"      ✅ Bot também está aqui!")
                 
-            except Exception as e:
-                error_msg = str(e).lower()
+            else:
+                error = perms['error'] if perms else 'consulta não concluída'
+                error_msg = (error or '').lower()
                 if "not participant" in error_msg or "no user" in error_msg:
                     print(f"      ❌ Bot NÃO está aqui")
                 else:
-                    print(f"      ⚠️  Erro na verificação: {e}")
-            
-            # Pequena pausa para evitar flood
-            await asyncio.sleep(0.3)
+                    print(f"      ⚠️  Erro na verificação: {error}")
     
     except Exception as e:
         print(f"❌ Erro ao buscar grupos compartilhados: {e}")
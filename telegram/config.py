@@ -9,6 +9,13 @@ class Config:
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_API_ID = os.getenv('TELEGRAM_API_ID')
     TELEGRAM_API_HASH = os.getenv('TELEGRAM_API_HASH')
+
+    # Sessões de usuário usadas na leitura dos grupos (separadas por vírgula).
+    # A primeira é a conta principal; as demais dividem os grupos rastreados.
+    TELEGRAM_USER_SESSIONS = [
+        s.strip() for s in os.getenv('TELEGRAM_USER_SESSIONS', 'session.txt').split(',')
+        if s.strip()
+    ]
     
     # Database Configuration
     DATABASE_PATH = 'affiliate.db'
@@ -16,8 +23,58 @@ class Config:
     # Scheduler Configuration
     CHECK_INTERVAL_MINUTES = 30  # Verificar novos links a cada 30 minutos
     MAX_MESSAGES_PER_DAY = 100   # Limite diário de mensagens
+    TELEGRAM_MIN_INTERVAL_SECONDS = int(os.getenv('TELEGRAM_MIN_INTERVAL_SECONDS', '60'))  # entre posts no mesmo destino
+    
+    # Rate limiting dos envios (limites documentados do Telegram para bots)
+    RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv('RATE_LIMIT_GLOBAL_PER_SECOND', '25'))
+    RATE_LIMIT_PRIVATE_PER_SECOND = 1.0   # ~1 mensagem/s por chat privado
+    RATE_LIMIT_GROUP_PER_MINUTE = 20      # ~20 mensagens/min por grupo ou canal
+    RATE_LIMIT_GROUP_BURST = 3
+
+    # Entrega de cada oferta: 'all' (todos os destinos) ou 'quorum'
+    DELIVERY_POLICY = os.getenv('DELIVERY_POLICY', 'quorum')
+    DELIVERY_QUORUM = float(os.getenv('DELIVERY_QUORUM', '1'))  # mínimo de destinos ou fração (<1)
+    DELIVERY_MAX_ATTEMPTS = 6  # por destino: envio do fan-out + reenvios da fila
+    RECONCILE_HISTORY_LIMIT = 100  # mensagens lidas por destino para conferir envios em dúvida
+    FANOUT_CONCURRENCY = 10
+    MEDIA_CACHE_TTL_SECONDS = 3600  # validade do handle de uma imagem já enviada
+
+    # Cliente HTTP compartilhado (downloads de imagens)
+    HTTP_LIMIT_PER_HOST = 8
+    HTTP_CONNECT_TIMEOUT_SECONDS = 5
+    HTTP_TIMEOUT_SECONDS = 20
+    HTTP_RETRIES = 2
+
+    # Cache em disco das imagens de produto
+    IMAGE_CACHE_DIR = os.getenv(
+        'IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image_cache')
+    )
+    IMAGE_CACHE_MAX_MB = int(os.getenv('IMAGE_CACHE_MAX_MB', '200'))
+    IMAGE_CACHE_FRESH_SECONDS = 6 * 3600   # sem revalidar com o CDN
+    IMAGE_CACHE_NEGATIVE_SECONDS = 300     # primeira espera após falha (dobra a cada falha)
+    IMAGE_MAX_DOWNLOAD_MB = 10             # imagens maiores são recusadas no download
+    IMAGE_DISPLAY_TARGET_PX = 500  # menor variante do CDN aceitável (maior lado)
+    IMAGE_PREFETCH_DEPTH = int(os.getenv('IMAGE_PREFETCH_DEPTH', '10'))  # próximos links com imagem pré-buscada
+
+    # Conversão das imagens para JPEG antes do upload (requer Pillow)
+    IMAGE_PREP_WORKERS = 2
+    IMAGE_MAX_SIDE = 1280        # maior lado útil de uma foto no Telegram
+    IMAGE_TARGET_KB = 200
     
-    # Message Template
+    # Registro de destinos (grupos/canais) sem varrer os diálogos a cada ciclo
+    DESTINATION_CACHE_TTL_SECONDS = 300
+    DESTINATION_RESCAN_HOURS = 24  # varredura completa de segurança
+    PERMISSION_CACHE_TTL_SECONDS = 6 * 3600  # permissões do bot por chat
+    PERMISSION_PROBE_CONCURRENCY = 8
+
+    # Prioridade dos links prontos (maior nota sai primeiro)
+    PRIORITY_WEIGHT_DISCOUNT = 100     # pontos por 100 % de desconto
+    PRIORITY_WEIGHT_COUPON = 10
+    PRIORITY_WEIGHT_YIELD = 20         # grupo de origem que só manda oferta boa
+    PRIORITY_FRESHNESS_PER_HOUR = 2    # pontos por hora mais recente
+
+    # Message Template ('default', 'compact', 'rich', 'legacy' ou 'config' = MESSAGE_TEMPLATE abaixo)
+    TELEGRAM_MESSAGE_TEMPLATE = os.getenv('TELEGRAM_MESSAGE_TEMPLATE', 'default')
     MESSAGE_TEMPLATE = """
 🎯 **{title}**
 
@@ -0,0 +1,242 @@
+# delivery_ledger.py
+"""
+Registro de entrega por (link, destino).
+
+Uma linha em telegram_deliveries para cada destino de cada link, com
+estado, número de tentativas, id da mensagem no Telegram e o último erro.
+A chave primária (tracked_link_id, target_id) deixa a consulta do estado
+de um link proporcional ao número de destinos.
+
+    pending  intenção gravada antes do envio, ainda sem confirmação
+    sent     entregue (message_id preenchido quando conhecido)
+    queued   na fila de reenvio (FloodWait ou falha com backoff)
+    failed   última tentativa falhou
+
+Um destino só volta a receber o link enquanto não estiver 'sent' nem
+'pending' e tiver menos de max_attempts tentativas; quando nenhum destino
+ainda pode receber, o link é encerrado (telegram_sent) mesmo sem entrega.
+
+Se o processo morre entre o envio e a confirmação, a linha fica 'pending'.
+No início seguinte, reconcile() lê o histórico recente de cada destino
+(uma consulta por destino, em paralelo) e procura o link de afiliado: achou,
+vira 'sent' com o id da mensagem; não achou, vira 'failed' e o destino
+recebe de novo. Sem acesso ao histórico, a dúvida conta como entregue
+(melhor perder um envio do que repetir a oferta no grupo).
+"""
+import asyncio
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENT, QUEUED, FAILED = 'pending', 'sent', 'queued', 'failed'
+
+
+class DeliveryLedger:
+    def __init__(self, db_path, max_attempts=5):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_deliveries (
+                tracked_link_id INTEGER NOT NULL,
+                target_id TEXT NOT NULL,
+                target_name TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                message_id INTEGER,
+                last_error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tracked_link_id, target_id)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def for_link(self, link_id):
+        """{target_id: {'state', 'attempts', 'message_id', 'error'}} do link"""
+        conn = self._connect()
+        rows = conn.execute("""
+            SELECT target_id, state, attempts, message_id, last_error
+            FROM telegram_deliveries WHERE tracked_link_id = ?
+        """, (link_id,)).fetchall()
+        conn.close()
+        return {
+            target_id: {'state': state, 'attempts': attempts, 'message_id': message_id, 'error': error}
+            for target_id, state, attempts, message_id, error in rows
+        }
+
+    def deliverable(self, entry):
+        """O destino ainda pode receber o link?"""
+        return entry is None or (
+            entry['state'] not in (SENT, PENDING) and entry['attempts'] < self.max_attempts
+        )
+
+    def missing(self, link_id, targets, deliveries=None):
+        """Destinos que ainda devem receber o link"""
+        deliveries = self.for_link(link_id) if deliveries is None else deliveries
+        return [t for t in targets if self.deliverable(deliveries.get(str(t['id'])))]
+
+    def begin(self, link_id, targets):
+        """Grava a intenção de envio (pending) antes de chamar o Telegram"""
+        if not targets:
+            return
+        conn = self._connect()
+        conn.executemany("""
+            INSERT INTO telegram_deliveries (tracked_link_id, target_id, target_name, state)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(tracked_link_id, target_id) DO UPDATE SET
+                state = excluded.state,
+                updated_at = CURRENT_TIMESTAMP
+        """, [(link_id, str(t['id']), t.get('name'), PENDING) for t in targets])
+        conn.commit()
+        conn.close()
+
+    def is_sent(self, link_id, target_id):
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT 1 FROM telegram_deliveries
+            WHERE tracked_link_id = ? AND target_id = ? AND state = ?
+        """, (link_id, str(target_id), SENT)).fetchone()
+        conn.close()
+        return row is not None
+
+    def record(self, link_id, outcomes):
+        """
+        Grava tentativas de uma vez. outcomes: [(target, ok, message_id, error)];
+        cada uma conta como tentativa.
+        """
+        if not outcomes:
+            return
+        conn = self._connect()
+        conn.executemany("""
+            INSERT INTO telegram_deliveries
+                (tracked_link_id, target_id, target_name, state, attempts, message_id, last_error, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(tracked_link_id, target_id) DO UPDATE SET
+                target_name = excluded.target_name,
+                state = excluded.state,
+                attempts = attempts + 1,
+                message_id = COALESCE(excluded.message_id, message_id),
+                last_error = excluded.last_error,
+                updated_at = CURRENT_TIMESTAMP
+        """, [
+            (link_id, str(target['id']), target.get('name'), SENT if ok else FAILED,
+             message_id, None if ok else (error or 'falha no envio'))
+            for target, ok, message_id, error in outcomes
+        ])
+        conn.commit()
+        conn.close()
+
+    def mark_queued(self, link_id, target, error=None):
+        """Destino entregue à fila de reenvio (não conta tentativa)"""
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO telegram_deliveries (tracked_link_id, target_id, target_name, state, last_error)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(tracked_link_id, target_id) DO UPDATE SET
+                state = excluded.state,
+                last_error = COALESCE(excluded.last_error, last_error),
+                updated_at = CURRENT_TIMESTAMP
+        """, (link_id, str(target['id']), target.get('name'), QUEUED, error))
+        conn.commit()
+        conn.close()
+
+    def summary(self, link_id, deliveries=None):
+        """Contagem por estado: {'pending': n, 'sent': n, 'queued': n, 'failed': n}"""
+        deliveries = self.for_link(link_id) if deliveries is None else deliveries
+        counts = {PENDING: 0, SENT: 0, QUEUED: 0, FAILED: 0}
+        for entry in deliveries.values():
+            counts[entry['state']] = counts.get(entry['state'], 0) + 1
+        return counts
+
+    # ============================================================
+    # RECONCILIAÇÃO (envios em dúvida após queda do processo)
+    # ============================================================
+
+    def in_doubt(self):
+        """{target_id: [(link_id, nome, affiliate_link)]} das linhas 'pending'"""
+        conn = self._connect()
+        rows = conn.execute("""
+            SELECT d.target_id, d.tracked_link_id, d.target_name, tl.affiliate_link
+            FROM telegram_deliveries d
+            LEFT JOIN tracked_links tl ON tl.id = d.tracked_link_id
+            WHERE d.state = ?
+        """, (PENDING,)).fetchall()
+        conn.close()
+        doubts = {}
+        for target_id, link_id, name, affiliate_link in rows:
+            doubts.setdefault(target_id, []).append((link_id, name, affiliate_link))
+        return doubts
+
+    @staticmethod
+    def _find(messages, affiliate_link):
+        """Mensagem do histórico que contém o link (texto, legenda ou URL de entidade)"""
+        if not affiliate_link:
+            return None
+        for message in messages:
+            if affiliate_link in (message.message or ''):
+                return message
+            if any(getattr(e, 'url', None) == affiliate_link for e in message.entities or ()):
+                return message
+        return None
+
+    def _resolve(self, rows):
+        """rows: [(state, message_id, error, link_id, target_id)]"""
+        conn = self._connect()
+        conn.executemany("""
+            UPDATE telegram_deliveries
+            SET state = ?, message_id = COALESCE(?, message_id), last_error = ?, attempts = attempts + 1,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE tracked_link_id = ? AND target_id = ? AND state = 'pending'
+        """, rows)
+        conn.commit()
+        conn.close()
+
+    async def reconcile(self, client, history_limit=100):
+        """
+        Resolve os envios 'pending' lendo o histórico recente de cada destino.
+
+        Args:
+            client: cliente de usuário (bots não leem histórico)
+        Returns:
+            {'confirmed': n, 'resent': n, 'unverified': n}
+        """
+        doubts = self.in_doubt()
+        counts = {'confirmed': 0, 'resent': 0, 'unverified': 0}
+        if not doubts:
+            return counts
+
+        async def history(target_id):
+            try:
+                return await client.get_messages(int(target_id), limit=history_limit)
+            except Exception as e:
+                logger.warning(f"Histórico de {target_id} indisponível para reconciliação: {e}")
+                return None
+
+        histories = await asyncio.gather(*(history(tid) for tid in doubts)) if client else [None] * len(doubts)
+
+        rows = []
+        for (target_id, items), messages in zip(doubts.items(), histories):
+            for link_id, name, affiliate_link in items:
+                if messages is None:
+                    counts['unverified'] += 1
+                    rows.append((SENT, None, 'envio não confirmado (histórico indisponível)', link_id, target_id))
+                    continue
+                found = self._find(messages, affiliate_link)
+                if found is not None:
+                    counts['confirmed'] += 1
+                    rows.append((SENT, found.id, None, link_id, target_id))
+                else:
+                    counts['resent'] += 1
+                    rows.append((FAILED, None, 'envio interrompido (não encontrado no histórico)', link_id, target_id))
+        self._resolve(rows)
+
+        logger.info(f"🧾 Reconciliação de envios em dúvida: {counts}")
+        return counts
@@ -0,0 +1,226 @@
+# desktop_export.py
+"""
+Leitura de exportações JSON do Telegram Desktop (result.json).
+
+Aceita a exportação de um único chat ({"id", "type", "messages": [...]})
+e a exportação completa da conta ({"chats": {"list": [...]}}).
+
+O arquivo é lido em streaming: só a mensagem corrente é decodificada para
+objeto Python, então exportações de vários GB não ficam inteiras na memória.
+"""
+import json
+import re
+
+# Tipos de chat da exportação cujo ID precisa do prefixo -100
+CHANNEL_TYPES = {
+    'private_supergroup', 'public_supergroup',
+    'private_channel', 'public_channel',
+}
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def chat_id_from_export(chat_id, chat_type):
+    """Converte o ID da exportação para o ID marcado usado pelo Telethon"""
+    chat_id = int(chat_id)
+    if chat_type in CHANNEL_TYPES:
+        return int(f"-100{chat_id}")
+    if chat_type == 'private_group':
+        return -chat_id
+    return chat_id
+
+
+def flatten_text(text):
+    """O campo text pode ser string ou lista de trechos (str ou {'text': ...})"""
+    if isinstance(text, str):
+        return text
+    if isinstance(text, list):
+        return "".join(
+            part if isinstance(part, str) else str(part.get('text', ''))
+            for part in text
+        )
+    return ""
+
+
+def to_message(raw):
+    """Mensagem da exportação -> {'message_id', 'text'} (None se não for texto)"""
+    if raw.get('type') != 'message':
+        return None
+    text = flatten_text(raw.get('text'))
+    if not text:
+        return None
+    return {"message_id": int(raw['id']), "text": text}
+
+
+# ============================================================
+# PARSER EM STREAMING
+# ============================================================
+
+class StreamReader:
+    """Leitor JSON incremental sobre um arquivo texto"""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Descarta o que já foi consumido
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"JSON inválido: esperado {ch!r}, encontrado {found!r}")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decodifica o próximo valor completo (objeto, lista ou escalar)"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Número no fim do buffer pode estar truncado
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip_value(self):
+        """Pula o próximo valor sem construir objetos Python"""
+        if self.peek() not in ('{', '['):
+            self.decode_value()
+            return
+
+        depth = 0
+        while True:
+            m = _STRUCTURAL.search(self.buf, self.pos)
+            if not m:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("JSON inválido: fim inesperado")
+                continue
+
+            ch = m.group()
+            self.pos = m.end()
+            if ch == '"':
+                while True:
+                    tail = _STRING_TAIL.match(self.buf, self.pos)
+                    if tail:
+                        self.pos = tail.end()
+                        break
+                    if not self._fill():
+                        raise ValueError("JSON inválido: string não terminada")
+            elif ch in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object(self):
+        """Percorre as chaves de um objeto; o chamador consome cada valor"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(':')
+            self.peek()
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == '}':
+                return
+            if ch != ',':
+                raise ValueError(f"JSON inválido: esperado ',' ou '}}', encontrado {ch!r}")
+
+    def iter_array(self):
+        """Percorre os itens de uma lista; o chamador consome cada item"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            ch = self.peek()
+            self.pos += 1
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError(f"JSON inválido: esperado ',' ou ']', encontrado {ch!r}")
+
+
+def _iter_chat(reader, meta):
+    """Percorre um objeto de chat, emitindo (meta, mensagem crua)"""
+    for key in reader.iter_object():
+        if key == 'messages' and reader.peek() == '[':
+            for _ in reader.iter_array():
+                yield meta, reader.decode_value()
+        elif key == 'chats' and reader.peek() == '{':
+            # Exportação completa: {"chats": {"list": [chat, ...]}}
+            for sub_key in reader.iter_object():
+                if sub_key == 'list' and reader.peek() == '[':
+                    for _ in reader.iter_array():
+                        yield from _iter_chat(reader, {})
+                else:
+                    reader.skip_value()
+        elif reader.peek() in ('{', '['):
+            reader.skip_value()
+        else:
+            meta[key] = reader.decode_value()
+
+
+def iter_export_messages(path):
+    """
+    Gera (chat, mensagem crua) em streaming. chat traz 'name', 'type', 'id'
+    e 'chat_id' (ID marcado), que na exportação vêm antes de 'messages'.
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        reader = StreamReader(f)
+        for meta, raw in _iter_chat(reader, {}):
+            if 'chat_id' not in meta and 'id' in meta:
+                meta['chat_id'] = chat_id_from_export(meta['id'], meta.get('type'))
+            yield meta, raw
+
+
+def load_export(path):
+    """Retorna {chat_id: {'name', 'messages': [...]}} de um result.json"""
+    result = {}
+    for chat, raw in iter_export_messages(path):
+        message = to_message(raw)
+        if not message or 'chat_id' not in chat:
+            continue
+        entry = result.setdefault(chat['chat_id'], {
+            'name': chat.get('name') or str(chat['chat_id']),
+            'messages': [],
+        })
+        entry['messages'].append(message)
+    return result
@@ -0,0 +1,297 @@
+# destination_registry.py
+"""
+Registro de destinos (grupos e canais) persistido no SQLite.
+
+Antes, cada atualização de destinos chamava ChatBot.list_groups: até 200
+diálogos e um get_permissions por diálogo, um após o outro. Aqui o
+resultado fica na tabela telegram_destinations e em memória:
+
+- groups() devolve a cópia em memória enquanto ela tiver menos de ttl
+  segundos; depois recarrega do SQLite, sem tocar a rede.
+- A varredura completa dos diálogos só acontece com o registro vazio ou
+  a cada rescan_interval (rede de segurança para eventos perdidos).
+- Eventos ChatAction (bot ou conta adicionados/removidos, título novo) e
+  mudanças de permissão do bot atualizam só o chat afetado, descartando
+  também a permissão em cache no PermissionProber.
+"""
+import logging
+import sqlite3
+import time
+
+from telethon import events, utils
+from telethon.tl.types import Chat, PeerChannel, PeerChat, UpdateChannelParticipant, UpdateChatParticipant
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('chat_id', 'name', 'type', 'username', 'participants_count', 'bot_has_access')
+ICONS = {'channel': '📢', 'supergroup': '👥', 'group': '👥'}
+
+
+class DestinationRegistry:
+    def __init__(self, db_path, bot, ttl=300, rescan_interval=24 * 3600):
+        self.db_path = db_path
+        self.bot = bot
+        self.ttl = ttl
+        self.rescan_interval = rescan_interval
+
+        self._chats = None  # chat_id -> info, cópia em memória
+        self._loaded_at = 0.0
+        self._scanned_at = None  # última varredura completa
+        self._dirty = set()  # chats a reconsultar na próxima leitura
+        self._attached = False
+
+        self.rescans = 0
+        self.loads = 0
+        self.memory_hits = 0
+        self.events = 0
+        self.probes = 0
+
+        self._init_db()
+
+    # ============================================================
+    # BANCO
+    # ============================================================
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_destinations (
+                chat_id INTEGER PRIMARY KEY,
+                name TEXT,
+                type TEXT,
+                username TEXT,
+                participants_count INTEGER DEFAULT 0,
+                bot_has_access INTEGER DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_destinations_scan (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                scanned_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _info(row):
+        chat_id, name, chat_type, username, participants, access = row
+        return {
+            'id': chat_id,
+            'name': name,
+            'type': chat_type,
+            'icon': ICONS.get(chat_type, '👥'),
+            'username': username,
+            'is_user': False,
+            'is_group': chat_type in ('group', 'supergroup'),
+            'is_channel': chat_type == 'channel',
+            'participants_count': participants or 0,
+            'bot_has_access': bool(access),
+        }
+
+    def _load(self):
+        conn = self._connect()
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM telegram_destinations").fetchall()
+        conn.close()
+        self._chats = {row[0]: self._info(row) for row in rows}
+        self._loaded_at = time.time()
+        self.loads += 1
+
+    def _last_scan(self):
+        conn = self._connect()
+        row = conn.execute("SELECT scanned_at FROM telegram_destinations_scan WHERE id = 1").fetchone()
+        conn.close()
+        return row[0] if row else 0.0
+
+    def _upsert(self, info):
+        conn = self._connect()
+        conn.execute(f"""
+            INSERT OR REPLACE INTO telegram_destinations ({', '.join(COLUMNS)}, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (int(info['id']), info['name'], info['type'], info.get('username'),
+              info.get('participants_count', 0), int(bool(info.get('bot_has_access'))), time.time()))
+        conn.commit()
+        conn.close()
+        if self._chats is not None:
+            self._chats[int(info['id'])] = self._info((
+                int(info['id']), info['name'], info['type'], info.get('username'),
+                info.get('participants_count', 0), int(bool(info.get('bot_has_access'))),
+            ))
+
+    def _update(self, chat_id, **fields):
+        sets = ', '.join(f"{k} = ?" for k in fields)
+        conn = self._connect()
+        conn.execute(
+            f"UPDATE telegram_destinations SET {sets}, updated_at = ? WHERE chat_id = ?",
+            (*fields.values(), time.time(), chat_id)
+        )
+        conn.commit()
+        conn.close()
+        if self._chats is not None and chat_id in self._chats:
+            info = self._chats[chat_id]
+            for key, value in fields.items():
+                info[key] = bool(value) if key == 'bot_has_access' else value
+
+    def _remove(self, chat_id):
+        conn = self._connect()
+        conn.execute("DELETE FROM telegram_destinations WHERE chat_id = ?", (chat_id,))
+        conn.commit()
+        conn.close()
+        if self._chats is not None:
+            self._chats.pop(chat_id, None)
+
+    # ============================================================
+    # LEITURA
+    # ============================================================
+
+    async def groups(self, force=False):
+        """Grupos e canais conhecidos, no formato de ChatBot.list_groups"""
+        now = time.time()
+        if self._scanned_at is None:
+            self._scanned_at = self._last_scan()
+        if force or now - self._scanned_at > self.rescan_interval:
+            await self.rescan()
+        elif self._chats is None or now - self._loaded_at > self.ttl:
+            self._load()
+            if not self._chats:
+                await self.rescan()
+        else:
+            self.memory_hits += 1
+
+        if self._dirty:
+            await self._probe_dirty()
+
+        return sorted(self._chats.values(), key=lambda c: (c['name'] or '').lower())
+
+    async def rescan(self):
+        """Varredura completa dos diálogos (a lógica antiga), gravada no registro"""
+        groups = await self.bot.list_groups(include_channels=True, limit=100)
+        now = time.time()
+        if not groups:
+            # list_all_chats devolve [] em erro: não apaga o que já se sabe
+            logger.warning("Varredura de diálogos vazia; mantendo o registro atual")
+            self._load()
+            return
+
+        conn = self._connect()
+        conn.execute("DELETE FROM telegram_destinations")
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO telegram_destinations ({', '.join(COLUMNS)}, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (int(g['id']), g['name'], g['type'], g.get('username'),
+             g.get('participants_count', 0), int(bool(g.get('bot_has_access'))), now)
+            for g in groups
+        ])
+        conn.execute("INSERT OR REPLACE INTO telegram_destinations_scan (id, scanned_at) VALUES (1, ?)", (now,))
+        conn.commit()
+        conn.close()
+
+        self.rescans += 1
+        self._scanned_at = now
+        self._dirty.clear()
+        self._load()
+        logger.info(f"📇 Registro de destinos: varredura completa, {len(groups)} chat(s)")
+
+    async def _probe_dirty(self):
+        """Reconsulta só os chats marcados pelos eventos"""
+        dirty, self._dirty = self._dirty, set()
+        for chat_id in dirty:
+            self.probes += 1
+            try:
+                if chat_id in self._chats:
+                    access = await self.bot._bot_has_access(chat_id)
+                    self._update(chat_id, bot_has_access=int(access))
+                    continue
+
+                entity = await self.bot.telegram.user_client.get_entity(chat_id)
+                chat_type, _ = self.bot._chat_type(entity, isinstance(entity, Chat))
+                if chat_type == 'user':
+                    continue
+                self._upsert({
+                    'id': chat_id,
+                    'name': utils.get_display_name(entity),
+                    'type': chat_type,
+                    'username': getattr(entity, 'username', None),
+                    'participants_count': getattr(entity, 'participants_count', 0) or 0,
+                    'bot_has_access': await self.bot._bot_has_access(chat_id),
+                })
+            except Exception as e:
+                logger.warning(f"Falha ao reconsultar chat {chat_id}: {e}")
+
+    # ============================================================
+    # EVENTOS
+    # ============================================================
+
+    def attach(self):
+        """Registra os handlers nos clientes já conectados"""
+        if self._attached:
+            return
+        telegram = self.bot.telegram
+        if telegram.bot_client:
+            telegram.bot_client.add_event_handler(self._on_bot_action, events.ChatAction())
+            telegram.bot_client.add_event_handler(
+                self._on_participant, events.Raw((UpdateChannelParticipant, UpdateChatParticipant))
+            )
+        if telegram.user_client:
+            telegram.user_client.add_event_handler(self._on_user_action, events.ChatAction())
+        self._attached = True
+
+    async def _on_bot_action(self, event):
+        """Bot adicionado/removido de um chat ou título alterado"""
+        bot_id = self.bot.telegram.bot_me.id
+        chat_id = event.chat_id
+        if event.new_title:
+            self.events += 1
+            self._update(chat_id, name=event.new_title)
+            return
+        if bot_id not in (event.user_ids or []):
+            return
+
+        self.events += 1
+        self.bot.permissions.invalidate(chat_id)
+        if event.user_added or event.user_joined:
+            if self._chats is not None and chat_id in self._chats:
+                self._update(chat_id, bot_has_access=1)
+            else:
+                self._dirty.add(chat_id)
+        elif event.user_kicked or event.user_left:
+            self._update(chat_id, bot_has_access=0)
+
+    async def _on_user_action(self, event):
+        """A conta de usuário entrou ou saiu de um chat"""
+        me = await event.client.get_me(input_peer=True)
+        if me.user_id not in (event.user_ids or []):
+            return
+
+        self.events += 1
+        if event.user_added or event.user_joined:
+            self._dirty.add(event.chat_id)
+        elif event.user_kicked or event.user_left:
+            self._remove(event.chat_id)
+
+    async def _on_participant(self, update):
+        """Permissões do bot alteradas (promovido, restringido...)"""
+        if update.user_id != self.bot.telegram.bot_me.id:
+            return
+        if isinstance(update, UpdateChannelParticipant):
+            chat_id = utils.get_peer_id(PeerChannel(update.channel_id))
+        else:
+            chat_id = utils.get_peer_id(PeerChat(update.chat_id))
+        self.events += 1
+        self.bot.permissions.invalidate(chat_id)
+        self._dirty.add(chat_id)
+
+    def stats(self):
+        return {
+            'chats': len(self._chats or {}),
+            'rescans': self.rescans,
+            'loads': self.loads,
+            'memory_hits': self.memory_hits,
+            'events': self.events,
+            'probes': self.probes,
+        }
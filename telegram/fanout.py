@@ -0,0 +1,104 @@
+# fanout.py
+"""
+Envio concorrente de uma oferta para vários destinos.
+
+Todos os destinos recebem a oferta ao mesmo tempo; o ritmo real fica a
+cargo do RateLimiter do ChatBot, e um semáforo só limita quantos envios
+(uploads) ficam abertos de uma vez. O resultado de cada destino é guardado
+e a política de entrega decide se a oferta conta como enviada:
+
+    'all'     todos os destinos confirmaram
+    'quorum'  pelo menos `quorum` destinos (inteiro >= 1) ou essa fração
+              dos destinos (0 < quorum < 1)
+"""
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('all', 'quorum')
+
+
+def required(policy, quorum, total):
+    """Destinos que precisam confirmar, de `total`, para a política ser atendida"""
+    if policy == 'all':
+        return total
+    if 0 < quorum < 1:
+        return max(1, math.ceil(total * quorum))
+    return min(total, max(1, int(quorum)))
+
+
+class FanOutResult:
+    def __init__(self, policy, quorum):
+        self.policy = policy
+        self.quorum = quorum
+        self.results = {}  # target_id -> {'name', 'ok', 'error', 'elapsed', 'message_id'}
+        self.elapsed = 0.0
+
+    @property
+    def succeeded(self):
+        return [tid for tid, r in self.results.items() if r['ok']]
+
+    @property
+    def failed(self):
+        return [tid for tid, r in self.results.items() if not r['ok']]
+
+    def required(self):
+        return required(self.policy, self.quorum, len(self.results))
+
+    @property
+    def met(self):
+        return bool(self.results) and len(self.succeeded) >= self.required()
+
+    def summary(self):
+        return f"{len(self.succeeded)}/{len(self.results)} destinos em {self.elapsed:.1f}s"
+
+
+class FanOut:
+    """Envia para todos os destinos em paralelo e aplica a política de entrega"""
+
+    def __init__(self, send, policy='quorum', quorum=1, concurrency=10):
+        """
+        Args:
+            send: corrotina send(target, *args) -> bool ou a Message enviada
+            policy: 'all' ou 'quorum'
+            quorum: mínimo de destinos (ou fração) para a política 'quorum'
+            concurrency: envios abertos ao mesmo tempo
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Política de entrega inválida: {policy}")
+
+        self.send = send
+        self.policy = policy
+        self.quorum = quorum
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _deliver_one(self, target, args, result):
+        started = time.monotonic()
+        ok, error, message_id = False, None, None
+        try:
+            async with self.semaphore:
+                sent = await self.send(target, *args)
+            ok = bool(sent)
+            message_id = getattr(sent, 'id', None) if ok else None
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Falha no envio para {target.get('name')}: {e}")
+
+        result.results[target['id']] = {
+            'name': target.get('name', 'Desconhecido'),
+            'ok': ok,
+            'error': error,
+            'elapsed': round(time.monotonic() - started, 2),
+            'message_id': message_id,
+        }
+
+    async def deliver(self, targets, *args):
+        """Envia para todos os `targets`; `args` vão para send depois do destino"""
+        result = FanOutResult(self.policy, self.quorum)
+        started = time.monotonic()
+        await asyncio.gather(*(self._deliver_one(t, args, result) for t in targets))
+        result.elapsed = time.monotonic() - started
+        return result
@@ -0,0 +1,178 @@
+# http_client.py
+"""
+Cliente HTTP compartilhado para todos os downloads de saída.
+
+Uma única aiohttp.ClientSession de longa duração: conexões keep-alive
+reaproveitadas com o CDN, limite de conexões por host, cache de DNS,
+timeouts e novas tentativas com backoff para erros de conexão, 429 e 5xx.
+
+A interface imita ClientSession.get (gerenciador de contexto assíncrono),
+então quem já recebia uma sessão (ImageCache.fetch) funciona sem mudança.
+As métricas vêm de TraceConfig (conexões abertas, tempo de conexão,
+consultas de DNS); os bytes recebidos são contados ao fechar a resposta,
+o que cobre tanto read() quanto leitura em blocos.
+"""
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.connections = 0
+        self.connect_seconds = 0.0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+        self.bytes_received = 0
+        self.by_host = {}
+
+    def host(self, host):
+        entry = self.by_host.get(host)
+        if entry is None:
+            entry = self.by_host[host] = {'requests': 0, 'bytes': 0}
+        return entry
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'errors': self.errors,
+            'connections': self.connections,
+            'reused': max(0, self.requests - self.connections),
+            'avg_connect_ms': round(1000 * self.connect_seconds / self.connections, 1) if self.connections else 0,
+            'dns_lookups': self.dns_lookups,
+            'dns_cache_hits': self.dns_cache_hits,
+            'received_kb': round(self.bytes_received / 1024, 1),
+        }
+
+
+class _RequestContext:
+    """async with client.get(...) as response, com novas tentativas"""
+
+    def __init__(self, client, method, url, kwargs):
+        self.client = client
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.response = None
+
+    async def __aenter__(self):
+        self.response = await self.client._request(self.method, self.url, **self.kwargs)
+        return self.response
+
+    async def __aexit__(self, *exc):
+        received = getattr(self.response.content, 'total_bytes', 0)
+        self.client.metrics.bytes_received += received
+        self.client.metrics.host(self.response.url.host)['bytes'] += received
+        self.response.release()
+
+
+class HttpClient:
+    def __init__(self, limit=100, limit_per_host=8, dns_ttl=300,
+                 connect_timeout=5, total_timeout=20, retries=2, backoff=0.5,
+                 user_agent='Mozilla/5.0 (compatible; AffiliateBot/1.0)'):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = {'User-Agent': user_agent}
+        self.metrics = HttpMetrics()
+        self._session = None
+
+    def _trace_config(self):
+        trace = aiohttp.TraceConfig()
+        metrics = self.metrics
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            metrics.connections += 1
+            metrics.connect_seconds += time.perf_counter() - ctx.connect_started
+
+        async def on_dns_resolvehost_end(session, ctx, params):
+            metrics.dns_lookups += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            metrics.dns_cache_hits += 1
+
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        return trace
+
+    @property
+    def session(self):
+        """Sessão criada na primeira requisição (precisa de loop rodando)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=30,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers,
+                trace_configs=[self._trace_config()],
+            )
+        return self._session
+
+    async def _request(self, method, url, timeout=None, **kwargs):
+        if isinstance(timeout, (int, float)):
+            timeout = aiohttp.ClientTimeout(total=timeout, connect=self.timeout.connect)
+
+        host = urlparse(url).hostname or ''
+        for attempt in range(self.retries + 1):
+            self.metrics.requests += 1
+            self.metrics.host(host)['requests'] += 1
+            try:
+                response = await self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    self.metrics.errors += 1
+                    raise
+                logger.debug(f"Tentativa {attempt + 1} falhou para {host}: {e}")
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                response.release()
+
+            self.metrics.retries += 1
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    def get(self, url, **kwargs):
+        return _RequestContext(self, 'GET', url, kwargs)
+
+    def head(self, url, **kwargs):
+        return _RequestContext(self, 'HEAD', url, kwargs)
+
+    async def fetch_bytes(self, url, **kwargs):
+        """Corpo da resposta 200, ou None"""
+        async with self.get(url, **kwargs) as response:
+            if response.status != 200:
+                return None
+            return await response.read()
+
+    def stats(self):
+        return self.metrics.snapshot()
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
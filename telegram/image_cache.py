@@ -0,0 +1,283 @@
+# image_cache.py
+"""
+Cache em disco das imagens de produto, endereçado por conteúdo.
+
+Os bytes ficam em blobs/<hash[:2]>/<sha256>, então a mesma imagem servida
+por URLs diferentes (variações do mlstatic, links repassados) ocupa um
+único arquivo. Um índice SQLite no próprio diretório guarda, por URL, o
+hash, ETag/Last-Modified e o último acesso.
+
+- Entradas recentes (fresh_ttl) são servidas sem rede; as mais antigas são
+  revalidadas com If-None-Match/If-Modified-Since (304 = hit).
+- O tamanho total é limitado (max_bytes), com despejo LRU por último acesso.
+- URLs que falham entram em cache negativo com backoff exponencial, para
+  não baixar de novo a cada ciclo uma imagem que não existe mais.
+- O download é gravado em blocos direto no blob, calculando o hash no
+  caminho; imagens acima de max_object_bytes são recusadas sem ler o resto.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    NEGATIVE_MAX_SECONDS = 24 * 3600
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, cache_dir, max_bytes=200 * 1024 * 1024,
+                 fresh_ttl=6 * 3600, negative_ttl=300, max_object_bytes=10 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.index_path = os.path.join(cache_dir, 'index.db')
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self.negative_ttl = negative_ttl
+        self.max_object_bytes = max_object_bytes
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.errors = 0
+        self.evicted = 0
+        self.bytes_served = 0
+        self.bytes_downloaded = 0
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._init_index()
+
+    # ============================================================
+    # ÍNDICE E BLOBS
+    # ============================================================
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path)
+
+    def _init_index(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS negative (
+                url TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL DEFAULT 0,
+                retry_after REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_hash ON entries(hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+        conn.commit()
+        conn.close()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _read_blob(self, digest):
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    async def _stream_blob(self, response):
+        """Grava o corpo da resposta em blocos; retorna (hash, tamanho)"""
+        length = response.content_length
+        if self.max_object_bytes and length and length > self.max_object_bytes:
+            raise ValueError(f"imagem de {length // 1024} KB acima do limite")
+
+        sha = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.blob_dir, f"download.{os.getpid()}.{id(response)}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    size += len(chunk)
+                    if self.max_object_bytes and size > self.max_object_bytes:
+                        raise ValueError(f"imagem acima de {self.max_object_bytes // 1024} KB")
+                    sha.update(chunk)
+                    f.write(chunk)
+
+            digest = sha.hexdigest()
+            path = self._blob_path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return digest, size
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _store(self, url, digest, size, etag, last_modified):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO entries (url, hash, size, etag, last_modified, fetched_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (url, digest, size, etag, last_modified, now, now))
+        conn.execute("DELETE FROM negative WHERE url = ?", (url,))
+        conn.commit()
+        conn.close()
+        self._evict()
+
+    def _touch(self, url, revalidated=False):
+        now = time.time()
+        conn = self._connect()
+        if revalidated:
+            conn.execute("UPDATE entries SET last_access = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+        else:
+            conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+        conn.commit()
+        conn.close()
+
+    def _evict(self):
+        """Remove as URLs menos usadas até caber em max_bytes"""
+        conn = self._connect()
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT hash, MAX(size) AS size FROM entries GROUP BY hash)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            conn.close()
+            return
+
+        for url, digest in conn.execute(
+            "SELECT url, hash FROM entries ORDER BY last_access"
+        ).fetchall():
+            conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self.evicted += 1
+            # O blob só sai quando nenhuma outra URL aponta para ele
+            still_used = conn.execute("SELECT size FROM entries WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+            if not still_used:
+                path = self._blob_path(digest)
+                try:
+                    total -= os.path.getsize(path)
+                    os.unlink(path)
+                except OSError:
+                    pass
+            if total <= self.max_bytes:
+                break
+
+        conn.commit()
+        conn.close()
+
+    def _negative_wait(self, url):
+        conn = self._connect()
+        row = conn.execute("SELECT retry_after FROM negative WHERE url = ?", (url,)).fetchone()
+        conn.close()
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    def _record_failure(self, url, error):
+        self.errors += 1
+        conn = self._connect()
+        row = conn.execute("SELECT failures FROM negative WHERE url = ?", (url,)).fetchone()
+        failures = (row[0] if row else 0) + 1
+        wait = min(self.NEGATIVE_MAX_SECONDS, self.negative_ttl * (2 ** (failures - 1)))
+        conn.execute(
+            "INSERT OR REPLACE INTO negative (url, failures, retry_after, last_error) VALUES (?, ?, ?, ?)",
+            (url, failures, time.time() + wait, str(error)[:200])
+        )
+        conn.commit()
+        conn.close()
+
+    def _entry(self, url):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT hash, etag, last_modified, fetched_at FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        conn.close()
+        return row
+
+    # ============================================================
+    # API
+    # ============================================================
+
+    async def fetch(self, url, session, timeout=10):
+        """Bytes da imagem (do disco ou da rede), ou None se indisponível"""
+        if self._negative_wait(url) > 0:
+            self.negative_hits += 1
+            return None
+
+        entry = self._entry(url)
+        cached = None
+        headers = {}
+        if entry:
+            digest, etag, last_modified, fetched_at = entry
+            cached = self._read_blob(digest)
+            if cached is not None:
+                if time.time() - fetched_at < self.fresh_ttl:
+                    self.hits += 1
+                    self.bytes_served += len(cached)
+                    self._touch(url)
+                    return cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+        try:
+            async with session.get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 304 and cached is not None:
+                    self.revalidated += 1
+                    self.bytes_served += len(cached)
+                    self._touch(url, revalidated=True)
+                    return cached
+
+                if response.status != 200:
+                    self._record_failure(url, f"HTTP {response.status}")
+                    return None
+
+                digest, size = await self._stream_blob(response)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except Exception as e:
+            # Falha de rede: uma cópia antiga ainda serve
+            if cached is not None:
+                self.hits += 1
+                self.bytes_served += len(cached)
+                return cached
+            self._record_failure(url, e)
+            return None
+
+        self.misses += 1
+        self.bytes_downloaded += size
+        self.bytes_served += size
+        self._store(url, digest, size, etag, last_modified)
+        # Única cópia em memória: lida do blob recém-gravado
+        return self._read_blob(digest)
+
+    def contains(self, url):
+        """True se a URL já tem cópia em disco (sem tocar a rede)"""
+        entry = self._entry(url)
+        return bool(entry) and os.path.exists(self._blob_path(entry[0]))
+
+    def hit_ratio(self):
+        served = self.hits + self.revalidated
+        total = served + self.misses
+        return served / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'errors': self.errors,
+            'evicted': self.evicted,
+            'hit_ratio': round(self.hit_ratio(), 3),
+            'downloaded_kb': round(self.bytes_downloaded / 1024, 1),
+        }
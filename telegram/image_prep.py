@@ -0,0 +1,156 @@
+# image_prep.py
+"""
+Preparação das imagens de produto antes do upload ao Telegram.
+
+As imagens do Mercado Livre chegam como WebP grandes (D_NQ_NP_2X_*.webp).
+Aqui elas são decodificadas, reduzidas ao maior lado útil para foto no
+Telegram e recodificadas em JPEG, baixando a qualidade até caber no
+tamanho alvo. O trabalho roda num ProcessPoolExecutor para não travar o
+loop de eventos, e o resultado fica em cache pelo hash do conteúdo.
+
+Pillow é opcional: sem ele, as imagens seguem como vieram.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+QUALITY_STEPS = (85, 78, 70, 62, 55, 48, 40)
+
+
+def upload_name(data):
+    """
+    Nome de arquivo para enviar bytes da memória. O Telethon decide entre
+    foto e documento pela extensão (.jpg/.png); o que não é PNG segue como
+    .jpg, como no envio antigo por arquivo temporário.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'oferta.png'
+    return 'oferta.jpg'
+
+
+def normalize_image(data, max_side=1280, target_bytes=200 * 1024):
+    """
+    Roda no processo filho. Retorna (bytes, cpu_seconds, formato original);
+    os bytes são os originais quando a conversão não ajuda.
+    """
+    started = time.process_time()
+    with Image.open(BytesIO(data)) as img:
+        source_format = img.format
+        img.load()
+
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        output = data
+        for quality in QUALITY_STEPS:
+            buffer = BytesIO()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+            output = buffer.getvalue()
+            if len(output) <= target_bytes:
+                break
+
+    # JPEG original que já era menor: mantém
+    if source_format == 'JPEG' and len(data) <= len(output):
+        output = data
+    return output, time.process_time() - started, source_format
+
+
+class ImagePreparer:
+    def __init__(self, workers=2, max_side=1280, target_bytes=200 * 1024, cache_size=256):
+        self.workers = workers
+        self.max_side = max_side
+        self.target_bytes = target_bytes
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # sha256 -> bytes preparados
+        self._executor = None
+        self._warned = False
+
+        self.images = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.cpu_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def prepare(self, data):
+        """Bytes prontos para upload (JPEG reduzido), com cache por hash"""
+        if not self.enabled:
+            if not self._warned:
+                logger.warning("Pillow não instalado: imagens enviadas sem conversão")
+                self._warned = True
+            return data
+
+        key = hashlib.sha256(data).hexdigest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+
+        loop = asyncio.get_running_loop()
+        try:
+            output, cpu, source_format = await loop.run_in_executor(
+                self._get_executor(), normalize_image, data, self.max_side, self.target_bytes
+            )
+        except Exception as e:
+            # Formato que o Pillow não abre (ou processo filho falhou): segue o original
+            self.failures += 1
+            logger.warning(f"Falha ao preparar imagem: {e}")
+            return data
+
+        self.images += 1
+        self.cpu_seconds += cpu
+        self.bytes_in += len(data)
+        self.bytes_out += len(output)
+        logger.info(f"🧪 Imagem {source_format}: {len(data) / 1024:.1f} KB -> "
+                    f"{len(output) / 1024:.1f} KB (CPU {cpu * 1000:.0f} ms)")
+
+        self._cache[key] = output
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return output
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'images': self.images,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'cpu_ms': round(self.cpu_seconds * 1000),
+            'in_kb': round(self.bytes_in / 1024, 1),
+            'out_kb': round(self.bytes_out / 1024, 1),
+            'saved_kb': round((self.bytes_in - self.bytes_out) / 1024, 1),
+        }
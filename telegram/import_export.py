@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Backfill de grupos a partir da exportação do Telegram Desktop (result.json).
+
+Lê a exportação em streaming, passa cada mensagem pela extração do
+MessageMonitor (produto, quase-duplicata, domínio de afiliado) e grava os
+links em lote. No fim, o channel_cursor de cada grupo avança até a última
+mensagem exportada para o monitor ao vivo continuar dali.
+
+Execute:
+    python import_export.py result.json
+    python import_export.py result.json --group-id -1001234567890 --since 2025-06-01
+"""
+import argparse
+import logging
+import time
+
+from _message_monitor import MessageMonitor
+from desktop_export import iter_export_messages, to_message
+
+
+def import_export(path, db_path, group_id=None, batch_size=500, since=None):
+    monitor = MessageMonitor(db_path, bot=None)
+
+    stats = {'messages': 0, 'with_links': 0, 'inserted': 0, 'groups': 0}
+    last_ids = {}
+    names = {}
+    batch = []
+    batch_group = None
+
+    def flush():
+        nonlocal batch
+        if batch:
+            stats['inserted'] += monitor.save_tracked_links_bulk(batch_group, batch)
+            batch = []
+
+    for chat, raw in iter_export_messages(path):
+        gid = group_id or chat.get('chat_id')
+        if gid is None:
+            continue
+
+        if gid != batch_group:
+            flush()
+            batch_group = gid
+            names[gid] = chat.get('name') or str(gid)
+
+        # Cursor vai até a última mensagem exportada, mesmo as de serviço
+        if isinstance(raw.get('id'), int):
+            last_ids[gid] = max(last_ids.get(gid, 0), raw['id'])
+
+        if since and str(raw.get('date', '')) < since:
+            continue
+
+        msg = to_message(raw)
+        if not msg:
+            continue
+
+        stats['messages'] += 1
+        candidates = monitor.extract_candidates(msg, gid, names[gid])
+        if candidates:
+            stats['with_links'] += 1
+        batch.append((msg, candidates))
+
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+
+    for gid, last_id in last_ids.items():
+        monitor.advance_cursor(gid, last_id)
+        print(f"  📌 {names.get(gid, gid)} [{gid}] cursor -> {last_id}")
+
+    stats['groups'] = len(last_ids)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa result.json do Telegram Desktop')
+    parser.add_argument('export', help='Caminho do result.json')
+    parser.add_argument('--db', default='../database/affiliate.db', help='Banco SQLite')
+    parser.add_argument('--group-id', type=int, help='Força o ID do grupo (exportação de um chat)')
+    parser.add_argument('--since', help='Ignora mensagens anteriores a esta data (AAAA-MM-DD)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Mensagens por transação')
+    parser.add_argument('--verbose', action='store_true', help='Mostra o log de cada mensagem')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger('_message_monitor').setLevel(logging.WARNING)
+
+    print("=" * 60)
+    print(f"📥 Importando {args.export}")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    stats = import_export(args.export, args.db, args.group_id, args.batch_size, args.since)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✅ {stats['messages']} mensagens lidas em {elapsed:.1f}s "
+          f"({stats['messages'] / max(elapsed, 1e-9):,.0f} msg/s)")
+    print(f"   🔗 Mensagens com links válidos: {stats['with_links']}")
+    print(f"   💾 Links novos em tracked_links: {stats['inserted']}")
+    print(f"   👥 Grupos: {stats['groups']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# ingest_pipeline.py
+"""
+Pipeline de ingestão em estágios para o MessageMonitor.
+
+    grupos -> [fetch] -> fila -> [extract] -> fila -> [persist]
+
+Cada estágio tem seus próprios workers e as filas são limitadas: quando a
+gravação no SQLite fica lenta, a fila de persistência enche, os workers de
+extração bloqueiam no put() e a leitura dos grupos desacelera junto.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Vazão e latência de um estágio"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+        self.max_latency = 0.0
+
+    def record(self, wait, busy, emitted):
+        self.processed += 1
+        self.emitted += emitted
+        self.wait_time += wait
+        self.busy_time += busy
+        self.max_latency = max(self.max_latency, wait + busy)
+
+    def snapshot(self, queue_depth=0):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        n = max(self.processed, 1)
+        return {
+            'processed': self.processed,
+            'emitted': self.emitted,
+            'errors': self.errors,
+            'throughput_s': round(self.processed / elapsed, 2),
+            'avg_wait_ms': round(self.wait_time / n * 1000, 2),
+            'avg_busy_ms': round(self.busy_time / n * 1000, 2),
+            'max_latency_ms': round(self.max_latency * 1000, 2),
+            'queue': queue_depth,
+        }
+
+
+class Stage:
+    """Estágio com fila de entrada limitada e N workers"""
+
+    def __init__(self, name, handler, workers=1, maxsize=100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.output = None
+        self.stats = StageStats()
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, item):
+        await self.queue.put((time.monotonic(), item))
+
+    async def _worker(self):
+        while True:
+            enqueued, item = await self.queue.get()
+            started = time.monotonic()
+            emitted = 0
+            try:
+                results = await self.handler(item)
+                if self.output is not None:
+                    for result in results or ():
+                        # Bloqueia se o próximo estágio estiver cheio (backpressure)
+                        await self.output.put(result)
+                        emitted += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"[{self.name}] Erro: {e}")
+            finally:
+                self.stats.record(started - enqueued, time.monotonic() - started, emitted)
+                self.queue.task_done()
+
+
+class IngestPipeline:
+    """Liga os estágios fetch -> extract -> persist de um MessageMonitor"""
+
+    def __init__(self, monitor, fetch_workers=2, extract_workers=2,
+                 persist_workers=1, queue_size=200):
+        self.monitor = monitor
+        self.saved = 0
+
+        self.fetch = Stage('fetch', self._fetch, fetch_workers, queue_size)
+        self.extract = Stage('extract', self._extract, extract_workers, queue_size)
+        self.persist = Stage('persist', self._persist, persist_workers, queue_size)
+
+        self.fetch.output = self.extract
+        self.extract.output = self.persist
+        self.stages = (self.fetch, self.extract, self.persist)
+
+    # ------------------------------------------------------------------
+    # HANDLERS
+    # ------------------------------------------------------------------
+    async def _fetch(self, group):
+        messages = await self.monitor.get_group_messages(group['id'])
+        return [(group, msg) for msg in messages]
+
+    async def _extract(self, item):
+        group, msg = item
+        candidates = self.monitor.extract_candidates(
+            msg, group['id'], group.get('name', 'sem_nome')
+        )
+        return [(group, msg, candidates)]
+
+    async def _persist(self, item):
+        group, msg, candidates = item
+        self.saved += await self.monitor.persist_candidates(msg, group['id'], candidates)
+        return None
+
+    # ------------------------------------------------------------------
+    # CONTROLE
+    # ------------------------------------------------------------------
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def stop(self):
+        for stage in self.stages:
+            await stage.stop()
+
+    async def run_cycle(self, groups):
+        """Processa um ciclo completo e retorna quantos links foram salvos"""
+        self.saved = 0
+        for stage in self.stages:
+            stage.stats = StageStats()
+
+        for group in groups:
+            await self.fetch.put(group)
+
+        # Esvazia em ordem: nada volta para um estágio anterior
+        for stage in self.stages:
+            await stage.queue.join()
+
+        return self.saved
+
+    def stats(self):
+        return {
+            stage.name: stage.stats.snapshot(stage.queue.qsize())
+            for stage in self.stages
+        }
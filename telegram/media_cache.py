@@ -0,0 +1,74 @@
+# media_cache.py
+"""
+Cache de mídia já enviada ao Telegram, por hash do conteúdo.
+
+A mesma imagem vai para todos os destinos de uma oferta. Em vez de subir
+os bytes a cada send_file, a primeira chamada faz upload_file e as demais
+reutilizam o handle; depois do primeiro envio confirmado, o handle é
+trocado pela foto da mensagem (referência do servidor, sem upload).
+
+As entradas expiram após `ttl` segundos: partes de upload e referências
+de arquivo do Telegram não valem para sempre.
+"""
+import asyncio
+import hashlib
+import time
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class MediaCache:
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._entries = {}  # hash -> (media, expires_at)
+        self._locks = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.uploaded_bytes = 0
+        self.naive_bytes = 0  # o que seria enviado subindo a imagem a cada destino
+
+    def lock(self, key):
+        """Serializa o upload de um mesmo conteúdo entre envios concorrentes"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        media, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return media
+
+    def put(self, key, media):
+        self._entries[key] = (media, time.monotonic() + self.ttl)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def purge(self):
+        """Remove entradas vencidas e locks sem uso"""
+        now = time.monotonic()
+        for key in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+            del self._entries[key]
+        for key in [k for k, l in self._locks.items() if not l.locked() and k not in self._entries]:
+            del self._locks[key]
+
+    def snapshot(self):
+        return self.uploaded_bytes, self.naive_bytes
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'uploaded_kb': round(self.uploaded_bytes / 1024, 1),
+            'naive_kb': round(self.naive_bytes / 1024, 1),
+        }
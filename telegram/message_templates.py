@@ -0,0 +1,247 @@
+# message_templates.py
+"""
+Templates nomeados das mensagens de oferta, compilados uma vez.
+
+Cada template é texto com campos {nome} (sintaxe de str.format). Na
+compilação o texto vira uma lista de linhas com os campos já extraídos;
+renderizar é só escolher as linhas e chamar format_map nelas:
+
+- uma linha com algum campo vazio (None, '' ou ausente) some;
+- "?campo texto" só aparece se o campo tiver valor; "!campo texto", só
+  se não tiver (para linhas fixas como "🚨 OFERTA IMPERDÍVEL! 🚨");
+- linhas em branco seguidas viram uma só.
+
+Templates registrados: 'default' (a mensagem do _telegram_sender),
+'legacy' (a do telegram_sender antigo), 'compact' e 'rich' (as variações
+do MessageBuilder do Node) e 'config' (Config.MESSAGE_TEMPLATE).
+
+Sem metadata, a mensagem vira FALLBACK; o 'legacy' é a exceção e monta a
+mensagem inteira com o título 'Oferta Especial', como fazia o antigo.
+
+O texto de cada (template, link) fica num cache LRU: o mesmo link
+renderizado de novo (reenvio para destinos pendentes, outro ciclo) não
+relê o metadata.
+"""
+import json
+import logging
+import re
+import string
+from collections import OrderedDict
+
+from config import Config
+from offer_priority import discount_ratio, parse_price
+
+logger = logging.getLogger(__name__)
+
+FALLBACK = "🛍️ Oferta Especial\n\n🔗 {link}"
+
+# Templates que montam a mensagem inteira mesmo sem metadata
+FULL_WITHOUT_METADATA = {'legacy'}
+
+TEMPLATES = {
+    'default': """
+📦 {title}
+
+✨ {description}
+
+💰 Preço: {price}
+
+🎟 Cupom de desconto: {coupon}
+
+🛒 Comprar agora:
+👉 {link}
+
+🛡️ Compra segura
+""",
+    'legacy': """
+🛍️ **{legacy_title}**
+
+🔗 {link}
+
+⚡ Oferta exclusiva do grupo!
+✅ Compra 100% segura
+🚚 Entrega para todo Brasil
+
+📊 *Recomendação validada pelo sistema*
+""",
+    'compact': """
+{title}
+💰 {price_brl}
+🎟️ {coupon}
+🛒 {link}
+""",
+    'rich': """
+✨ {title} ✨
+
+{description}
+
+?discount 🚨 OFERTA IMPERDÍVEL! 🚨
+?discount 💸 De: {original_brl}
+?discount 🔥 Por: {price_brl}
+?discount 🎁 Economize {discount}%!
+!discount 💰 Preço: {price_brl}
+
+🎟️ USE O CUPOM: {coupon}
+
+🛒 COMPRE AGORA:
+👉 {link}
+
+✅ Entrega garantida | 🛡️ Compra segura
+""",
+    'config': Config.MESSAGE_TEMPLATE,
+}
+
+_GUARD = re.compile(r'^([?!])(\w+) ')
+
+
+def format_brl(value):
+    """179.9 -> 'R$ 179,90'; 1234.5 -> 'R$ 1.234,50'"""
+    if value is None:
+        return None
+    text = f"{value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return f"R$ {text}"
+
+
+def _price(meta):
+    raw = meta.get('product_price')
+    if not raw:
+        return None
+    try:
+        return f"R$ {float(raw):.2f}"
+    except (TypeError, ValueError):
+        return f"R$ {raw}"
+
+
+def _discount(meta):
+    return round(discount_ratio(meta) * 100) or None
+
+
+# Como cada campo sai do metadata; só os usados pelo template são calculados
+FIELDS = {
+    'title': lambda meta: meta.get('product_title') or meta.get('title') or 'Oferta imperdível',
+    'legacy_title': lambda meta: meta.get('product_title') or 'Oferta Especial',
+    'description': lambda meta: meta.get('ai_description'),
+    'price': _price,
+    'price_brl': lambda meta: format_brl(parse_price(meta.get('product_price'))),
+    'original_brl': lambda meta: format_brl(parse_price(meta.get('price_original'))) if _discount(meta) else None,
+    'discount': _discount,
+    'discount_info': lambda meta: f"🤑 {d}% OFF" if (d := _discount(meta)) else None,
+    # Só 'cupom', como o create_message antigo e o MessageBuilder do Node
+    'coupon': lambda meta: meta.get('cupom'),
+    'category': lambda meta: meta.get('category'),
+}
+
+
+def build_fields(affiliate_link, metadata, names=None):
+    """
+    Campos dos templates a partir do metadata (JSON) do link, só os com
+    valor; names limita o cálculo aos campos usados.
+    """
+    meta = json.loads(metadata) if metadata else {}
+    if not isinstance(meta, dict):
+        meta = {}
+    values = {'link': affiliate_link, 'url': affiliate_link} if affiliate_link else {}
+    for name in FIELDS if names is None else names:
+        builder = FIELDS.get(name)
+        if builder is not None:
+            value = builder(meta)
+            if value is not None and value != '':
+                values[name] = value
+    return values
+
+
+class MessageTemplate:
+    def __init__(self, name, source):
+        self.name = name
+        self._lines = []  # (guarda, negada, texto, campos, em branco)
+        formatter = string.Formatter()
+        for line in source.strip('\n').rstrip().splitlines():
+            line = line.rstrip()
+            guard, negate = None, False
+            match = _GUARD.match(line)
+            if match:
+                guard, negate = match.group(2), match.group(1) == '!'
+                line = line[match.end():]
+            # Valida as chaves já na compilação (ValueError se malformado)
+            fields = tuple(
+                re.split(r'[.\[]', field, maxsplit=1)[0]
+                for _, field, _, _ in formatter.parse(line) if field is not None
+            )
+            self._lines.append((guard, negate, line, frozenset(fields), not fields and not line.strip()))
+        # Campos calculados na renderização (os demais nem são lidos do metadata)
+        self.fields = tuple(dict.fromkeys(
+            name for guard, _, _, fields, _ in self._lines
+            for name in ((guard,) if guard else ()) + tuple(fields)
+        ))
+
+    def render(self, values):
+        """values: só campos com valor (build_fields); os ausentes contam como vazios"""
+        out = []
+        blank = True  # descarta linhas em branco no início
+        keys = values.keys()
+        for guard, negate, text, fields, is_blank in self._lines:
+            if guard is not None and (guard in keys) == negate:
+                continue
+            if is_blank:
+                if not blank:
+                    out.append('')
+                    blank = True
+                continue
+            if fields:
+                if not fields <= keys:
+                    continue
+                text = text.format_map(values)
+            out.append(text)
+            blank = False
+        if blank and out:
+            out.pop()
+        return '\n'.join(out)
+
+
+class TemplateEngine:
+    def __init__(self, templates=None, cache_size=2048):
+        self.templates = {}
+        for name, source in (templates or TEMPLATES).items():
+            self.register(name, source)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (template, link_id) -> (link, metadata, texto)
+
+        self.renders = 0
+        self.hits = 0
+
+    def register(self, name, source):
+        self.templates[name] = MessageTemplate(name, source)
+
+    def render(self, name, affiliate_link, metadata, link_id=None):
+        """
+        Texto do link no template `name`. Com link_id, o resultado fica em
+        cache enquanto link e metadata não mudarem.
+        """
+        key = (name, link_id)
+        if link_id is not None:
+            cached = self._cache.get(key)
+            if cached and cached[0] == affiliate_link and cached[1] == metadata:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+
+        if not metadata and name not in FULL_WITHOUT_METADATA:
+            text = FALLBACK.format(link=affiliate_link)
+        else:
+            template = self.templates[name]
+            text = template.render(build_fields(affiliate_link, metadata, template.fields))
+        self.renders += 1
+
+        if link_id is not None:
+            self._cache[key] = (affiliate_link, metadata, text)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def stats(self):
+        return {
+            'templates': len(self.templates),
+            'renders': self.renders,
+            'hits': self.hits,
+            'cached': len(self._cache),
+        }
@@ -0,0 +1,251 @@
+# offer_priority.py
+"""
+Fila de prioridade dos links prontos para envio.
+
+Cada link 'ready' recebe uma nota uma única vez, gravada na coluna
+tracked_links.priority_score (indexada junto com status):
+
+    desconto (price_original vs product_price) * PRIORITY_WEIGHT_DISCOUNT
+    + cupom presente                           * PRIORITY_WEIGHT_COUPON
+    + rendimento do grupo de origem            * PRIORITY_WEIGHT_YIELD
+    + horas desde a época de created_at        * PRIORITY_FRESHNESS_PER_HOUR
+
+O termo de frescor cresce com o horário de criação em vez de decair com
+o tempo: a ordem é a mesma de "descontar pontos por hora de espera", mas a
+nota gravada nunca precisa ser recalculada. Com o peso padrão, uma oferta
+com 60 % de desconto passa na frente de uma com 30 % criada até 15 h depois.
+
+O rendimento do grupo é a fração dos links do grupo que chegaram a
+'ready'/'sent' (com suavização, para grupos novos ficarem no meio).
+
+Em memória fica um heap com (-nota, id); só os links ainda sem nota são
+lidos do banco a cada ciclo. Um link que sai do heap sem ter sido enviado
+(deixou de estar pronto ou ficou sem affiliate_link) volta a ter nota
+NULL, e refresh() o coloca de novo na fila quando voltar a ser enviável.
+"""
+import heapq
+import json
+import logging
+import re
+import sqlite3
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def parse_price(value):
+    """Preço numérico a partir de 179.99, '179,99' ou 'R$ 1.234,56'"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r'[^\d.,]', '', str(value))
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def discount_ratio(meta):
+    """Desconto de 0 a 1 (0 quando não há preço original válido)"""
+    price = parse_price(meta.get('product_price'))
+    original = parse_price(meta.get('price_original'))
+    if not price or not original or original <= price:
+        return 0.0
+    return min(1.0, (original - price) / original)
+
+
+def offer_score(meta, created_epoch, group_yield=0.5):
+    score = discount_ratio(meta) * Config.PRIORITY_WEIGHT_DISCOUNT
+    if meta.get('cupom') or meta.get('coupon'):
+        score += Config.PRIORITY_WEIGHT_COUPON
+    score += group_yield * Config.PRIORITY_WEIGHT_YIELD
+    score += (created_epoch or 0) / 3600 * Config.PRIORITY_FRESHNESS_PER_HOUR
+    return score
+
+
+class OfferQueue:
+    YIELD_TTL_SECONDS = 600
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._heap = []  # (-nota, id)
+        self._queued = set()
+        self._yields = {}
+        self._yields_at = 0.0
+        self._loaded = False
+
+        self.scored = 0
+        self.dropped = 0
+
+        self._ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _ensure_schema(self):
+        conn = self._connect()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tracked_links)")}
+        if columns:
+            if 'priority_score' not in columns:
+                conn.execute("ALTER TABLE tracked_links ADD COLUMN priority_score REAL")
+                logger.info("Coluna priority_score adicionada em tracked_links")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tracked_links_priority "
+                "ON tracked_links(status, priority_score)"
+            )
+            conn.commit()
+        conn.close()
+
+    def _group_yields(self, conn):
+        """Fração (suavizada) dos links de cada grupo que viraram oferta"""
+        if time.time() - self._yields_at < self.YIELD_TTL_SECONDS:
+            return self._yields
+        rows = conn.execute("""
+            SELECT group_jid,
+                   SUM(CASE WHEN status IN ('ready', 'sent') THEN 1 ELSE 0 END),
+                   COUNT(*)
+            FROM tracked_links
+            GROUP BY group_jid
+        """).fetchall()
+        self._yields = {jid: (good + 1) / (total + 2) for jid, good, total in rows}
+        self._yields_at = time.time()
+        return self._yields
+
+    def _push(self, link_id, score):
+        if link_id not in self._queued:
+            heapq.heappush(self._heap, (-score, link_id))
+            self._queued.add(link_id)
+
+    def refresh(self):
+        """Dá nota aos links prontos que ainda não têm e os coloca no heap"""
+        conn = self._connect()
+        try:
+            if not self._loaded:
+                for link_id, score in conn.execute("""
+                    SELECT id, priority_score FROM tracked_links
+                    WHERE status = 'ready' AND priority_score IS NOT NULL
+                """):
+                    self._push(link_id, score)
+                self._loaded = True
+
+            rows = conn.execute("""
+                SELECT id, metadata, group_jid,
+                       CAST(strftime('%s', COALESCE(created_at, 'now')) AS INTEGER)
+                FROM tracked_links tl
+                WHERE status = 'ready' AND priority_score IS NULL
+                AND affiliate_link IS NOT NULL
+                AND affiliate_link != ''
+                AND NOT EXISTS (
+                    SELECT 1 FROM telegram_sent ts WHERE ts.tracked_link_id = tl.id
+                )
+            """).fetchall()
+            if not rows:
+                return 0
+
+            yields = self._group_yields(conn)
+            updates = []
+            for link_id, metadata, group_jid, created_epoch in rows:
+                try:
+                    meta = json.loads(metadata) if metadata else {}
+                except (TypeError, ValueError):
+                    meta = {}
+                if not isinstance(meta, dict):
+                    meta = {}
+                score = offer_score(meta, created_epoch, yields.get(group_jid, 0.5))
+                updates.append((score, link_id))
+                self._push(link_id, score)
+
+            conn.executemany("UPDATE tracked_links SET priority_score = ? WHERE id = ?", updates)
+            conn.commit()
+            self.scored += len(updates)
+            return len(updates)
+        finally:
+            conn.close()
+
+    def _pending(self, conn, ids, columns):
+        """
+        {id: (colunas, na fila de reenvio)} dos links ainda não enviados;
+        ids ausentes foram enviados ou deixaram de estar prontos.
+        """
+        has_retry_queue = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'telegram_retry_queue'"
+        ).fetchone()
+        in_retry = """EXISTS (
+                SELECT 1 FROM telegram_retry_queue rq
+                WHERE rq.tracked_link_id = tl.id
+            )""" if has_retry_queue else "0"
+
+        placeholders = ', '.join('?' * len(ids))
+        rows = conn.execute(f"""
+            SELECT tl.id, {in_retry}, {', '.join('tl.' + c for c in columns)}
+            FROM tracked_links tl
+            WHERE tl.id IN ({placeholders})
+            AND tl.status = 'ready'
+            AND tl.affiliate_link IS NOT NULL
+            AND tl.affiliate_link != ''
+            AND NOT EXISTS (
+                SELECT 1 FROM telegram_sent ts
+                WHERE ts.tracked_link_id = tl.id
+            )
+        """, ids).fetchall()
+        return {row[0]: (row[2:], bool(row[1])) for row in rows}
+
+    def take(self, limit, columns=('id', 'affiliate_link', 'metadata', 'copy_text')):
+        """
+        Os `limit` links de maior nota ainda pendentes, com as colunas
+        pedidas. Links já enviados saem do heap; os devolvidos e os que
+        estão na fila de reenvio continuam nele até serem enviados.
+        """
+        if limit <= 0:
+            return []
+        conn = self._connect()
+        chosen = []
+        held = []  # voltam ao heap no fim
+        dropped = []
+        try:
+            while len(chosen) < limit and self._heap:
+                batch = [heapq.heappop(self._heap)
+                         for _ in range(min(len(self._heap), (limit - len(chosen)) * 2))]
+                pending = self._pending(conn, [link_id for _, link_id in batch], columns)
+                for entry in batch:
+                    link_id = entry[1]
+                    if link_id not in pending:
+                        self._queued.discard(link_id)
+                        dropped.append(link_id)
+                        self.dropped += 1
+                        continue
+                    row, retrying = pending[link_id]
+                    if not retrying and len(chosen) < limit:
+                        chosen.append(row)
+                    held.append(entry)
+            if dropped:
+                self._unscore(conn, dropped)
+            return chosen
+        finally:
+            for entry in held:
+                heapq.heappush(self._heap, entry)
+            conn.close()
+
+    def _unscore(self, conn, ids):
+        """Apaga a nota dos links que saíram sem envio (refresh os pega de volta)"""
+        placeholders = ', '.join('?' * len(ids))
+        conn.execute(f"""
+            UPDATE tracked_links SET priority_score = NULL
+            WHERE id IN ({placeholders})
+            AND NOT EXISTS (
+                SELECT 1 FROM telegram_sent ts WHERE ts.tracked_link_id = tracked_links.id
+            )
+        """, ids)
+        conn.commit()
+
+    def stats(self):
+        return {
+            'queued': len(self._heap),
+            'scored': self.scored,
+            'dropped': self.dropped,
+        }
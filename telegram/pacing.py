@@ -0,0 +1,263 @@
+# pacing.py
+"""
+Cota diária e intervalo mínimo por destino do Telegram.
+
+Os limites seguem target_groups (daily_limit, min_interval, is_active)
+quando há uma linha com group_jid igual ao id do chat; sem linha, valem
+Config.MAX_MESSAGES_PER_DAY e Config.TELEGRAM_MIN_INTERVAL_SECONDS. Os
+chats do Telegram não são inseridos em target_groups: o agendador do
+WhatsApp (Node) envia para toda linha ativa daquela tabela.
+
+O próximo horário livre de cada destino fica num min-heap, então achar os
+destinos liberados custa O(log n) por destino. A virada do dia é
+preguiçosa: o contador zera na primeira consulta depois da meia-noite
+(horário local), sem cron. Os contadores vão para telegram_pacing em
+lotes (flush_every envios ou flush_seconds), não a cada mensagem.
+"""
+import heapq
+import logging
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def next_midnight(now):
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+class TargetPacer:
+    def __init__(self, db_path,
+                 daily_limit=Config.MAX_MESSAGES_PER_DAY,
+                 min_interval=Config.TELEGRAM_MIN_INTERVAL_SECONDS,
+                 flush_every=20, flush_seconds=60):
+        self.db_path = db_path
+        self.daily_limit = daily_limit
+        self.min_interval = min_interval
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+
+        self.state = {}  # target_id -> limites e contadores
+        self._heap = []  # (próximo horário livre, versão, target_id)
+        self._active = set()
+        self._out = set()  # entregues por due() e ainda sem done()
+        self._dirty = set()
+        self._flushed_at = time.time()
+
+        self.sends = 0
+        self.deferred = 0
+        self.flushes = 0
+
+        self._init_db()
+
+    # ============================================================
+    # PERSISTÊNCIA
+    # ============================================================
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_pacing (
+                target_id TEXT PRIMARY KEY,
+                sent_today INTEGER NOT NULL DEFAULT 0,
+                last_reset DATE NOT NULL,
+                last_sent REAL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load(self, target_ids):
+        """Limites (target_groups) e contadores (telegram_pacing) dos destinos novos"""
+        placeholders = ', '.join('?' * len(target_ids))
+        conn = self._connect()
+        counters = {
+            row[0]: row[1:] for row in conn.execute(f"""
+                SELECT target_id, sent_today, last_reset, last_sent
+                FROM telegram_pacing WHERE target_id IN ({placeholders})
+            """, target_ids)
+        }
+        limits = {}
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'target_groups'").fetchone():
+            limits = {
+                row[0]: row[1:] for row in conn.execute(f"""
+                    SELECT group_jid, daily_limit, min_interval, is_active
+                    FROM target_groups WHERE group_jid IN ({placeholders})
+                """, target_ids)
+            }
+        conn.close()
+
+        today = date.today().isoformat()
+        for target_id in target_ids:
+            sent_today, last_reset, last_sent = counters.get(target_id, (0, today, None))
+            daily_limit, min_interval, is_active = limits.get(
+                target_id, (self.daily_limit, self.min_interval, 1)
+            )
+            self.state[target_id] = {
+                'daily_limit': daily_limit if daily_limit is not None else self.daily_limit,
+                'min_interval': min_interval if min_interval is not None else self.min_interval,
+                'paused': not is_active,
+                'sent_today': sent_today,
+                'day': last_reset,
+                'last_sent': last_sent,
+                'version': 0,
+            }
+
+    def flush(self, force=True):
+        """Grava os contadores alterados de uma vez"""
+        if not self._dirty:
+            return
+        if not force and len(self._dirty) < self.flush_every and \
+                time.time() - self._flushed_at < self.flush_seconds:
+            return
+        conn = self._connect()
+        conn.executemany("""
+            INSERT OR REPLACE INTO telegram_pacing (target_id, sent_today, last_reset, last_sent)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (tid, self.state[tid]['sent_today'], self.state[tid]['day'], self.state[tid]['last_sent'])
+            for tid in self._dirty
+        ])
+        conn.commit()
+        conn.close()
+        self._dirty.clear()
+        self._flushed_at = time.time()
+        self.flushes += 1
+
+    # ============================================================
+    # AGENDA
+    # ============================================================
+
+    def _roll(self, state, now):
+        """Virada do dia preguiçosa: zera o contador na primeira consulta do dia"""
+        today = datetime.fromtimestamp(now).date().isoformat()
+        if state['day'] != today:
+            state['day'] = today
+            state['sent_today'] = 0
+
+    def _next_time(self, target_id, now):
+        state = self.state[target_id]
+        self._roll(state, now)
+        if state['paused']:
+            return float('inf')
+        if state['sent_today'] >= state['daily_limit']:
+            return next_midnight(now)
+        if state['last_sent'] is None:
+            return now
+        return state['last_sent'] + state['min_interval']
+
+    def _schedule(self, target_id, now):
+        state = self.state[target_id]
+        state['version'] += 1
+        self._out.discard(target_id)
+        heapq.heappush(self._heap, (self._next_time(target_id, now), state['version'], target_id))
+
+    def sync_targets(self, targets):
+        """
+        Atualiza o conjunto de destinos (ids novos entram no heap). Destinos
+        que saíram por due() e não voltaram com done() (o ciclo anterior
+        parou numa exceção) também voltam ao heap aqui.
+        """
+        ids = [str(t['id']) for t in targets]
+        new = [tid for tid in ids if tid not in self.state]
+        if new:
+            self._load(new)
+        now = time.time()
+        lost = self._out & set(ids)
+        if lost:
+            logger.warning(f"🚦 {len(lost)} destino(s) sem done() no ciclo anterior; reagendados")
+        for tid in ids:
+            if tid not in self._active or tid in lost:
+                self._schedule(tid, now)
+        self._active = set(ids)
+
+    def due(self, now=None):
+        """
+        Destinos liberados agora (saem do heap). Cada um precisa voltar com
+        done(), tenha enviado ou não.
+        """
+        now = now or time.time()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            when, version, target_id = heapq.heappop(self._heap)
+            state = self.state.get(target_id)
+            if target_id not in self._active or state is None or version != state['version']:
+                continue  # entrada velha ou destino removido
+            if self._next_time(target_id, now) > now:
+                # Virou o dia com cota estourada ou ficou pausado: reagenda
+                self._schedule(target_id, now)
+                continue
+            ready.append(target_id)
+            self._out.add(target_id)
+        return ready
+
+    def done(self, target_id, sent, now=None):
+        """Registra o resultado do destino e o devolve ao heap"""
+        now = now or time.time()
+        target_id = str(target_id)
+        if target_id not in self.state:
+            return
+        if sent:
+            self.record(target_id, now)
+        else:
+            self._schedule(target_id, now)
+
+    def record(self, target_id, now=None):
+        """Conta um envio (inclusive reenvios fora do heap)"""
+        now = now or time.time()
+        target_id = str(target_id)
+        state = self.state.get(target_id)
+        if state is None:
+            self._load([target_id])
+            state = self.state[target_id]
+        self._roll(state, now)
+        state['sent_today'] += 1
+        state['last_sent'] = now
+        self.sends += 1
+        self._dirty.add(target_id)
+        if target_id in self._active:
+            self._schedule(target_id, now)
+        self.flush(force=False)
+
+    def ready_at(self, target_id, now=None):
+        """Quando o destino pode receber de novo (cota e intervalo); vale para reenvios fora do heap"""
+        now = now or time.time()
+        target_id = str(target_id)
+        if target_id not in self.state:
+            self._load([target_id])
+        return self._next_time(target_id, now)
+
+    def defer(self, count=1):
+        self.deferred += count
+
+    def seconds_until_next(self, now=None):
+        """Segundos até o próximo destino liberar (0 se já há algum)"""
+        now = now or time.time()
+        while self._heap:
+            when, version, target_id = self._heap[0]
+            state = self.state.get(target_id)
+            if target_id in self._active and state and version == state['version']:
+                return max(0.0, when - now)
+            heapq.heappop(self._heap)
+        return None
+
+    def stats(self):
+        today = date.today().isoformat()
+        return {
+            'targets': len(self._active),
+            'sends': self.sends,
+            'deferred': self.deferred,
+            'flushes': self.flushes,
+            'at_limit': sum(
+                1 for tid in self._active
+                if self.state[tid]['day'] == today
+                and self.state[tid]['sent_today'] >= self.state[tid]['daily_limit']
+            ),
+        }
@@ -0,0 +1,215 @@
+# permission_prober.py
+"""
+Consulta das permissões do bot nos chats, concorrente e com cache.
+
+Para cada chat guarda can_send, is_admin e can_send_media, com o horário
+da consulta, em memória e na tabela telegram_bot_permissions. O resultado
+vale até o ttl vencer ou até invalidate() (chamado pelos eventos de
+entrada/saída e mudança de permissões). probe_many() consulta vários
+chats em paralelo, limitado por um semáforo e pelo balde global do
+RateLimiter, em vez de um get_permissions por vez com pausa fixa.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+
+from telethon.errors import FloodWaitError, UserNotParticipantError
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('has_access', 'can_send', 'is_admin', 'can_send_media')
+
+
+def _denied(flag, *rights):
+    """True se algum dos ChatBannedRights proíbe a ação"""
+    return any(getattr(r, flag, False) for r in rights if r is not None)
+
+
+def describe(perms, entity):
+    """Converte ParticipantPermissions do Telethon nas flags do cache"""
+    banned = getattr(perms.participant, 'banned_rights', None)
+    default = getattr(entity, 'default_banned_rights', None)
+
+    if perms.has_left or _denied('view_messages', banned):
+        return dict.fromkeys(FIELDS, False)
+
+    is_admin = bool(perms.is_admin)
+    if getattr(entity, 'broadcast', False):
+        # Em canal só posta quem é dono ou admin com post_messages
+        can_send = bool(perms.is_creator or perms.post_messages)
+        can_send_media = can_send
+    elif is_admin:
+        can_send = can_send_media = True
+    else:
+        can_send = not _denied('send_messages', banned, default)
+        can_send_media = can_send and not (
+            _denied('send_media', banned, default) or _denied('send_photos', banned, default)
+        )
+
+    return {
+        'has_access': True,
+        'can_send': can_send,
+        'is_admin': is_admin,
+        'can_send_media': can_send_media,
+    }
+
+
+class PermissionProber:
+    def __init__(self, telegram, db_path=None, rate_limiter=None, ttl=3600, concurrency=8):
+        """
+        Args:
+            telegram: TelegramManager conectado (bot_client, bot_me)
+            db_path: banco para persistir o cache (None = só memória)
+            rate_limiter: RateLimiter compartilhado (opcional)
+        """
+        self.telegram = telegram
+        self.db_path = db_path
+        self.rate_limiter = rate_limiter
+        self.ttl = ttl
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._cache = {}  # chat_id -> resultado
+        self._loaded = False
+
+        self.probes = 0
+        self.hits = 0
+        self.errors = 0
+
+        if self.db_path:
+            self._init_db()
+
+    # ============================================================
+    # PERSISTÊNCIA
+    # ============================================================
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_bot_permissions (
+                chat_id INTEGER PRIMARY KEY,
+                has_access INTEGER NOT NULL,
+                can_send INTEGER NOT NULL,
+                is_admin INTEGER NOT NULL,
+                can_send_media INTEGER NOT NULL,
+                error TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        """Carrega uma vez as consultas ainda válidas do banco"""
+        self._loaded = True
+        if not self.db_path:
+            return
+        conn = self._connect()
+        rows = conn.execute(f"""
+            SELECT chat_id, {', '.join(FIELDS)}, error, checked_at
+            FROM telegram_bot_permissions WHERE checked_at > ?
+        """, (time.time() - self.ttl,)).fetchall()
+        conn.close()
+        for chat_id, *flags, error, checked_at in rows:
+            result = {k: bool(v) for k, v in zip(FIELDS, flags)}
+            result.update(chat_id=chat_id, error=error, checked_at=checked_at)
+            self._cache[chat_id] = result
+
+    def _save(self, results):
+        if not self.db_path or not results:
+            return
+        conn = self._connect()
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO telegram_bot_permissions
+                (chat_id, {', '.join(FIELDS)}, error, checked_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (r['chat_id'], *(int(r[k]) for k in FIELDS), r['error'], r['checked_at'])
+            for r in results
+        ])
+        conn.commit()
+        conn.close()
+
+    # ============================================================
+    # CONSULTA
+    # ============================================================
+
+    def cached(self, chat_id):
+        """Resultado ainda válido, sem tocar a rede (ou None)"""
+        if not self._loaded:
+            self._load()
+        result = self._cache.get(int(chat_id))
+        if result and time.time() - result['checked_at'] < self.ttl:
+            return result
+        return None
+
+    async def _fetch(self, chat_id):
+        bot = self.telegram.bot_client
+        result = dict.fromkeys(FIELDS, False)
+        result.update(chat_id=chat_id, error=None, checked_at=time.time())
+        if not bot:
+            result['error'] = 'bot não conectado'
+            return result
+
+        async with self.semaphore:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_global(2)
+            self.probes += 1
+            try:
+                entity = await bot.get_entity(chat_id)
+                perms = await bot.get_permissions(entity, self.telegram.bot_me.id)
+                result.update(describe(perms, entity))
+            except (ValueError, UserNotParticipantError) as e:
+                # Bot fora do chat (ou chat que o bot nunca viu)
+                result['error'] = str(e)[:200]
+            except FloodWaitError as e:
+                self.errors += 1
+                logger.warning(f"FloodWait de {e.seconds}s consultando permissões de {chat_id}")
+                return None
+            except Exception as e:
+                self.errors += 1
+                result['error'] = str(e)[:200]
+        return result
+
+    async def probe_many(self, chat_ids, force=False):
+        """Permissões de vários chats: {chat_id: resultado}; consulta em paralelo só o que venceu"""
+        results = {}
+        missing = []
+        for chat_id in dict.fromkeys(int(c) for c in chat_ids):
+            result = None if force else self.cached(chat_id)
+            if result is not None:
+                self.hits += 1
+                results[chat_id] = result
+            else:
+                missing.append(chat_id)
+
+        fresh = [r for r in await asyncio.gather(*(self._fetch(c) for c in missing)) if r is not None]
+        for result in fresh:
+            self._cache[result['chat_id']] = result
+            results[result['chat_id']] = result
+        self._save(fresh)
+        return results
+
+    async def probe(self, chat_id, force=False):
+        """Permissões de um chat (ou None se a consulta não foi possível)"""
+        return (await self.probe_many([chat_id], force=force)).get(int(chat_id))
+
+    def invalidate(self, chat_id):
+        """Descarta o resultado de um chat (evento de entrada/saída/permissão)"""
+        chat_id = int(chat_id)
+        self._cache.pop(chat_id, None)
+        if self.db_path:
+            conn = self._connect()
+            conn.execute("DELETE FROM telegram_bot_permissions WHERE chat_id = ?", (chat_id,))
+            conn.commit()
+            conn.close()
+
+    def stats(self):
+        return {
+            'cached': len(self._cache),
+            'probes': self.probes,
+            'hits': self.hits,
+            'errors': self.errors,
+        }
@@ -0,0 +1,99 @@
+# prefetch.py
+"""
+Pré-busca das imagens dos próximos links prontos.
+
+Enquanto um link está sendo entregue, as imagens dos próximos `depth` links
+já são baixadas em paralelo para o ImageCache. Na hora do envio, get()
+devolve a imagem do disco ou aguarda o download que já está em andamento,
+em vez de começar do zero.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePrefetcher:
+    def __init__(self, image_cache, http, depth=10, concurrency=4, cdn=None):
+        self.image_cache = image_cache
+        self.http = http
+        self.cdn = cdn  # CdnRewriter opcional (variantes menores)
+        self.depth = depth
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = {}  # url -> Task com os bytes
+
+        self.scheduled = 0
+        self.sends = 0
+        self.cached = 0     # imagem já estava no disco na hora do envio
+        self.in_flight = 0  # pré-busca ainda em andamento; o envio aguardou
+        self.cold = 0       # sem pré-busca: download no momento do envio
+
+    @staticmethod
+    def _fetchable(url):
+        return bool(url) and not url.startswith('data:')
+
+    def _cached(self, url):
+        if self.cdn:
+            return self.cdn.contains(self.image_cache, url)
+        return self.image_cache.contains(url)
+
+    async def _download(self, url):
+        if self.cdn:
+            return await self.cdn.fetch(self.image_cache, url, self.http)
+        return await self.image_cache.fetch(url, self.http)
+
+    def schedule(self, urls):
+        """Agenda a pré-busca das imagens dos próximos links (até depth)"""
+        urls = [u for u in urls if self._fetchable(u)][:self.depth]
+        wanted = set(urls)
+
+        # Descarta pré-buscas concluídas de links que saíram da janela
+        for url in [u for u, t in self.tasks.items() if t.done() and u not in wanted]:
+            del self.tasks[url]
+
+        for url in urls:
+            if url in self.tasks or self._cached(url):
+                continue
+            self.tasks[url] = asyncio.create_task(self._fetch(url))
+            self.scheduled += 1
+
+    async def _fetch(self, url):
+        async with self.semaphore:
+            try:
+                return await self._download(url)
+            except Exception as e:
+                logger.warning(f"Pré-busca falhou para {url[:80]}: {e}")
+                return None
+
+    async def get(self, url):
+        """Bytes da imagem para envio, aproveitando a pré-busca"""
+        self.sends += 1
+        task = self.tasks.pop(url, None)
+        if task is not None:
+            if task.done():
+                self.cached += 1
+            else:
+                self.in_flight += 1
+            return await task
+
+        if self._cached(url):
+            self.cached += 1
+        else:
+            self.cold += 1
+        return await self._download(url)
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'scheduled': self.scheduled,
+            'sends': self.sends,
+            'cached': self.cached,
+            'in_flight': self.in_flight,
+            'cold': self.cold,
+            'cached_ratio': round(self.cached / self.sends, 3) if self.sends else 0.0,
+        }
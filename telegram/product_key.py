@@ -0,0 +1,123 @@
+# product_key.py
+"""
+Identidade de produto a partir de URLs de oferta.
+
+A mesma oferta chega com caminhos, query strings e encurtadores diferentes.
+Aqui extraímos uma chave estável (ID MLB, ASIN, shop/item da Shopee) para
+deduplicar antes de gravar no banco ou gerar link de afiliado.
+"""
+import re
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+# MLB-1234567890, MLB1234567890 (item ou catálogo)
+ML_ID_RE = re.compile(r'\b(ML[ABMUCV]|MCO|MPE)-?(\d{6,})', re.IGNORECASE)
+
+# /dp/B0XXXXXXX, /gp/product/B0XXXXXXX, /gp/aw/d/B0XXXXXXX
+ASIN_RE = re.compile(
+    r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?=[/?#]|$)',
+    re.IGNORECASE
+)
+
+# Slug "nome-do-produto-i.<shop>.<item>" ou /product/<shop>/<item>
+SHOPEE_SLUG_RE = re.compile(r'-i\.(\d+)\.(\d+)')
+SHOPEE_PATH_RE = re.compile(r'/product/(\d+)/(\d+)')
+
+
+def _extract_mercadolivre(parsed):
+    # Parâmetros explícitos de item têm prioridade sobre o caminho
+    query = parse_qs(parsed.query)
+    for param in ('wid', 'item_id'):
+        for value in query.get(param, []):
+            m = ML_ID_RE.search(value)
+            if m:
+                return f"{m.group(1).upper()}{m.group(2)}"
+
+    for part in (parsed.path, parsed.fragment):
+        m = ML_ID_RE.search(part)
+        if m:
+            return f"{m.group(1).upper()}{m.group(2)}"
+    return None
+
+
+def _extract_amazon(parsed):
+    m = ASIN_RE.search(parsed.path)
+    if m:
+        return m.group(1).upper()
+
+    asin = parse_qs(parsed.query).get('asin')
+    if asin and len(asin[0]) == 10:
+        return asin[0].upper()
+    return None
+
+
+def _extract_shopee(parsed):
+    m = SHOPEE_SLUG_RE.search(parsed.path) or SHOPEE_PATH_RE.search(parsed.path)
+    if m:
+        return f"{m.group(1)}.{m.group(2)}"
+    return None
+
+
+EXTRACTORS = (
+    ('mercadolivre', _extract_mercadolivre),
+    ('amazon', _extract_amazon),
+    ('shopee', _extract_shopee),
+)
+
+
+def extract_product_key(url: str):
+    """
+    Retorna a chave do produto ('mercadolivre:MLB123', 'amazon:B0...',
+    'shopee:<shop>.<item>') ou None quando a URL não identifica o produto
+    (ex.: links encurtados).
+    """
+    if not url:
+        return None
+
+    if not url.lower().startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    host = parsed.netloc.lower()
+    for store, extractor in EXTRACTORS:
+        if store not in host:
+            continue
+        product_id = extractor(parsed)
+        if product_id:
+            return f"{store}:{product_id}"
+        return None
+
+    return None
+
+
+class RecentKeys:
+    """LRU em memória das chaves vistas recentemente"""
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        if not key:
+            return
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
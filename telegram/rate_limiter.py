@@ -0,0 +1,157 @@
+# rate_limiter.py
+"""
+Rate limiter por token bucket para os envios ao Telegram.
+
+Um balde global (limite de mensagens por segundo do bot) e um balde por
+chat: chats privados aceitam ~1 mensagem/s e grupos/canais ~20 por minuto.
+Quem envia chama acquire(chat_id) antes da chamada à API; a espera é só a
+necessária para haver ficha nos dois baldes, em vez de sleeps fixos.
+
+Um FloodWait bloqueia o chat pelo tempo pedido e reduz a taxa dele à
+metade (e a global em 10%); cada envio bem-sucedido devolve aos poucos a
+taxa nominal.
+"""
+import asyncio
+import time
+
+from config import Config
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.nominal_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now, cost=1):
+        """Segundos até haver `cost` fichas disponíveis"""
+        self._refill(now)
+        # Custo acima da capacidade nunca seria atendido: basta o balde cheio
+        # (consume desconta o custo inteiro, e o saldo negativo atrasa o próximo)
+        cost = min(cost, self.capacity)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < cost:
+            wait = max(wait, (cost - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, cost=1):
+        self.tokens -= cost
+
+    def slow_down(self, factor, floor):
+        self.rate = max(self.nominal_rate * floor, self.rate * factor)
+
+    def recover(self, step):
+        if self.rate < self.nominal_rate:
+            self.rate = min(self.nominal_rate, self.rate + self.nominal_rate * step)
+
+
+class RateLimiter:
+    """Balde global + baldes por chat, compartilhados por todos os envios"""
+
+    # Recuperação por envio bem-sucedido (fração da taxa nominal)
+    RECOVERY_STEP = 0.05
+    # A taxa de um chat penalizado nunca cai abaixo desta fração da nominal
+    RATE_FLOOR = 0.125
+
+    def __init__(self,
+                 global_rate=Config.RATE_LIMIT_GLOBAL_PER_SECOND,
+                 private_rate=Config.RATE_LIMIT_PRIVATE_PER_SECOND,
+                 group_per_minute=Config.RATE_LIMIT_GROUP_PER_MINUTE,
+                 group_burst=Config.RATE_LIMIT_GROUP_BURST):
+        self.global_bucket = TokenBucket(global_rate, max(1, int(global_rate)))
+        self.private_rate = private_rate
+        self.group_rate = group_per_minute / 60.0
+        self.group_burst = group_burst
+        self.buckets = {}
+
+        self.tokens_spent = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.flood_waits = 0
+        self.flood_seconds = 0
+
+    @staticmethod
+    def _chat_key(chat_id):
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return str(chat_id)
+
+    def _bucket(self, chat_id):
+        key = self._chat_key(chat_id)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            # IDs negativos são grupos/canais; positivos e @username, chats privados
+            if isinstance(key, int) and key < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, 1)
+            self.buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, chat_id, cost=1):
+        """Aguarda até poder enviar para o chat; retorna o tempo esperado"""
+        return await self._acquire(self._bucket(chat_id), cost)
+
+    async def acquire_global(self, cost=1):
+        """Só o balde global: chamadas de API que não postam em um chat"""
+        return await self._acquire(None, cost)
+
+    async def _acquire(self, bucket, cost):
+        buckets = [self.global_bucket] + ([bucket] if bucket is not None else [])
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            wait = max(b.delay(now, cost) for b in buckets)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+
+        for b in buckets:
+            b.consume(cost)
+            b.recover(self.RECOVERY_STEP)
+
+        self.tokens_spent += cost
+        if waited:
+            self.waits += 1
+            self.waited_seconds += waited
+        return waited
+
+    def penalize(self, chat_id, seconds):
+        """Aplica um FloodWait recebido do Telegram"""
+        now = time.monotonic()
+        bucket = self._bucket(chat_id)
+        bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+        bucket.tokens = 0
+        bucket.slow_down(0.5, self.RATE_FLOOR)
+        self.global_bucket.slow_down(0.9, self.RATE_FLOOR)
+
+        self.flood_waits += 1
+        self.flood_seconds += seconds
+
+    def blocked_for(self, chat_id):
+        """Segundos restantes de bloqueio por FloodWait no chat"""
+        bucket = self.buckets.get(self._chat_key(chat_id))
+        if bucket is None:
+            return 0.0
+        return max(0.0, bucket.blocked_until - time.monotonic())
+
+    def stats(self):
+        return {
+            'tokens_spent': self.tokens_spent,
+            'waits': self.waits,
+            'waited_seconds': round(self.waited_seconds, 1),
+            'flood_waits': self.flood_waits,
+            'flood_seconds': self.flood_seconds,
+            'chats': len(self.buckets),
+            'global_rate': round(self.global_bucket.rate, 2),
+        }
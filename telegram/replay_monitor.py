@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Replay offline do MessageMonitor, sem conta do Telegram.
+
+Alimenta mensagens gravadas (JSONL, exportação do Telegram Desktop ou
+gerador sintético) por um cliente falso que implementa iter_messages e roda
+extração, filtros e persistência o mais rápido possível num banco
+temporário criado a partir de database/schema.sql.
+
+Execute:
+    python replay_monitor.py --synthetic 20000
+    python replay_monitor.py --jsonl dump.jsonl
+    python replay_monitor.py --export result.json --mode pipeline
+
+Formato JSONL: uma mensagem por linha {"group_id": ..., "id": ..., "text": ...}
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from types import SimpleNamespace
+
+from _message_monitor import MessageMonitor
+from desktop_export import load_export
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'schema.sql')
+
+DEFAULT_DOMAINS = (
+    'mercadolivre.com', 'mercadolivre.com.br', 'produto.mercadolivre.com.br',
+    'amazon.com.br', 'amzn.to', 'shopee.com.br', 's.shopee.com.br',
+)
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+# ============================================================
+# CLIENTE FALSO
+# ============================================================
+
+class FakeClient:
+    """Implementa o subconjunto de TelegramClient usado na leitura"""
+
+    def __init__(self, groups):
+        # group_id -> mensagens em ordem crescente de ID
+        self.groups = {
+            gid: sorted(data['messages'], key=lambda m: m['message_id'])
+            for gid, data in groups.items()
+        }
+        self.visible = {gid: 0 for gid in self.groups}
+
+    def is_connected(self):
+        return True
+
+    def reveal(self, count):
+        """Simula a chegada de mais `count` mensagens em cada grupo"""
+        pending = False
+        for gid, messages in self.groups.items():
+            self.visible[gid] = min(self.visible[gid] + count, len(messages))
+            pending = pending or self.visible[gid] < len(messages)
+        return pending
+
+    async def iter_messages(self, entity, min_id=0, limit=None, **kwargs):
+        # Como o Telethon: mais novas primeiro, acima de min_id
+        messages = self.groups.get(entity, [])[:self.visible.get(entity, 0)]
+        yielded = 0
+        for m in reversed(messages):
+            if m['message_id'] <= min_id or (limit is not None and yielded >= limit):
+                break
+            yielded += 1
+            yield SimpleNamespace(id=m['message_id'], text=m['text'])
+
+
+class ReplayMonitor(MessageMonitor):
+    """MessageMonitor que conta escritas no banco"""
+
+    db_writes = 0
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.set_trace_callback(self._trace)
+        return conn
+
+    def _trace(self, statement):
+        if statement.lstrip().upper().startswith(WRITE_PREFIXES):
+            ReplayMonitor.db_writes += 1
+
+
+# ============================================================
+# FONTES
+# ============================================================
+
+def load_jsonl(path):
+    groups = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            gid = row.get('group_id', 0)
+            groups.setdefault(gid, {'name': str(gid), 'messages': []})['messages'].append({
+                'message_id': int(row['id']),
+                'text': row.get('text') or '',
+            })
+    return groups
+
+
+def synthetic(total, n_groups=10, dup_ratio=0.3, link_ratio=0.7, seed=42):
+    """Ofertas sintéticas com repasses entre grupos (mesmo texto, outro link)"""
+    rng = random.Random(seed)
+    products = ['Kit Condor Masculino', 'SSD 240GB Kingston', 'Micro-Ondas Mondial',
+                'Lavadora Alta Pressão', 'Fone Bluetooth JBL', 'Air Fryer Mondial']
+    emojis = ['🔥', '⚡', '😍', '🛒', '💥']
+    groups = {-1000000000000 - g: {'name': f'grupo_{g}', 'messages': []} for g in range(n_groups)}
+    gids = list(groups)
+    sent = []
+
+    for i in range(total):
+        gid = rng.choice(gids)
+        if sent and rng.random() < dup_ratio:
+            text = rng.choice(sent).replace('🔥', rng.choice(emojis))
+        elif rng.random() < link_ratio:
+            item = rng.randint(1000000000, 9999999999)
+            text = (f"🔥 {rng.choice(products)} por R$ {rng.randint(20, 900)},99 "
+                    f"https://produto.mercadolivre.com.br/MLB-{item}-oferta-_JM?src={i} "
+                    f"cupom OFF{rng.randint(5, 30)}")
+            sent.append(text)
+        else:
+            text = f"Bom dia pessoal! Mensagem {i} sem link"
+        groups[gid]['messages'].append({'message_id': len(groups[gid]['messages']) + 1, 'text': text})
+    return groups
+
+
+# ============================================================
+# BANCO TEMPORÁRIO
+# ============================================================
+
+def prepare_db(path, domains, source_db=None):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+
+    if source_db:
+        src = sqlite3.connect(source_db)
+        domains = [row[0] for row in src.execute(
+            "SELECT domain FROM affiliate_domains WHERE is_active = 1")]
+        src.close()
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO affiliate_domains (domain, affiliate_code) VALUES (?, 'replay')",
+        [(d,) for d in domains]
+    )
+    conn.commit()
+    conn.close()
+
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def replay(groups, db_path, mode='sequential', batch=20):
+    client = FakeClient(groups)
+    bot = SimpleNamespace(telegram=SimpleNamespace(user_client=client,
+                                                   user_clients={'replay': client}))
+    monitor = ReplayMonitor(db_path, bot)
+    ReplayMonitor.db_writes = 0
+
+    group_list = [{'id': gid, 'name': data['name']} for gid, data in groups.items()]
+    latencies = []
+    saved = 0
+    processed = 0
+
+    pipeline = None
+    if mode == 'pipeline':
+        from ingest_pipeline import IngestPipeline
+        pipeline = IngestPipeline(monitor)
+        pipeline.start()
+
+    started = time.perf_counter()
+    pending = True
+    while pending:
+        pending = client.reveal(batch)
+
+        if pipeline:
+            saved += await pipeline.run_cycle(group_list)
+            processed += pipeline.persist.stats.processed
+            continue
+
+        for group in group_list:
+            for msg in await monitor.get_group_messages(group['id'], limit=batch):
+                t0 = time.perf_counter()
+                candidates = monitor.extract_candidates(msg, group['id'], group['name'])
+                saved += await monitor.persist_candidates(msg, group['id'], candidates)
+                latencies.append(time.perf_counter() - t0)
+                processed += 1
+
+    elapsed = time.perf_counter() - started
+    result = {
+        'mode': mode,
+        'messages': processed,
+        'saved_links': saved,
+        'elapsed_s': round(elapsed, 3),
+        'messages_per_s': round(processed / elapsed, 1) if elapsed else 0,
+        'db_writes': ReplayMonitor.db_writes,
+        'db_writes_per_message': round(ReplayMonitor.db_writes / max(processed, 1), 3),
+    }
+    if latencies:
+        result['p50_ms'] = round(percentile(latencies, 50) * 1000, 3)
+        result['p99_ms'] = round(percentile(latencies, 99) * 1000, 3)
+    if pipeline:
+        result['stages'] = pipeline.stats()
+        await pipeline.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay offline do MessageMonitor')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--jsonl', help='Dump JSONL (group_id, id, text)')
+    source.add_argument('--export', help='result.json do Telegram Desktop')
+    source.add_argument('--synthetic', type=int, help='Gera N mensagens sintéticas')
+    parser.add_argument('--mode', choices=['sequential', 'pipeline'], default='sequential')
+    parser.add_argument('--batch', type=int, default=20, help='Mensagens novas por grupo a cada leitura')
+    parser.add_argument('--domains-from', help='Copia affiliate_domains deste banco')
+    parser.add_argument('--keep-db', action='store_true', help='Não apaga o banco temporário')
+    parser.add_argument('--verbose', action='store_true', help='Mantém o log INFO do monitor')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.jsonl:
+        groups = load_jsonl(args.jsonl)
+    elif args.export:
+        groups = load_export(args.export)
+    else:
+        groups = synthetic(args.synthetic)
+
+    tmp_dir = tempfile.mkdtemp(prefix='replay_')
+    db_path = os.path.join(tmp_dir, 'replay.db')
+    prepare_db(db_path, DEFAULT_DOMAINS, args.domains_from)
+
+    try:
+        result = asyncio.run(replay(groups, db_path, args.mode, args.batch))
+    finally:
+        if args.keep_db:
+            print(f"💾 Banco mantido em {db_path}")
+        else:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("=" * 60)
+    print("📊 REPLAY DO MESSAGE MONITOR")
+    print("=" * 60)
+    for key, value in result.items():
+        if key == 'stages':
+            for stage, stats in value.items():
+                print(f"  {stage:>8}: {stats}")
+        else:
+            print(f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+# retry_scheduler.py
+"""
+Fila de reenvio por destino, ciente de FloodWait.
+
+Quando um destino recebe FloodWait, só ele fica estacionado até o prazo
+pedido pelo Telegram; os envios pendentes vão para a fila dele e os demais
+destinos continuam normalmente. Os prazos ficam num heap de timers, então o
+loop dorme até o próximo destino liberar em vez de varrer todas as filas.
+
+Filas e prazos ficam no SQLite (telegram_retry_queue / telegram_flood_state)
+e são recarregados ao reiniciar. Falhas sem FloodWait são reenviadas com
+backoff exponencial até MAX_ATTEMPTS. Com ready_at, um reenvio também
+respeita a cota diária e o intervalo mínimo do destino: fora deles, o job
+espera o próximo horário livre sem gastar tentativa.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import sqlite3
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RetryJob:
+    __slots__ = ('id', 'target', 'link_id', 'message', 'image_url', 'attempts', 'not_before')
+
+    def __init__(self, id, target, link_id, message, image_url=None, attempts=0, not_before=0.0):
+        self.id = id
+        self.target = target
+        self.link_id = link_id
+        self.message = message
+        self.image_url = image_url
+        self.attempts = attempts
+        self.not_before = not_before
+
+
+class RetryScheduler:
+    MAX_ATTEMPTS = 5
+    BACKOFF_BASE = 30  # segundos; dobra a cada tentativa sem FloodWait
+    PAUSED_RECHECK = 3600  # destino pausado (ready_at infinito): olha de novo a cada hora
+
+    def __init__(self, db_path, send, rate_limiter, ready_at=None):
+        """
+        Args:
+            send: corrotina send(job) -> bool
+            rate_limiter: RateLimiter do ChatBot (detecta o FloodWait de uma falha)
+            ready_at: ready_at(target_id) -> epoch em que o destino pode
+                receber (TargetPacer.ready_at); None = sem cota por destino
+        """
+        self.db_path = db_path
+        self.send = send
+        self.rate_limiter = rate_limiter
+        self.ready_at = ready_at
+
+        self.queues = {}        # target_id -> deque[RetryJob]
+        self.parked_until = {}  # target_id -> epoch
+        self.flood_count = {}
+        self.lost_seconds = {}
+        self.names = {}
+
+        self._timers = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+        self._init_db()
+        self._load()
+
+    # ============================================================
+    # PERSISTÊNCIA
+    # ============================================================
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_retry_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target_id TEXT NOT NULL,
+                target_name TEXT,
+                tracked_link_id INTEGER,
+                message TEXT NOT NULL,
+                image_url TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS telegram_flood_state (
+                target_id TEXT PRIMARY KEY,
+                target_name TEXT,
+                parked_until REAL NOT NULL DEFAULT 0,
+                flood_count INTEGER NOT NULL DEFAULT 0,
+                lost_seconds REAL NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_retry_queue_link ON telegram_retry_queue(tracked_link_id)"
+        )
+        conn.commit()
+        conn.close()
+
+    def _load(self):
+        conn = self._connect()
+        for target_id, name, parked_until, floods, lost in conn.execute(
+            "SELECT target_id, target_name, parked_until, flood_count, lost_seconds FROM telegram_flood_state"
+        ):
+            self.names[target_id] = name or target_id
+            self.parked_until[target_id] = parked_until
+            self.flood_count[target_id] = floods
+            self.lost_seconds[target_id] = lost
+
+        rows = conn.execute("""
+            SELECT id, target_id, target_name, tracked_link_id, message, image_url, attempts, not_before
+            FROM telegram_retry_queue ORDER BY id
+        """).fetchall()
+        conn.close()
+
+        for job_id, target_id, name, link_id, message, image_url, attempts, not_before in rows:
+            target = {'id': int(target_id), 'name': name or target_id}
+            self._append(RetryJob(job_id, target, link_id, message, image_url, attempts, not_before))
+
+        if rows:
+            logger.info(f"🔁 {len(rows)} reenvio(s) pendente(s) recarregado(s) "
+                        f"em {len(self.queues)} destino(s)")
+
+    def _save_flood_state(self, target_id):
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO telegram_flood_state
+                (target_id, target_name, parked_until, flood_count, lost_seconds, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(target_id) DO UPDATE SET
+                target_name = excluded.target_name,
+                parked_until = excluded.parked_until,
+                flood_count = excluded.flood_count,
+                lost_seconds = excluded.lost_seconds,
+                updated_at = CURRENT_TIMESTAMP
+        """, (target_id, self.names.get(target_id), self.parked_until.get(target_id, 0),
+              self.flood_count.get(target_id, 0), self.lost_seconds.get(target_id, 0)))
+        conn.commit()
+        conn.close()
+
+    def _delete_job(self, job):
+        conn = self._connect()
+        conn.execute("DELETE FROM telegram_retry_queue WHERE id = ?", (job.id,))
+        conn.commit()
+        conn.close()
+
+    def _update_job(self, job, error=None):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE telegram_retry_queue SET attempts = ?, not_before = ?, last_error = ? WHERE id = ?",
+            (job.attempts, job.not_before, error, job.id)
+        )
+        conn.commit()
+        conn.close()
+
+    # ============================================================
+    # FILAS E TIMERS
+    # ============================================================
+
+    def _append(self, job):
+        tid = str(job.target['id'])
+        self.names[tid] = job.target.get('name', tid)
+        self.queues.setdefault(tid, deque()).append(job)
+        self._schedule(tid, max(job.not_before, self.parked_until.get(tid, 0)))
+
+    def _schedule(self, target_id, when):
+        heapq.heappush(self._timers, (when, next(self._seq), target_id))
+        self._wakeup.set()
+
+    def parked_for(self, target_id):
+        """Segundos restantes de estacionamento do destino"""
+        return max(0.0, self.parked_until.get(str(target_id), 0) - time.time())
+
+    def park(self, target_id, seconds, name=None):
+        """Estaciona o destino por `seconds` (FloodWait)"""
+        tid = str(target_id)
+        if name:
+            self.names[tid] = name
+        self.parked_until[tid] = max(self.parked_until.get(tid, 0), time.time() + seconds)
+        self.flood_count[tid] = self.flood_count.get(tid, 0) + 1
+        self.lost_seconds[tid] = self.lost_seconds.get(tid, 0) + seconds
+        self._save_flood_state(tid)
+        self._schedule(tid, self.parked_until[tid])
+        logger.warning(f"⏳ {self.names.get(tid, tid)} estacionado por {seconds:.0f}s (FloodWait)")
+
+    def enqueue(self, target, link_id, message, image_url=None, delay=0):
+        """Coloca um envio na fila do destino (delay: segundos até a primeira tentativa)"""
+        tid = str(target['id'])
+        not_before = time.time() + delay if delay else 0.0
+        conn = self._connect()
+        cursor = conn.execute("""
+            INSERT INTO telegram_retry_queue
+                (target_id, target_name, tracked_link_id, message, image_url, not_before)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (tid, target.get('name'), link_id, message, image_url, not_before))
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        self._append(RetryJob(job_id, target, link_id, message, image_url, not_before=not_before))
+
+    def pending_links(self):
+        return {job.link_id for queue in self.queues.values() for job in queue}
+
+    # ============================================================
+    # EXECUÇÃO
+    # ============================================================
+
+    async def _drain(self, tid):
+        """Envia o que estiver liberado na fila do destino"""
+        queue = self.queues.get(tid)
+        while queue:
+            now = time.time()
+            if self.parked_until.get(tid, 0) > now:
+                self._schedule(tid, self.parked_until[tid])
+                return
+
+            job = queue[0]
+            if job.not_before > now:
+                self._schedule(tid, job.not_before)
+                return
+
+            if self.ready_at is not None:
+                ready = self.ready_at(tid)
+                if ready > now:
+                    # Cota do dia esgotada ou intervalo mínimo: espera sem contar tentativa
+                    self._schedule(tid, min(ready, now + self.PAUSED_RECHECK))
+                    return
+
+            ok = False
+            error = None
+            try:
+                ok = bool(await self.send(job))
+            except Exception as e:
+                error = str(e)
+
+            if ok:
+                queue.popleft()
+                self._delete_job(job)
+                logger.info(f"🔁 Reenvio do link {job.link_id} para {self.names.get(tid, tid)} concluído")
+                continue
+
+            flood = self.rate_limiter.blocked_for(job.target['id'])
+            if flood > 0:
+                # Mantém o job na frente da fila; só o destino espera
+                self.park(tid, flood)
+                return
+
+            job.attempts += 1
+            if job.attempts >= self.MAX_ATTEMPTS:
+                queue.popleft()
+                self._delete_job(job)
+                logger.error(f"❌ Link {job.link_id} descartado para {self.names.get(tid, tid)} "
+                             f"após {job.attempts} tentativas")
+                continue
+
+            job.not_before = now + self.BACKOFF_BASE * (2 ** (job.attempts - 1))
+            self._update_job(job, error)
+            self._schedule(tid, job.not_before)
+            return
+
+        self.queues.pop(tid, None)
+
+    async def run(self):
+        """Loop do heap de timers; roda em segundo plano junto do sender"""
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+
+            due = set()
+            while self._timers and self._timers[0][0] <= now:
+                due.add(heapq.heappop(self._timers)[2])
+
+            if due:
+                await asyncio.gather(*(self._drain(tid) for tid in due if tid in self.queues))
+                continue
+
+            timeout = self._timers[0][0] - now if self._timers else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        """Por destino: FloodWaits, tempo perdido e envios na fila"""
+        targets = set(self.lost_seconds) | set(self.queues)
+        return {
+            self.names.get(tid, tid): {
+                'flood_waits': self.flood_count.get(tid, 0),
+                'lost_seconds': round(self.lost_seconds.get(tid, 0), 1),
+                'queued': len(self.queues.get(tid, ())),
+                'parked_for': round(self.parked_for(tid)),
+            }
+            for tid in sorted(targets)
+        }
@@ -0,0 +1,122 @@
+# shard_ring.py
+"""
+Distribuição dos grupos rastreados entre várias contas de usuário.
+
+Cada conta (shard) ocupa vários pontos virtuais num anel de hash
+consistente. Um grupo pertence ao primeiro shard disponível no sentido
+horário; quando uma conta toma FloodWait ou cai, só os grupos dela migram
+para as vizinhas, e voltam quando ela se recupera.
+"""
+import bisect
+import time
+from hashlib import md5
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Anel de hash consistente com nós virtuais"""
+
+    def __init__(self, nodes=(), vnodes=64):
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node):
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: n for p, n in self._owners.items() if n != node}
+
+    def nodes_for(self, key):
+        """Nós em ordem de preferência para a chave (sem repetição)"""
+        if not self._points:
+            return []
+
+        start = bisect.bisect(self._points, _hash(str(key)))
+        seen = []
+        for offset in range(len(self._points)):
+            node = self._owners[self._points[(start + offset) % len(self._points)]]
+            if node not in seen:
+                seen.append(node)
+        return seen
+
+
+class ShardRouter:
+    """Roteia grupos para clientes de usuário e mantém métricas por shard"""
+
+    def __init__(self, clients: dict, vnodes=64):
+        self.clients = dict(clients)
+        self.primary = next(iter(self.clients), None)
+        self.ring = HashRing(self.clients, vnodes=vnodes)
+        self.unavailable_until = {}
+        self.metrics = {
+            name: {
+                'requests': 0,
+                'messages': 0,
+                'flood_waits': 0,
+                'flood_seconds': 0,
+                'errors': 0,
+                'reassigned': 0,
+            }
+            for name in self.clients
+        }
+
+    def is_available(self, name):
+        client = self.clients.get(name)
+        if client is None:
+            return False
+        if self.unavailable_until.get(name, 0) > time.monotonic():
+            return False
+        is_connected = getattr(client, 'is_connected', None)
+        if callable(is_connected) and not is_connected():
+            return False
+        return True
+
+    def _pick(self, group_id, exclude=()):
+        candidates = self.ring.nodes_for(group_id)
+        for name in candidates:
+            if name not in exclude and self.is_available(name):
+                return name, candidates[0]
+        return None, None
+
+    def route(self, group_id, exclude=()):
+        """Retorna (nome, cliente) do shard responsável pelo grupo"""
+        name, owner = self._pick(group_id, exclude)
+        if name is None:
+            return None, None
+        if name != owner:
+            self.metrics[name]['reassigned'] += 1
+        return name, self.clients[name]
+
+    def mark_flood_wait(self, name, seconds):
+        self.unavailable_until[name] = time.monotonic() + seconds
+        self.metrics[name]['flood_waits'] += 1
+        self.metrics[name]['flood_seconds'] += seconds
+
+    def mark_error(self, name, cooldown=30):
+        self.unavailable_until[name] = time.monotonic() + cooldown
+        self.metrics[name]['errors'] += 1
+
+    def record_fetch(self, name, messages):
+        self.metrics[name]['requests'] += 1
+        self.metrics[name]['messages'] += messages
+
+    def assignment(self, group_ids):
+        """Mapa shard -> grupos no estado atual (para log/diagnóstico)"""
+        result = {name: [] for name in self.clients}
+        for group_id in group_ids:
+            name, _ = self._pick(group_id)
+            if name:
+                result[name].append(group_id)
+        return result
@@ -0,0 +1,141 @@
+# simhash.py
+"""
+Fingerprint SimHash de 64 bits para textos de oferta e índice LSH em bandas.
+
+A mesma promoção é repassada entre grupos com outro link ou outro emoji;
+o SimHash dessas cópias difere em poucos bits. O índice divide o
+fingerprint em bandas: com distância de Hamming <= max_distance < bandas,
+pelo menos uma banda coincide (princípio da casa dos pombos), então a busca
+só compara candidatos de baldes exatos.
+"""
+import re
+from collections import Counter, deque
+from functools import lru_cache
+from hashlib import blake2b
+
+BITS = 64
+MASK = (1 << BITS) - 1
+
+URL_STRIP_RE = re.compile(r"(https?://\S+|www\.\S+)", re.IGNORECASE)
+TOKEN_RE = re.compile(r"\w{2,}")
+
+# Abaixo disso o texto não tem fingerprint: "oferta <link>" e outras ofertas
+# só com link teriam todas o mesmo SimHash e seriam descartadas como cópia
+MIN_TOKENS = 4
+
+
+@lru_cache(maxsize=65536)
+def _token_bits(token: str) -> tuple:
+    """Posições dos bits ligados no hash do token (cacheado)"""
+    h = int.from_bytes(blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+    return tuple(i for i in range(BITS) if (h >> i) & 1)
+
+
+def tokenize(text: str) -> list:
+    """Palavras do texto sem URLs, emojis e pontuação"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(URL_STRIP_RE.sub(' ', text).lower())
+
+
+def simhash(text: str, min_tokens: int = MIN_TOKENS) -> int:
+    """
+    SimHash de 64 bits ponderado pela frequência das palavras; 0 (sem
+    fingerprint, nunca é considerado cópia) com menos de min_tokens
+    palavras distintas.
+    """
+    counts = Counter(tokenize(text))
+    if len(counts) < max(1, min_tokens):
+        return 0
+
+    votes = [0] * BITS
+    total = 0
+    for token, weight in counts.items():
+        total += weight
+        for i in _token_bits(token):
+            votes[i] += weight
+
+    # Bit ligado quando a maioria (ponderada) dos tokens o liga
+    fingerprint = 0
+    for i, v in enumerate(votes):
+        if 2 * v > total:
+            fingerprint |= 1 << i
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed(fingerprint: int) -> int:
+    """Converte para inteiro de 64 bits com sinal (INTEGER do SQLite)"""
+    return fingerprint - (1 << BITS) if fingerprint >= (1 << (BITS - 1)) else fingerprint
+
+
+def from_signed(value: int) -> int:
+    return value & MASK
+
+
+class SimHashIndex:
+    """Índice LSH em memória para busca de quase-duplicatas"""
+
+    def __init__(self, bands=4, max_distance=3, capacity=50000):
+        if max_distance >= bands:
+            raise ValueError("max_distance deve ser menor que o número de bandas")
+
+        self.bands = bands
+        self.band_bits = BITS // bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.max_distance = max_distance
+        self.capacity = capacity
+
+        self._buckets = [{} for _ in range(bands)]
+        self._order = deque()
+        self._labels = {}
+
+    def __len__(self):
+        return len(self._labels)
+
+    def _band_values(self, fingerprint):
+        for b in range(self.bands):
+            yield b, (fingerprint >> (b * self.band_bits)) & self.band_mask
+
+    def find(self, fingerprint):
+        """Retorna o rótulo de um fingerprint próximo, ou None"""
+        if not fingerprint:
+            return None
+
+        checked = set()
+        for b, value in self._band_values(fingerprint):
+            for candidate in self._buckets[b].get(value, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if hamming(candidate, fingerprint) <= self.max_distance:
+                    return self._labels[candidate]
+        return None
+
+    def add(self, fingerprint, label=None):
+        if not fingerprint or fingerprint in self._labels:
+            return
+
+        self._labels[fingerprint] = label
+        self._order.append(fingerprint)
+        for b, value in self._band_values(fingerprint):
+            self._buckets[b].setdefault(value, []).append(fingerprint)
+
+        if len(self._order) > self.capacity:
+            self._evict(self._order.popleft())
+
+    def _evict(self, fingerprint):
+        self._labels.pop(fingerprint, None)
+        for b, value in self._band_values(fingerprint):
+            bucket = self._buckets[b].get(value)
+            if not bucket:
+                continue
+            try:
+                bucket.remove(fingerprint)
+            except ValueError:
+                pass
+            if not bucket:
+                del self._buckets[b][value]
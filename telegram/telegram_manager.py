@@ -17,6 +17,7 @@ class TelegramManager:
     
     def __init__(self):
         self.user_client = None
+        self.user_clients = {}  # shard -> cliente de usuário (leitura)
         self.bot_client = None
         self.bot_me = None
         self.session_string = None
@@ -26,8 +27,10 @@ class TelegramManager:
         try:
             print("\n🔐 Conectando conta de usuário...")
             
-            if os.path.exists('session.txt'):
-                with open('session.txt', 'r') as f:
+            # A conta principal é a primeira de TELEGRAM_USER_SESSIONS
+            session_path = (Config.TELEGRAM_USER_SESSIONS or ['session.txt'])[0]
+            if os.path.exists(session_path):
+                with open(session_path, 'r') as f:
                     self.session_string = f.read().strip()
                 
                 self.user_client = TelegramClient(
@@ -53,18 +56,59 @@ class TelegramManager:
             
             if not self.session_string:
                 self.session_string = self.user_client.session.save()
-                with open('session.txt', 'w') as f:
+                with open(session_path, 'w') as f:
                     f.write(self.session_string)
             
             me = await self.user_client.get_me()
             print(f"✅ Conectado como: {me.first_name} (@{me.username})")
             
+            self.user_clients[self._shard_name(session_path)] = self.user_client
             return True
             
         except Exception as e:
             print(f"❌ Erro ao conectar conta de usuário: {e}")
             return False
     
+    @staticmethod
+    def _shard_name(session_path):
+        return os.path.splitext(os.path.basename(session_path))[0]
+    
+    async def initialize_extra_user_clients(self):
+        """Conecta as contas adicionais de leitura (sem login interativo)"""
+        for session_path in Config.TELEGRAM_USER_SESSIONS[1:]:
+            name = self._shard_name(session_path)
+            if name in self.user_clients:
+                continue
+            
+            if not os.path.exists(session_path):
+                print(f"⚠️  Sessão {session_path} não encontrada, ignorando")
+                continue
+            
+            try:
+                with open(session_path, 'r') as f:
+                    session_string = f.read().strip()
+                
+                client = TelegramClient(
+                    StringSession(session_string),
+                    Config.TELEGRAM_API_ID,
+                    Config.TELEGRAM_API_HASH
+                )
+                await client.connect()
+                
+                if not await client.is_user_authorized():
+                    print(f"⚠️  Sessão {session_path} não autorizada, ignorando")
+                    await client.disconnect()
+                    continue
+                
+                me = await client.get_me()
+                self.user_clients[name] = client
+                print(f"✅ Conta extra [{name}]: {me.first_name} (@{me.username})")
+                
+            except Exception as e:
+                print(f"❌ Erro ao conectar sessão {session_path}: {e}")
+        
+        return len(self.user_clients)
+    
     async def initialize_bot_client(self):
         """Inicializa a conexão com o bot"""
         try:
@@ -91,6 +135,8 @@ class TelegramManager:
         if not user_success:
             return False
         
+        await self.initialize_extra_user_clients()
+        
         bot_success = await self.initialize_bot_client()
         return user_success and bot_success
     
@@ -329,6 +375,18 @@ class TelegramManager:
             raise Exception("Bot não conectado")
         return await self.bot_client.send_message(entity, message, **kwargs)
     
+    def takeout_session(self, **kwargs):
+        """
+        Abre uma sessão de takeout na conta principal (limites de histórico
+        bem maiores que a leitura normal). Uso: async with manager.takeout_session() as t
+        """
+        if not self.user_client:
+            raise Exception("Conta de usuário não conectada")
+        
+        options = {'finalize': True, 'chats': True, 'megagroups': True, 'channels': True}
+        options.update(kwargs)
+        return self.user_client.takeout(**options)
+    
     async def create_invite_link(self, chat_id):
         """Cria link de convite para um chat"""
         try:
@@ -341,6 +399,9 @@ class TelegramManager:
     async def disconnect(self):
         """Desconecta ambos os clientes"""
         try:
+            for client in self.user_clients.values():
+                if client is not self.user_client:
+                    await client.disconnect()
             if self.user_client:
                 await self.user_client.disconnect()
             if self.bot_client:
@@ -3,6 +3,13 @@ import sqlite3
 import asyncio
 import sys
 from chat_bot import ChatBot
+from config import Config
+from fanout import FanOut
+from destination_registry import DestinationRegistry
+from offer_priority import OfferQueue
+from pacing import TargetPacer
+from delivery_ledger import DeliveryLedger, PENDING
+from message_templates import TemplateEngine
 
 
 class TelegramSender:
@@ -11,13 +18,32 @@ class TelegramSender:
         self.check_interval = check_interval
         self.bot = ChatBot()
         self.telegram_targets = []
+        self.fanout = FanOut(
+            lambda target, message: self.send_to_telegram(target["id"], message),
+            policy=Config.DELIVERY_POLICY,
+            quorum=Config.DELIVERY_QUORUM,
+            concurrency=Config.FANOUT_CONCURRENCY,
+        )
+        self.offers = OfferQueue(db_path)
+        self.pacer = TargetPacer(db_path)
+        self.ledger = DeliveryLedger(db_path, max_attempts=Config.DELIVERY_MAX_ATTEMPTS)
+        self.templates = TemplateEngine()
+        self.destinations = DestinationRegistry(
+            db_path, self.bot,
+            ttl=Config.DESTINATION_CACHE_TTL_SECONDS,
+            rescan_interval=Config.DESTINATION_RESCAN_HOURS * 3600,
+        )
 
     # ------------------------------------------------------------------
     # INICIALIZAÇÃO
     # ------------------------------------------------------------------
     async def initialize(self):
         """Inicializa conexão com Telegram"""
-        return await self.bot.initialize()
+        if not await self.bot.initialize():
+            return False
+        self.destinations.attach()
+        await self.ledger.reconcile(self.bot.telegram.user_client, Config.RECONCILE_HISTORY_LIMIT)
+        return True
 
     # ------------------------------------------------------------------
     # DESCOBERTA / ATUALIZAÇÃO DE DESTINOS
@@ -44,9 +70,10 @@ class TelegramSender:
         """
         Atualiza dinamicamente os grupos/canais válidos para envio
         Executado no startup e sempre que houver links para enviar
+        (lê o registro de destinos; a varredura de diálogos é rara)
         """
         try:
-            groups = await self.bot._menu_list_groups(2)
+            groups = await self.destinations.groups()
             new_targets = self.get_valid_telegram_targets(groups)
 
             if new_targets:
@@ -62,25 +89,9 @@ class TelegramSender:
     # BANCO DE DADOS
     # ------------------------------------------------------------------
     def get_new_sent_links(self):
-        """Busca links prontos para envio ao Telegram"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        query = """
-        SELECT tl.id, tl.affiliate_link, tl.metadata, tl.processed_at
-        FROM tracked_links tl
-        WHERE tl.status = 'ready'
-        AND NOT EXISTS (
-            SELECT 1 FROM telegram_sent ts 
-            WHERE ts.tracked_link_id = tl.id
-        )
-        ORDER BY tl.created_at DESC
-        LIMIT 10
-        """
-
-        cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
+        """Busca links prontos para envio ao Telegram (maior prioridade primeiro)"""
+        self.offers.refresh()
+        results = self.offers.take(10, columns=('id', 'affiliate_link', 'metadata', 'processed_at'))
 
         print(
             f"🔍 Consultando links prontos para envio ao Telegram... "
@@ -114,21 +125,10 @@ class TelegramSender:
     # ------------------------------------------------------------------
     # MENSAGEM
     # ------------------------------------------------------------------
-    def create_telegram_message(self, affiliate_link, metadata):
-        """Cria mensagem formatada para Telegram"""
+    def create_telegram_message(self, affiliate_link, metadata, link_id=None):
+        """Cria mensagem formatada para Telegram (template 'legacy')"""
         try:
-            meta = eval(metadata) if metadata else {}
-            product_title = meta.get('product_title', 'Oferta Especial')
-
-            return (
-                f"🛍️ **{product_title}**\n\n"
-                f"🔗 {affiliate_link}\n\n"
-                f"⚡ Oferta exclusiva do grupo!\n"
-                f"✅ Compra 100% segura\n"
-                f"🚚 Entrega para todo Brasil\n\n"
-                f"📊 *Recomendação validada pelo sistema*"
-            )
-
+            return self.templates.render('legacy', affiliate_link, metadata, link_id)
         except Exception:
             return (
                 "🛍️ Oferta especial!\n\n"
@@ -145,9 +145,10 @@ class TelegramSender:
             success = await self.bot.send_message(
                 chat_id,
                 message,
-                as_bot=True
+                as_bot=True,
+                return_message=True
             )
-            return bool(success)
+            return success or False
 
         except Exception as e:
             print(f"❌ Erro Telegram ({chat_id}): {e}")
@@ -187,34 +188,64 @@ class TelegramSender:
                         continue
 
                     print(f"📥 {len(new_links)} link(s) para envio")
+                    self.pacer.sync_targets(self.telegram_targets)
 
                     for link in new_links:
                         link_id, affiliate_link, metadata, sent_at = link
+
+                        # Só destinos que ainda não receberam o link...
+                        deliveries = self.ledger.for_link(link_id)
+                        missing = self.ledger.missing(link_id, self.telegram_targets, deliveries)
+                        if not missing:
+                            # Envio em dúvida (pending) espera a reconciliação
+                            if not any(d['state'] == PENDING for d in deliveries.values()):
+                                self.mark_as_sent_to_telegram(link_id)
+                            continue
+
+                        # ...e com cota e intervalo livres
+                        due = set(self.pacer.due())
+                        if not due:
+                            print("⏸️ Nenhum destino liberado agora; restante fica para o próximo ciclo")
+                            break
+                        targets = [t for t in missing if str(t["id"]) in due]
+                        for target_id in due - {str(t["id"]) for t in targets}:
+                            self.pacer.done(target_id, sent=False)
+                        if not targets:
+                            continue
                         message = self.create_telegram_message(
                             affiliate_link,
-                            metadata
+                            metadata,
+                            link_id
                         )
 
-                        # Envio multicast
-                        for target in self.telegram_targets:
-                            sent = await self.send_to_telegram(
-                                target["id"],
-                                message
-                            )
-
-                            if sent:
-                                print(
-                                    f"✅ Enviado para {target['name']} [{target['id']}]"
-                                )
-                            else:
-                                print(
-                                    f"❌ Falha ao enviar para {target['name']} [{target['id']}]"
-                                )
-
-                            await asyncio.sleep(1.5)  # anti-flood
+                        # Envio multicast (todos os destinos em paralelo)
+                        self.ledger.begin(link_id, targets)
+                        result = await self.fanout.deliver(targets, message)
 
-                        # Marca link como enviado após envio a todos os destinos
-                        self.mark_as_sent_to_telegram(link_id)
+                        for target_id, r in result.results.items():
+                            self.pacer.done(target_id, sent=r['ok'])
+                            if r['ok']:
+                                print(f"✅ Enviado para {r['name']} [{target_id}]")
+                            else:
+                                print(f"❌ Falha ao enviar para {r['name']} [{target_id}]")
+                        self.ledger.record(link_id, [
+                            (t, result.results[t["id"]]['ok'], result.results[t["id"]]['message_id'],
+                             result.results[t["id"]]['error'])
+                            for t in targets
+                        ])
+
+                        # Marca o link só quando nenhum destino falta (entregue ou
+                        # sem tentativas); os que falharam recebem no próximo ciclo
+                        deliveries = self.ledger.for_link(link_id)
+                        remaining = self.ledger.missing(link_id, self.telegram_targets, deliveries)
+                        if not remaining:
+                            if not any(d['state'] == PENDING for d in deliveries.values()):
+                                self.mark_as_sent_to_telegram(link_id)
+                        else:
+                            print(f"🔁 Link {link_id}: {len(remaining)} destino(s) pendente(s) para o próximo ciclo")
+
+                    self.pacer.flush()
+                    print(f"⏱️ Rate limiter: {self.bot.rate_limiter.stats()}")
 
                 await asyncio.sleep(self.check_interval)
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Testes offline da tabela de reescrita do CDN e do CdnRewriter.
+
+Execute:
+    python -m pytest -q test_cdn_rewrite.py
+"""
+import asyncio
+import time
+
+from cdn_rewrite import CdnRewriter, candidates
+
+ML_2X = 'https://http2.mlstatic.com/D_NQ_NP_2X_715808-MLA97591903165_112025-F.webp'
+ML_1X_JPG = 'https://http2.mlstatic.com/D_NQ_NP_715808-MLA97591903165_112025-F.jpg'
+
+
+def test_mlstatic_retina_rewritten_to_1x_jpeg():
+    assert candidates(ML_2X, 500) == [ML_1X_JPG, ML_2X]
+
+
+def test_mlstatic_keeps_size_when_target_needs_retina():
+    assert candidates(ML_2X, 1000) == [
+        'https://http2.mlstatic.com/D_NQ_NP_2X_715808-MLA97591903165_112025-F.jpg', ML_2X
+    ]
+
+
+def test_mlstatic_already_smallest_jpeg_unchanged():
+    assert candidates(ML_1X_JPG, 500) == [ML_1X_JPG]
+
+
+def test_unknown_host_passes_through():
+    url = 'https://images.example.com/D_NQ_NP_2X_123-F.webp'
+    assert candidates(url, 500) == [url]
+
+
+def test_lookalike_host_not_rewritten():
+    url = 'https://evilmlstatic.com/D_NQ_NP_2X_123-F.webp'
+    assert candidates(url, 500) == [url]
+
+
+def test_unknown_mlstatic_path_passes_through():
+    url = 'https://http2.mlstatic.com/frontend-assets/logo.png'
+    assert candidates(url, 500) == [url]
+
+
+def test_original_is_always_last_fallback():
+    for url in (ML_2X, ML_1X_JPG, 'https://a.example/x.png', 'https://http2.mlstatic.com/D_NQ_NP_1-F.webp'):
+        for target in (100, 500, 1200, 5000):
+            options = candidates(url, target)
+            assert options[-1] == url
+            assert options.count(url) == 1
+
+
+class FakeCache:
+    def __init__(self, available):
+        self.available = available
+        self.fetched = []
+
+    async def fetch(self, url, http, **kwargs):
+        self.fetched.append(url)
+        return self.available.get(url)
+
+
+class SlowHead:
+    """http.head() que demora; fetch não pode esperar por ele"""
+
+    def __init__(self, delay=0.5, length=90000):
+        self.delay = delay
+        self.length = length
+
+    def head(self, url):
+        outer = self
+
+        class Context:
+            async def __aenter__(self):
+                await asyncio.sleep(outer.delay)
+                return type('R', (), {'headers': {'Content-Length': str(outer.length)}})()
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Context()
+
+
+def test_fetch_does_not_wait_for_savings_measure():
+    async def scenario():
+        rewriter = CdnRewriter(target_px=500)
+        cache = FakeCache({ML_1X_JPG: b'v' * 30000})
+        started = time.perf_counter()
+        data = await rewriter.fetch(cache, ML_2X, SlowHead())
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*rewriter._tasks)
+        return data, elapsed, rewriter
+
+    data, elapsed, rewriter = asyncio.run(scenario())
+    assert data == b'v' * 30000
+    assert elapsed < 0.2
+    assert rewriter.rewritten == 1
+    assert rewriter.bytes_saved == 60000
+
+
+def test_fetch_falls_back_to_original():
+    async def scenario():
+        rewriter = CdnRewriter(target_px=500)
+        cache = FakeCache({ML_2X: b'o'})
+        return await rewriter.fetch(cache, ML_2X, SlowHead()), cache, rewriter
+
+    data, cache, rewriter = asyncio.run(scenario())
+    assert data == b'o'
+    assert cache.fetched == [ML_1X_JPG, ML_2X]
+    assert rewriter.fallbacks == 1
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Testes do HttpClient contra um servidor aiohttp local (127.0.0.1).
+
+Execute:
+    python -m pytest -q test_http_client.py
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from http_client import HttpClient
+
+BODY = b'x' * 50000
+
+
+class Stub:
+    """Servidor local com as rotas usadas nos testes"""
+
+    def __init__(self, failures=2):
+        self.failures = failures
+        self.flaky_calls = 0
+        self.peers = set()
+        self.active = 0
+        self.peak = 0
+        self.runner = None
+        self.base = None
+
+    async def flaky(self, request):
+        self.flaky_calls += 1
+        if self.flaky_calls <= self.failures:
+            return web.Response(status=503)
+        return web.Response(body=BODY)
+
+    async def data(self, request):
+        self.peers.add(request.transport.get_extra_info('peername'))
+        return web.Response(body=BODY)
+
+    async def slow(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            self.active -= 1
+        return web.Response(body=b'ok')
+
+    async def hang(self, request):
+        await asyncio.sleep(1)
+        return web.Response(body=b'tarde')
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/flaky', self.flaky)
+        app.router.add_get('/data', self.data)
+        app.router.add_get('/slow', self.slow)
+        app.router.add_get('/hang', self.hang)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base = f'http://127.0.0.1:{port}'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_retry_after_503():
+    async def scenario():
+        async with Stub(failures=2) as stub:
+            client = HttpClient(retries=2, backoff=0.01)
+            try:
+                data = await client.fetch_bytes(f'{stub.base}/flaky')
+            finally:
+                await client.close()
+            return stub, client, data
+
+    stub, client, data = run(scenario())
+    assert data == BODY
+    assert stub.flaky_calls == 3
+    assert client.metrics.retries == 2
+
+
+def test_503_after_retries_exhausted():
+    async def scenario():
+        async with Stub(failures=5) as stub:
+            client = HttpClient(retries=1, backoff=0.01)
+            try:
+                return await client.fetch_bytes(f'{stub.base}/flaky'), stub
+            finally:
+                await client.close()
+
+    data, stub = run(scenario())
+    assert data is None
+    assert stub.flaky_calls == 2
+
+
+def test_keep_alive_reuses_connection():
+    async def scenario():
+        async with Stub() as stub:
+            client = HttpClient()
+            try:
+                for _ in range(5):
+                    assert await client.fetch_bytes(f'{stub.base}/data') == BODY
+            finally:
+                await client.close()
+            return stub, client
+
+    stub, client = run(scenario())
+    assert len(stub.peers) == 1
+    assert client.metrics.connections == 1
+    assert client.stats()['reused'] == 4
+
+
+def test_per_host_cap():
+    async def scenario():
+        async with Stub() as stub:
+            client = HttpClient(limit_per_host=2)
+            try:
+                results = await asyncio.gather(
+                    *(client.fetch_bytes(f'{stub.base}/slow') for _ in range(8))
+                )
+            finally:
+                await client.close()
+            return stub, results
+
+    stub, results = run(scenario())
+    assert results == [b'ok'] * 8
+    assert stub.peak == 2
+
+
+def test_timeout_fires():
+    async def scenario():
+        async with Stub() as stub:
+            client = HttpClient(retries=0)
+            try:
+                await client.fetch_bytes(f'{stub.base}/hang', timeout=0.2)
+            finally:
+                await client.close()
+
+    with pytest.raises(asyncio.TimeoutError):
+        run(scenario())
+
+
+def test_metrics_connect_time_and_bytes():
+    async def scenario():
+        async with Stub() as stub:
+            client = HttpClient()
+            try:
+                await client.fetch_bytes(f'{stub.base}/data')
+                async with client.get(f'{stub.base}/data') as response:
+                    async for _ in response.content.iter_chunked(4096):
+                        pass
+            finally:
+                await client.close()
+            return client
+
+    client = run(scenario())
+    metrics = client.metrics
+    assert metrics.connections == 1
+    assert metrics.connect_seconds > 0
+    assert metrics.bytes_received == 2 * len(BODY)
+    assert metrics.by_host['127.0.0.1'] == {'requests': 2, 'bytes': 2 * len(BODY)}
+    assert client.stats()['received_kb'] == round(2 * len(BODY) / 1024, 1)